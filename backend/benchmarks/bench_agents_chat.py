@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/agents/chat : utilisateurs simultanés face à un LLM local
+(benchmarks/llm_factice.py), boucle asyncio et client HTTP partagés par le processus
+
+Usage : python benchmarks/bench_agents_chat.py --utilisateurs 50 --requetes 10 --delai 0.2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OPENAI_API_KEY', 'bench')
+
+from flask import Flask  # noqa: E402
+
+from benchmarks.llm_factice import ServeurLLMFactice  # noqa: E402
+from src import agents_ia_lmnp  # noqa: E402
+from src.routes.agents_routes import agents_bp  # noqa: E402
+
+# Déclenche les trois agents
+MESSAGE = "Quelle interface et quelle api pour le calcul de l'amortissement ?"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--utilisateurs', type=int, default=50)
+    parser.add_argument('--requetes', type=int, default=10, help="requêtes de chat par utilisateur")
+    parser.add_argument('--delai', type=float, default=0.2, help="délai de réponse du LLM (s)")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.register_blueprint(agents_bp, url_prefix='/api')
+
+    with ServeurLLMFactice(delai_defaut=args.delai) as llm:
+        agents_ia_lmnp.client = agents_ia_lmnp.client.copy(base_url=llm.url, max_retries=0)
+        latences, erreurs = [], []
+        verrou = threading.Lock()
+
+        def discuter():
+            client = app.test_client()
+            for _ in range(args.requetes):
+                debut = time.perf_counter()
+                reponse = client.post('/api/agents/chat', json={'message': MESSAGE})
+                with verrou:
+                    if reponse.status_code == 200 and not reponse.get_json()['agents_en_echec']:
+                        latences.append((time.perf_counter() - debut) * 1000)
+                    else:
+                        erreurs.append(reponse.status_code)
+
+        threads = [threading.Thread(target=discuter) for _ in range(args.utilisateurs)]
+        debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+
+    latences.sort()
+    print(f"{args.utilisateurs} utilisateurs × {args.requetes} chats (3 agents, LLM à {args.delai * 1000:.0f} ms), "
+          f"{agents_ia_lmnp.MAX_APPELS_AGENTS} appels LLM simultanés au plus")
+    print(f"  {len(latences) / duree:7.1f} requêtes/s, médiane {statistics.median(latences):6.0f} ms, "
+          f"p95 {latences[int(len(latences) * 0.95)]:6.0f} ms, {len(erreurs)} erreur(s)")
+    print(f"  {llm.appels} appels LLM sur {llm.connexions} connexion(s) HTTP")
+
+
+if __name__ == '__main__':
+    main()
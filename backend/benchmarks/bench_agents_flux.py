@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark du temps jusqu'au premier octet (TTFB) des agents IA : réponse JSON complète
+(/api/agents/developpeur) vs server-sent events (/api/agents/developpeur/flux), servies
+par un serveur WSGI local face à un LLM local qui génère sa réponse mot à mot
+
+Usage : python benchmarks/bench_agents_flux.py --mots 150 --delai-jeton 0.02 --iterations 5
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OPENAI_API_KEY', 'bench')
+
+import httpx  # noqa: E402
+from flask import Flask  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+from benchmarks.llm_factice import ServeurLLMFactice  # noqa: E402
+from src import agents_ia_lmnp  # noqa: E402
+from src.cache_agents import cache_reponses_agents  # noqa: E402
+from src.routes.agents_routes import agents_bp  # noqa: E402
+
+
+def mesurer(url: str, iterations: int):
+    """
+    Médianes en ms (premier octet, premier texte de la réponse, réponse complète),
+    une question différente par itération (pas de cache)
+    """
+    mesures = []
+    with httpx.Client(timeout=120) as client:
+        for i in range(iterations):
+            debut = time.perf_counter()
+            premier_octet = premier_texte = None
+            with client.stream('POST', url, json={'demande': f'Code du module {i} ?'}) as reponse:
+                recu = b''
+                for bloc in reponse.iter_bytes():
+                    premier_octet = premier_octet or time.perf_counter() - debut
+                    recu += bloc
+                    if premier_texte is None and b'event: jeton' in recu:
+                        premier_texte = time.perf_counter() - debut
+            total = time.perf_counter() - debut
+            mesures.append((premier_octet, premier_texte or total, total))
+    return [statistics.median(colonne) * 1000 for colonne in zip(*mesures)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mots', type=int, default=150, help="longueur de la réponse du LLM")
+    parser.add_argument('--delai', type=float, default=0.3, help="délai avant le premier jeton (s)")
+    parser.add_argument('--delai-jeton', type=float, default=0.02, help="intervalle entre jetons (s)")
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.register_blueprint(agents_bp, url_prefix='/api')
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    serveur = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{serveur.server_port}/api/agents/developpeur'
+
+    with ServeurLLMFactice(delai_defaut=args.delai, delai_jeton=args.delai_jeton, mots=args.mots) as llm:
+        agents_ia_lmnp.client = agents_ia_lmnp.client.copy(base_url=llm.url, max_retries=0)
+        print(f"LLM : premier jeton à {args.delai * 1000:.0f} ms, {args.mots} mots à "
+              f"{args.delai_jeton * 1000:.0f} ms d'intervalle, médiane sur {args.iterations} requêtes")
+        for nom, url in (('JSON complet', base), ('SSE (flux)', base + '/flux')):
+            cache_reponses_agents.vider()
+            premier_octet, premier_texte, total = mesurer(url, args.iterations)
+            print(f"{nom:<13}: premier octet {premier_octet:6.0f} ms, premier texte {premier_texte:6.0f} ms, "
+                  f"réponse complète {total:6.0f} ms")
+    serveur.shutdown()
+
+
+if __name__ == '__main__':
+    main()
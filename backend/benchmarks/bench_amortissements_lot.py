@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark : amortissements vectorisés vs boucle Python sur calculer_amortissement
+
+Usage : python benchmarks/bench_amortissements_lot.py --biens 20000 --annees 10
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.calculs_vectorises import biens_vers_colonnes, calculer_amortissements_lot  # noqa: E402
+from src.expertise_fiscale_lmnp import BienImmobilier, expert_fiscal  # noqa: E402
+
+
+def generer_biens(nombre: int, graine: int = 42):
+    rng = random.Random(graine)
+    return [
+        BienImmobilier(
+            id=i,
+            adresse=f'{i} avenue du Benchmark',
+            date_entree_lmnp=date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650)),
+            prix_acquisition=Decimal(rng.randint(5_000_000, 90_000_000)) / 100,
+            frais_notaire=Decimal(rng.randint(0, 3_000_000)) / 100,
+            frais_agence=Decimal(rng.randint(0, 1_500_000)) / 100
+        )
+        for i in range(nombre)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--biens', type=int, default=20_000)
+    parser.add_argument('--annees', type=int, default=10)
+    args = parser.parse_args()
+
+    biens = generer_biens(args.biens)
+    annees = list(range(2016, 2016 + args.annees))
+    colonnes = biens_vers_colonnes(biens)
+
+    debut = time.perf_counter()
+    reference = [[expert_fiscal.calculer_amortissement(b, a) for a in annees] for b in biens]
+    duree_boucle = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    lot = calculer_amortissements_lot(annees=annees, **colonnes)
+    duree_lot = time.perf_counter() - debut
+
+    ecarts = sum(
+        lot.amortissement(i, j) != reference[i][j]
+        for i in range(len(biens)) for j in range(len(annees))
+    )
+
+    cellules = len(biens) * len(annees)
+    print(f"Biens × années        : {len(biens)} × {len(annees)} = {cellules}")
+    print(f"Boucle Python/Decimal : {duree_boucle:.3f} s ({cellules / duree_boucle:,.0f} calculs/s)")
+    print(f"Lot NumPy/centimes    : {duree_lot:.3f} s ({cellules / duree_lot:,.0f} calculs/s)")
+    print(f"Accélération          : x{duree_boucle / duree_lot:.1f}")
+    print(f"Écarts au centime     : {ecarts}")
+
+
+if __name__ == '__main__':
+    main()
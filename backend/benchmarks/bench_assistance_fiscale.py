@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark des routes d'assistance fiscale des agents IA : situation chiffrée calculée
+localement vs même situation accompagnée d'une question libre (agent fiscal, servi
+par un LLM local qui répond après --delai secondes)
+
+Usage : python benchmarks/bench_assistance_fiscale.py --delai 2 --iterations 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OPENAI_API_KEY', 'bench')
+
+from flask import Flask  # noqa: E402
+
+from benchmarks.llm_factice import ServeurLLMFactice  # noqa: E402
+from src import agents_ia_lmnp  # noqa: E402
+from src.cache_agents import cache_reponses_agents  # noqa: E402
+from src.routes.agents_routes import agents_bp  # noqa: E402
+
+
+def mesurer(client, url: str, corps, iterations: int) -> float:
+    """Latence médiane en ms, une situation différente par itération (pas de cache)"""
+    durees = []
+    for i in range(iterations):
+        debut = time.perf_counter()
+        reponse = client.post(url, json=corps(i))
+        durees.append(time.perf_counter() - debut)
+        assert reponse.status_code == 200, reponse.get_json()
+    return statistics.median(durees) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--delai', type=float, default=2.0, help="temps de réponse du LLM (s)")
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.register_blueprint(agents_bp, url_prefix='/api')
+    client = app.test_client()
+
+    def situation(i):
+        return {'situation': {'recettes': 30000 + i, 'charges': 9000, 'nombreBiens': 2, 'regime': 'reel'}}
+
+    def question(i):
+        return {**situation(i), 'question': "Quels sont les avantages du régime réel ?"}
+
+    with ServeurLLMFactice(delai_defaut=args.delai) as llm:
+        agents_ia_lmnp.client = agents_ia_lmnp.client.copy(base_url=llm.url, max_retries=0)
+        cache_reponses_agents.vider()
+        url = '/api/agents/assistance/optimisation'
+        calcule = mesurer(client, url, situation, args.iterations)
+        appels = llm.appels
+        agent = mesurer(client, url, question, min(args.iterations, 5))
+        print(f"LLM : réponse en {args.delai * 1000:.0f} ms")
+        print(f"Situation chiffrée (calcul local) : {calcule:8.2f} ms ({appels} appel au modèle)")
+        print(f"Question libre (agent fiscal)      : {agent:8.2f} ms ({llm.appels - appels} appels au modèle)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark du cache sémantique de l'agent fiscal : construction de l'instantané FAISS,
+réouverture (projection en mémoire), latence et taux de succès d'une recherche
+(projection de la question comprise) pour N entrées. Quelques vraies questions sont
+noyées parmi des vecteurs aléatoires répartis sur --portees portées ; chacune est
+aussi enregistrée dans --portees autres portées (même question, autre contexte), et
+un cinquième des entrées est évincé après la construction de l'instantané. Les
+recherches alternent reformulations (hits attendus) et questions sans rapport (misses).
+
+Usage : python benchmarks/bench_cache_semantique.py --entrees 1000000 --requetes 500
+        python benchmarks/bench_cache_semantique.py --entrees 1000000 --exhaustif
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from src import cache_semantique  # noqa: E402
+from src.cache_semantique import CacheSemantique, vectoriser  # noqa: E402
+
+PORTEE = 'bench'
+EVINCEES = 'evincees'
+LOT = 50_000
+QUESTIONS = [
+    ("Quel est le plafond du régime micro-BIC pour une location meublée ?",
+     "Plafond du micro-BIC pour les locations meublées ?"),
+    ("Quelle durée d'amortissement pour la construction ?", "Durée d'amortissement de la construction"),
+    ("Les frais de notaire sont-ils déductibles ?", "Frais de notaire déductibles ?"),
+    ("Comment remplir le formulaire 2033-C ?", "Remplir le formulaire 2033-C"),
+]
+SANS_RAPPORT = ["Quelle est la couleur du ciel ?", "Recette de la tarte aux pommes", "Horaires du cinéma",
+                "Résultats du match de football"]
+
+
+def portee_aleatoire(rang: int, portees: int) -> str:
+    """Un cinquième des entrées aléatoires dans la portée EVINCEES, le reste réparti sur les portées"""
+    return EVINCEES if rang % 5 == 0 else f'p{rang % portees}'
+
+
+def remplir(cache: CacheSemantique, entrees: int, portees: int):
+    """
+    Entrées insérées par lots dans SQLite (vecteurs aléatoires de norme 1), vraies questions
+    comprises, dans PORTEE et dans les autres portées
+    """
+    rng = np.random.default_rng(0)
+    connexion = cache._connexion
+    maintenant = time.time()
+    for question, _ in QUESTIONS:
+        for autre in range(portees):
+            cache.ajouter(question, f'autre{autre}', f'Autre contexte : {question}')
+        cache.ajouter(question, PORTEE, f'Réponse : {question}')
+    for debut in range(len(QUESTIONS) * (portees + 1), entrees, LOT):
+        taille = min(LOT, entrees - debut)
+        vecteurs = rng.standard_normal((taille, cache.dimension), dtype=np.float32)
+        vecteurs /= np.linalg.norm(vecteurs, axis=1, keepdims=True)
+        connexion.execute('BEGIN')
+        connexion.executemany(
+            'INSERT INTO entrees_semantiques (portee, question, reponse, tokens, creation, utilisation, vecteur) '
+            'VALUES (?, ?, ?, 0, ?, ?, ?)',
+            ((portee_aleatoire(debut + i, portees), f'q{debut + i}', f'r{debut + i}', maintenant, maintenant,
+              vecteur.tobytes()) for i, vecteur in enumerate(vecteurs))
+        )
+        connexion.execute('COMMIT')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entrees', type=int, default=1_000_000)
+    parser.add_argument('--requetes', type=int, default=500)
+    parser.add_argument('--portees', type=int, default=100, help="autres portées (contextes)")
+    parser.add_argument('--exhaustif', action='store_true', help="instantané exhaustif (sans IVF)")
+    args = parser.parse_args()
+    if args.exhaustif:
+        cache_semantique.SEUIL_IVF = float('inf')
+
+    with tempfile.TemporaryDirectory() as dossier:
+        cache = CacheSemantique(taille_max=args.entrees + 1)
+        cache.ouvrir(dossier)
+        debut = time.perf_counter()
+        remplir(cache, args.entrees, args.portees)
+        print(f"Remplissage SQLite : {args.entrees} entrées en {time.perf_counter() - debut:.1f} s")
+
+        debut = time.perf_counter()
+        cache.reconstruire()
+        taille_fichier = os.path.getsize(cache.fichier_index) / 1024 ** 2
+        print(f"Instantané {'exhaustif' if args.exhaustif else 'IVF'} : construit en "
+              f"{time.perf_counter() - debut:.1f} s ({taille_fichier:.0f} Mo)")
+        # Entrées évincées (20 %) qui restent dans l'instantané jusqu'à sa reconstruction
+        cache._supprimer('SELECT id FROM entrees_semantiques WHERE portee = ?', (EVINCEES,))
+        cache.fermer()
+
+        debut = time.perf_counter()
+        cache.ouvrir(dossier)
+        print(f"Réouverture (index projeté en mémoire) : {(time.perf_counter() - debut) * 1000:.0f} ms")
+
+        vectoriser(QUESTIONS[0][1])
+        latences, hits, attendus = [], 0, 0
+        for i in range(args.requetes):
+            if i % 2 == 0:
+                question = QUESTIONS[i // 2 % len(QUESTIONS)][1]
+                attendus += 1
+            else:
+                question = SANS_RAPPORT[i // 2 % len(SANS_RAPPORT)]
+            debut = time.perf_counter()
+            trouvee = cache.chercher(question, PORTEE)
+            latences.append((time.perf_counter() - debut) * 1000)
+            hits += trouvee is not None and trouvee[0].startswith('Réponse : ')
+        latences.sort()
+        print(f"Recherche ({args.requetes} requêtes, {hits}/{attendus} hits de la portée) : "
+              f"médiane {statistics.median(latences):.2f} ms, "
+              f"p95 {latences[int(len(latences) * 0.95)]:.2f} ms, max {latences[-1]:.2f} ms")
+        cache.fermer()
+
+
+if __name__ == '__main__':
+    main()
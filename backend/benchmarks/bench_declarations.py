@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la couche de données : latence des routes liste et détail des déclarations
+sur une base SQLite peuplée de N déclarations (2 biens chacune, recettes et dépenses)
+
+Usage : python benchmarks/bench_declarations.py --declarations 100000 --requetes 500
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from src.models.user import db  # noqa: E402
+from src.models.lmnp import Bien, Declaration, DepensesBien, RecettesBien  # noqa: E402
+from src.routes.lmnp_routes import lmnp_bp  # noqa: E402
+
+DECLARATIONS_PAR_UTILISATEUR = 10
+BIENS_PAR_DECLARATION = 2
+TAILLE_LOT = 20_000
+
+
+def creer_app(chemin: str) -> Flask:
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{chemin}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.register_blueprint(lmnp_bp, url_prefix='/api')
+    db.init_app(app)
+    return app
+
+
+def peupler(nombre: int, graine: int = 42):
+    """Insertions en masse (executemany), par lots"""
+    rng = random.Random(graine)
+    maintenant = datetime.now()
+    bien_id = 0
+    for debut in range(0, nombre, TAILLE_LOT):
+        declarations, biens, recettes, depenses = [], [], [], []
+        for declaration_id in range(debut + 1, min(debut + TAILLE_LOT, nombre) + 1):
+            declarations.append({
+                'id': declaration_id,
+                'user_id': (declaration_id - 1) // DECLARATIONS_PAR_UTILISATEUR + 1,
+                'annee': 2015 + (declaration_id - 1) % DECLARATIONS_PAR_UTILISATEUR,
+                'statut': 'complete', 'progression': 100, 'teletransmise': True,
+                'date_creation': maintenant, 'date_modification': maintenant
+            })
+            for _ in range(BIENS_PAR_DECLARATION):
+                bien_id += 1
+                biens.append({
+                    'id': bien_id, 'declaration_id': declaration_id,
+                    'adresse': f'{bien_id} avenue du Benchmark',
+                    'date_entree_lmnp': date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650)),
+                    'prix_acquisition': rng.randint(50_000, 900_000), 'frais_notaire': rng.randint(0, 30_000),
+                    'frais_agence': 0, 'part_terrain': 0.2, 'part_construction': 0.8,
+                    'duree_amortissement_construction': 25, 'duree_amortissement_frais': 15,
+                    'credit_bancaire': False
+                })
+                recettes.append({'bien_id': bien_id, 'loyers_bruts': rng.randint(5_000, 40_000), 'autres_recettes': 0})
+                depenses.append({'bien_id': bien_id, 'frais_gestion': rng.randint(0, 3_000),
+                                 'taxes_fonciere': rng.randint(0, 2_000)})
+        for modele, lignes in ((Declaration, declarations), (Bien, biens),
+                               (RecettesBien, recettes), (DepensesBien, depenses)):
+            db.session.execute(insert(modele), lignes)
+        db.session.commit()
+
+
+def mesurer(client, urls):
+    """Latences (ms) et nombre moyen de requêtes SQL par appel"""
+    requetes = []
+    ecouteur = lambda *args: requetes.append(1)  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', ecouteur)
+    latences = []
+    for url in urls:
+        debut = time.perf_counter()
+        reponse = client.get(url)
+        latences.append((time.perf_counter() - debut) * 1000)
+        assert reponse.status_code == 200, reponse.get_data(as_text=True)
+    event.remove(db.engine, 'before_cursor_execute', ecouteur)
+    latences.sort()
+    return statistics.median(latences), latences[int(len(latences) * 0.95)], len(requetes) / len(urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--declarations', type=int, default=100_000)
+    parser.add_argument('--requetes', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        app = creer_app(os.path.join(dossier, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            debut = time.perf_counter()
+            peupler(args.declarations)
+            print(f"Peuplement            : {args.declarations:,} déclarations en {time.perf_counter() - debut:.1f} s")
+
+            rng = random.Random(7)
+            utilisateurs = max(1, args.declarations // DECLARATIONS_PAR_UTILISATEUR)
+            client = app.test_client()
+            scenarios = {
+                'Liste (1re page)': [f'/api/declarations?user_id={rng.randint(1, utilisateurs)}&limite=5'
+                                     for _ in range(args.requetes)],
+                'Liste (page suivante)': [f'/api/declarations?user_id={rng.randint(1, utilisateurs)}&limite=5'
+                                          f'&apres=2020:{args.declarations + 1}' for _ in range(args.requetes)],
+                'Détail': [f'/api/declarations/{rng.randint(1, args.declarations)}' for _ in range(args.requetes)],
+            }
+            for libelle, urls in scenarios.items():
+                mediane, p95, requetes = mesurer(client, urls)
+                print(f"{libelle:<22}: médiane {mediane:.2f} ms, p95 {p95:.2f} ms, {requetes:.1f} requêtes SQL/appel")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark de contention SQLite : écrivains et lecteurs concurrents sur un même fichier,
+pragmas par défaut vs mode production (WAL, synchronous=NORMAL, mmap, busy_timeout)
+
+Usage : python benchmarks/bench_ecritures_concurrentes.py --ecrivains 8 --lecteurs 4 --transactions 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from src.base_donnees import creer_moteur  # noqa: E402
+
+
+def executer(mode: str, ecrivains: int, lecteurs: int, transactions: int):
+    with tempfile.TemporaryDirectory() as dossier:
+        moteur = creer_moteur(f"sqlite:///{os.path.join(dossier, 'bench.db')}", mode)
+        with moteur.begin() as connexion:
+            connexion.execute(text(
+                'CREATE TABLE ecritures (id INTEGER PRIMARY KEY, ecrivain INTEGER, montant NUMERIC(12, 2))'
+            ))
+
+        latences, erreurs, lectures = [], [], [0]
+        verrou = threading.Lock()
+        fin_ecritures = threading.Event()
+
+        def ecrire(numero):
+            for i in range(transactions):
+                debut = time.perf_counter()
+                try:
+                    with moteur.begin() as connexion:
+                        connexion.execute(text('INSERT INTO ecritures (ecrivain, montant) VALUES (:e, :m)'),
+                                          {'e': numero, 'm': i * 1.5})
+                        connexion.execute(text('UPDATE ecritures SET montant = montant + 1 WHERE id = :id'),
+                                          {'id': i + 1})
+                except OperationalError as e:
+                    with verrou:
+                        erreurs.append(str(e.orig))
+                    continue
+                with verrou:
+                    latences.append((time.perf_counter() - debut) * 1000)
+
+        def lire():
+            while not fin_ecritures.is_set():
+                try:
+                    with moteur.connect() as connexion:
+                        connexion.execute(text('SELECT ecrivain, SUM(montant) FROM ecritures GROUP BY ecrivain')).all()
+                    with verrou:
+                        lectures[0] += 1
+                except OperationalError as e:
+                    with verrou:
+                        erreurs.append(str(e.orig))
+
+        threads_lecture = [threading.Thread(target=lire) for _ in range(lecteurs)]
+        threads_ecriture = [threading.Thread(target=ecrire, args=(n,)) for n in range(ecrivains)]
+        debut = time.perf_counter()
+        for thread in threads_lecture + threads_ecriture:
+            thread.start()
+        for thread in threads_ecriture:
+            thread.join()
+        duree = time.perf_counter() - debut
+        fin_ecritures.set()
+        for thread in threads_lecture:
+            thread.join()
+        moteur.dispose()
+
+    latences.sort()
+    p95 = latences[int(len(latences) * 0.95)] if latences else float('nan')
+    print(f"{mode:<11}: {len(latences) / duree:8.0f} transactions/s, "
+          f"médiane {statistics.median(latences) if latences else float('nan'):6.2f} ms, p95 {p95:7.2f} ms, "
+          f"{lectures[0] / duree:7.0f} lectures/s, {len(erreurs)} erreur(s) 'database is locked'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ecrivains', type=int, default=8)
+    parser.add_argument('--lecteurs', type=int, default=4)
+    parser.add_argument('--transactions', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.ecrivains} écrivains × {args.transactions} transactions, {args.lecteurs} lecteurs")
+    for mode in ('defaut', 'production'):
+        executer(mode, args.ecrivains, args.lecteurs, args.transactions)
+
+
+if __name__ == '__main__':
+    main()
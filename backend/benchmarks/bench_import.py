@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'import en flux : N lignes de transactions CSV (ou XLSX) dans une base SQLite
+configurée comme en production, avec débit et mémoire maximale du processus
+
+Usage : python benchmarks/bench_import.py --lignes 500000 --biens 1000 [--format xlsx]
+"""
+
+import argparse
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from src.base_donnees import configurer_base_donnees  # noqa: E402
+from src.import_lmnp import RUBRIQUES, TAILLE_LOT_DEFAUT, importer_transactions, lire_lignes  # noqa: E402
+from src.models.user import db  # noqa: E402
+from src.models.lmnp import Bien, Declaration  # noqa: E402
+
+
+def memoire_max_mio() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generer_fichier(chemin: str, format: str, lignes: int, biens: int, graine: int = 42):
+    rng = random.Random(graine)
+    categories = list(RUBRIQUES)
+    en_tetes = ('bienId', 'date', 'categorie', 'montant', 'libelle')
+    valeurs = (
+        (rng.randint(1, biens), (date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))).isoformat(),
+         rng.choice(categories), f'{rng.randint(100, 500_000) / 100:.2f}', f'Opération {i}')
+        for i in range(lignes)
+    )
+    if format == 'csv':
+        with open(chemin, 'w', newline='', encoding='utf-8') as fichier:
+            ecrivain = csv.writer(fichier)
+            ecrivain.writerow(en_tetes)
+            ecrivain.writerows(valeurs)
+    else:
+        from openpyxl import Workbook
+        classeur = Workbook(write_only=True)
+        feuille = classeur.create_sheet()
+        feuille.append(en_tetes)
+        for ligne in valeurs:
+            feuille.append(ligne)
+        classeur.save(chemin)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lignes', type=int, default=500_000)
+    parser.add_argument('--biens', type=int, default=1000)
+    parser.add_argument('--format', choices=('csv', 'xlsx'), default='csv')
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT_DEFAUT)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, f'transactions.{args.format}')
+        generer_fichier(chemin, args.format, args.lignes, args.biens)
+        print(f"Fichier               : {args.lignes:,} lignes, {os.path.getsize(chemin) / 2**20:.1f} Mio ({args.format})")
+
+        app = Flask(__name__)
+        configurer_base_donnees(app, db, os.path.join(dossier, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            db.session.execute(insert(Declaration), [{'id': 1, 'user_id': 1, 'annee': 2024}])
+            db.session.execute(insert(Bien), [
+                {'id': i, 'declaration_id': 1, 'adresse': f'{i} rue du Benchmark',
+                 'date_entree_lmnp': date(2020, 1, 1), 'prix_acquisition': 150_000}
+                for i in range(1, args.biens + 1)
+            ])
+            db.session.commit()
+
+            memoire_avant = memoire_max_mio()
+            debut = time.perf_counter()
+            with open(chemin, 'rb') as fichier:
+                resume = importer_transactions(lire_lignes(fichier, args.format), args.taille_lot)
+            duree = time.perf_counter() - debut
+
+    print(f"Import                : {resume.lignes_importees:,} lignes en {duree:.2f} s "
+          f"({resume.lignes_importees / duree:,.0f} lignes/s, {resume.lots} lots)")
+    print(f"Biens totalisés       : {resume.biens_mis_a_jour}")
+    print(f"Mémoire max processus : {memoire_max_mio():.0f} Mio (avant import : {memoire_avant:.0f} Mio)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire : octets par bien (bien + recettes + dépenses + emprunt) selon la représentation
+- dataclasses classiques (dictionnaire par instance) et montants Decimal ;
+- dataclasses à slots (représentation actuelle) et montants Decimal ;
+- lots en colonnes (BiensLot, RecettesLot, DepensesLot, EmpruntsLot) en centimes.
+
+Les objets sont mesurés sur un échantillon puis extrapolés ; les lots sont construits
+à la taille complète. Les adresses ne sont pas comptées (inutiles aux calculs).
+
+Usage : python benchmarks/bench_memoire_biens.py --biens 1000000 --echantillon 100000
+"""
+
+import argparse
+import dataclasses
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.calculs_vectorises import BiensLot, DepensesLot, EmpruntsLot, RecettesLot  # noqa: E402
+from src.expertise_fiscale_lmnp import BienImmobilier, Depenses, Emprunt, Recettes  # noqa: E402
+
+CLASSES = (BienImmobilier, Recettes, Depenses, Emprunt)
+
+
+def sans_slots(classe):
+    """Équivalent de la dataclass sans slots (représentation d'origine)"""
+    return dataclasses.make_dataclass(
+        classe.__name__ + 'Dict',
+        [(champ.name, champ.type, champ) for champ in dataclasses.fields(classe)]
+    )
+
+
+def generer_objets(nombre: int, classes, graine: int = 42):
+    bien_cls, recettes_cls, depenses_cls, emprunt_cls = classes
+    rng = np.random.default_rng(graine)
+    montants = rng.integers(0, 100_000_000, size=(nombre, 4 + 2 + 15 + 1)).tolist()
+    jours = rng.integers(0, 3650, size=nombre).tolist()
+    debut = date(2015, 1, 1)
+    objets = []
+    for i in range(nombre):
+        m = [Decimal(v) / 100 for v in montants[i]]
+        objets.append((
+            bien_cls(i, '', debut + timedelta(days=jours[i]), m[0], m[1], m[2]),
+            recettes_cls(m[4], m[5]),
+            depenses_cls(*m[6:21]),
+            emprunt_cls(m[21])
+        ))
+    return objets
+
+
+def mesurer(fabrique):
+    """Octets alloués (tracemalloc) et objet construit"""
+    gc.collect()
+    tracemalloc.start()
+    avant = tracemalloc.get_traced_memory()[0]
+    objet = fabrique()
+    apres = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return apres - avant, objet
+
+
+def generer_lots(nombre: int, graine: int = 42):
+    rng = np.random.default_rng(graine)
+    biens = BiensLot(
+        ids=np.arange(nombre, dtype=np.int64),
+        prix_acquisition=rng.integers(5_000_000, 90_000_000, size=nombre),
+        frais_notaire=rng.integers(0, 3_000_000, size=nombre),
+        frais_agence=rng.integers(0, 1_500_000, size=nombre),
+        part_construction=np.full(nombre, 8000, dtype=np.int16),
+        date_entree_lmnp=np.datetime64('2015-01-01') + rng.integers(0, 3650, size=nombre).astype('timedelta64[D]'),
+        duree_amortissement_construction=np.full(nombre, 25, dtype=np.int16),
+        duree_amortissement_frais=np.full(nombre, 15, dtype=np.int16)
+    )
+    lots = [biens]
+    for classe in (RecettesLot, DepensesLot, EmpruntsLot):
+        lots.append(classe(rng.integers(0, 100_000_000, size=(nombre, len(classe.champs())))))
+    return lots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--biens', type=int, default=1_000_000)
+    parser.add_argument('--echantillon', type=int, default=100_000)
+    args = parser.parse_args()
+    echantillon = min(args.echantillon, args.biens)
+
+    classes_dict = tuple(sans_slots(classe) for classe in CLASSES)
+    octets_dict, objets = mesurer(lambda: generer_objets(echantillon, classes_dict))
+    del objets
+    octets_slots, objets = mesurer(lambda: generer_objets(echantillon, CLASSES))
+    del objets
+    octets_lots, lots = mesurer(lambda: generer_lots(args.biens))
+    nbytes_lots = sum(lot.nbytes for lot in lots)
+
+    par_bien = [
+        ('Dataclasses + Decimal', octets_dict / echantillon),
+        ('Slots + Decimal', octets_slots / echantillon),
+        ('Lots en colonnes', octets_lots / args.biens),
+    ]
+    print(f"{'Biens':<24}: {args.biens:,} (objets mesurés sur {echantillon:,})")
+    for libelle, octets in par_bien:
+        print(f"{libelle:<24}: {octets:8.1f} octets/bien, {octets * args.biens / 2**20:9.1f} Mio au total")
+    print(f"{'Colonnes (nbytes)':<24}: {nbytes_lots / args.biens:8.1f} octets/bien")
+    print(f"{'Gain slots / colonnes':<24}: x{par_bien[0][1] / par_bien[1][1]:.2f} / x{par_bien[0][1] / par_bien[2][1]:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark : latence par appel du moteur Decimal vs moteur en centimes entiers
+
+Usage : python benchmarks/bench_moteur_centimes.py --appels 20000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.expertise_fiscale_lmnp import calculer_resultat_fiscal, optimiser_regime  # noqa: E402
+
+BIEN = {
+    'id': 1,
+    'adresse': '123 Rue de la Paix, 75001 Paris',
+    'date_entree_lmnp': date(2022, 4, 12),
+    'prix_acquisition': 200000.0,
+    'frais_notaire': 15000.0,
+    'frais_agence': 5000.0
+}
+RECETTES = {'loyers_bruts': 24000.0, 'autres_recettes': 350.5}
+DEPENSES = {
+    'frais_gestion': 2400.0, 'charges_copropriete': 3600.0, 'assurances': 800.25,
+    'taxes_fonciere': 1200.0, 'cfe': 227.0, 'frais_comptabilite': 450.0
+}
+EMPRUNT = {'interets_annuels': 4800.0, 'assurance_emprunt': 600.0}
+
+
+def mesurer(fonction, appels: int) -> float:
+    """Latence médiane par appel (µs) sur 5 répétitions"""
+    durees = timeit.repeat(fonction, number=appels, repeat=5)
+    return sorted(durees)[2] / appels * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--appels', type=int, default=20_000)
+    args = parser.parse_args()
+
+    scenarios = {
+        'calculer_resultat_fiscal': lambda moteur: (
+            lambda: calculer_resultat_fiscal(BIEN, RECETTES, DEPENSES, EMPRUNT, moteur=moteur)),
+        'optimiser_regime': lambda moteur: (
+            lambda: optimiser_regime(24350.5, 9277.25, moteur=moteur)),
+    }
+
+    print(f"{'Fonction':<28}{'Decimal (µs)':>14}{'Centimes (µs)':>16}{'Gain':>8}")
+    for nom, fabrique in scenarios.items():
+        latence_decimal = mesurer(fabrique('decimal'), args.appels)
+        latence_centimes = mesurer(fabrique('centimes'), args.appels)
+        print(f"{nom:<28}{latence_decimal:>14.2f}{latence_centimes:>16.2f}"
+              f"{latence_decimal / latence_centimes:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark du partitionnement par cabinet : des écrivains concurrents (un cabinet chacun)
+créent déclarations et biens à travers l'API, dans un fichier SQLite unique
+puis avec une base SQLite par cabinet (LMNP_PARTITIONS=sqlite)
+
+Usage : python benchmarks/bench_partitions.py --cabinets 8 --ecritures 100
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from src.base_donnees import configurer_base_donnees  # noqa: E402
+from src.models.user import db  # noqa: E402
+from src.partitions import configurer_partitions  # noqa: E402
+from src.routes.lmnp_routes import lmnp_bp  # noqa: E402
+
+
+def executer(partitionne: bool, cabinets: int, ecritures: int):
+    with tempfile.TemporaryDirectory() as dossier:
+        if partitionne:
+            os.environ['LMNP_PARTITIONS'] = 'sqlite'
+        else:
+            os.environ.pop('LMNP_PARTITIONS', None)
+        app = Flask(__name__)
+        app.register_blueprint(lmnp_bp, url_prefix='/api')
+        configurer_base_donnees(app, db, os.path.join(dossier, 'app.db'))
+        routeur = configurer_partitions(app, db, os.path.join(dossier, 'cabinets'))
+        with app.app_context():
+            db.create_all()
+
+        latences, erreurs = [], []
+        verrou = threading.Lock()
+
+        def ecrire(numero):
+            client = app.test_client()
+            entetes = {'X-User-Id': '1', **({'X-Tenant-Id': f'cabinet{numero}'} if partitionne else {})}
+            for i in range(ecritures):
+                debut = time.perf_counter()
+                declaration = client.post('/api/declarations', json={'annee': 2024}, headers=entetes)
+                bien = client.post('/api/biens', headers=entetes, json={
+                    'declarationId': declaration.get_json()['declaration']['id'] if declaration.status_code == 201 else 0,
+                    'adresse': f'{i} rue du Benchmark', 'dateEntreeLmnp': '2021-01-01', 'prixAcquisition': 150000
+                })
+                with verrou:
+                    if declaration.status_code == 201 and bien.status_code == 201:
+                        latences.append((time.perf_counter() - debut) * 1000)
+                    else:
+                        erreurs.append(bien.get_json().get('error'))
+
+        threads = [threading.Thread(target=ecrire, args=(n,)) for n in range(cabinets)]
+        debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+        if routeur is not None:
+            routeur.fermer()
+        with app.app_context():
+            db.engine.dispose()
+
+    latences.sort()
+    p95 = latences[int(len(latences) * 0.95)] if latences else float('nan')
+    nom = 'une base par cabinet' if partitionne else 'fichier unique'
+    print(f"{nom:<21}: {len(latences) / duree:7.0f} écritures/s, médiane "
+          f"{statistics.median(latences) if latences else float('nan'):6.1f} ms, p95 {p95:7.1f} ms, "
+          f"{len(erreurs)} erreur(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cabinets', type=int, default=8)
+    parser.add_argument('--ecritures', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{args.cabinets} cabinets × {args.ecritures} écritures (déclaration + bien)")
+    for partitionne in (False, True):
+        executer(partitionne, args.cabinets, args.ecritures)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark du provisionnement d'utilisateurs : N requêtes POST /api/users (un commit chacune)
+contre des requêtes POST /api/users/bulk (une transaction par lot), base SQLite fichier
+
+Usage : python benchmarks/bench_users_bulk.py --utilisateurs 5000 [--mode defaut]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from src.base_donnees import configurer_base_donnees  # noqa: E402
+from src.models.user import db  # noqa: E402
+from src.routes.user import TAILLE_MAX_BULK, user_bp  # noqa: E402
+
+
+def creer_application(chemin: str) -> Flask:
+    app = Flask(__name__)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    configurer_base_donnees(app, db, chemin)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def par_ligne(client, utilisateurs):
+    for nom in utilisateurs:
+        assert client.post('/api/users', json={'username': nom, 'email': f'{nom}@exemple.fr'}).status_code == 201
+
+
+def en_masse(client, utilisateurs):
+    for debut in range(0, len(utilisateurs), TAILLE_MAX_BULK):
+        operations = [{'op': 'create', 'username': nom, 'email': f'{nom}@exemple.fr'}
+                      for nom in utilisateurs[debut:debut + TAILLE_MAX_BULK]]
+        assert client.post('/api/users/bulk', json={'operations': operations}).get_json()['rejetees'] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--utilisateurs', type=int, default=5000)
+    parser.add_argument('--mode', choices=('defaut', 'production'), default='production')
+    args = parser.parse_args()
+    os.environ['LMNP_SQLITE_MODE'] = args.mode
+
+    utilisateurs = [f'client{i:07d}' for i in range(args.utilisateurs)]
+    print(f"{args.utilisateurs:,} créations d'utilisateurs, SQLite mode {args.mode}")
+    durees = {}
+    for nom, methode in (('par ligne', par_ligne), ('bulk', en_masse)):
+        with tempfile.TemporaryDirectory() as dossier:
+            app = creer_application(os.path.join(dossier, 'bench.db'))
+            debut = time.perf_counter()
+            methode(app.test_client(), utilisateurs)
+            durees[nom] = time.perf_counter() - debut
+            with app.app_context():
+                db.engine.dispose()
+        print(f"{nom:<10}: {durees[nom]:7.2f} s ({args.utilisateurs / durees[nom]:9,.0f} utilisateurs/s)")
+    print(f"Accélération : x{durees['par ligne'] / durees['bulk']:.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Serveur local imitant l'API chat completions d'OpenAI, pour les tests et benchmarks
+des agents IA : réponse fixe après un délai choisi selon le prompt système
+(OPENAI_API_BASE=serveur.url). Serveur aiohttp sur sa propre boucle, dans un thread :
+les délais simulés n'occupent pas de thread. Avec stream=true, la réponse est envoyée
+mot à mot en server-sent events, à delai_jeton d'intervalle.
+"""
+
+from typing import Dict, Optional, Set, Tuple
+import asyncio
+import json
+import re
+import threading
+import time
+
+from aiohttp import web
+
+
+class ServeurLLMFactice:
+    """
+    delais : fragment du prompt système -> délai de réponse (secondes) ;
+    delai_defaut pour les autres prompts (délai avant le premier jeton en flux) ;
+    mots : longueur de la réponse générée
+    """
+
+    def __init__(self, delais: Optional[Dict[str, float]] = None, delai_defaut: float = 0.0,
+                 delai_jeton: float = 0.0, mots: int = 0):
+        self.delais = delais or {}
+        self.delai_defaut = delai_defaut
+        self.delai_jeton = delai_jeton
+        self.mots = mots
+        self.appels = 0
+        self.flux_interrompus = 0
+        # Adresses des clients (hôte, port) : une par connexion TCP ouverte
+        self._pairs: Set[Tuple] = set()
+        self._boucle = asyncio.new_event_loop()
+        self._runner: Optional[web.AppRunner] = None
+        self._port = 0
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._port}/v1'
+
+    @property
+    def connexions(self) -> int:
+        return len(self._pairs)
+
+    def delai(self, messages) -> float:
+        systeme = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+        return next((d for fragment, d in self.delais.items() if fragment in systeme), self.delai_defaut)
+
+    def contenu(self, corps: Dict) -> str:
+        question = corps.get('messages', [{}])[-1].get('content', '')
+        return f'Réponse factice ({len(question)} caractères)' + ''.join(f' mot{i}' for i in range(self.mots))
+
+    def completion(self, corps: Dict) -> Dict:
+        return {
+            'id': 'chatcmpl-factice', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': corps.get('model', 'gpt-4'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': self.contenu(corps)}}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        }
+
+    async def _repondre(self, requete: web.Request) -> web.StreamResponse:
+        corps = await requete.json()
+        self.appels += 1
+        self._pairs.add(requete.transport.get_extra_info('peername'))
+        await asyncio.sleep(self.delai(corps.get('messages', [])))
+        mots = re.findall(r'\s*\S+', self.contenu(corps))
+        if not corps.get('stream'):
+            # Même durée de génération qu'en flux
+            await asyncio.sleep(self.delai_jeton * (len(mots) - 1))
+            return web.json_response(self.completion(corps))
+
+        reponse = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await reponse.prepare(requete)
+        try:
+            for i, mot in enumerate(mots):
+                if i:
+                    await asyncio.sleep(self.delai_jeton)
+                await reponse.write(self._evenement(corps, {'content': mot}))
+            await reponse.write(self._evenement(corps, {}, fin=True))
+            await reponse.write(b'data: [DONE]\n\n')
+        except (ConnectionResetError, asyncio.CancelledError):
+            self.flux_interrompus += 1
+            raise
+        return reponse
+
+    @staticmethod
+    def _evenement(corps: Dict, delta: Dict, fin: bool = False) -> bytes:
+        morceau = {
+            'id': 'chatcmpl-factice', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+            'model': corps.get('model', 'gpt-4'),
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': 'stop' if fin else None}],
+        }
+        return f'data: {json.dumps(morceau)}\n\n'.encode()
+
+    async def _demarrer(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self._repondre)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0, backlog=1024)
+        await site.start()
+        self._port = self._runner.addresses[0][1]
+
+    def demarrer(self) -> 'ServeurLLMFactice':
+        threading.Thread(target=self._boucle.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._demarrer(), self._boucle).result()
+        return self
+
+    def arreter(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._boucle).result()
+        self._boucle.call_soon_threadsafe(self._boucle.stop)
+
+    def __enter__(self) -> 'ServeurLLMFactice':
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
@@ -5,20 +5,131 @@ Architecture avec 3 agents experts selon les spécifications
 """
 
 import os
-import json
+import time
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from enum import Enum
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from datetime import datetime
 
-# Configuration OpenAI
-client = OpenAI(
+from src.cache_agents import cache_reponses_agents, cle_reponse
+from src.cache_semantique import cache_semantique_fiscal
+from src.prompts_agents import CompteurTokens, ajuster_contexte, mesures_prompts
+from src.transport_http import TransportAiohttp
+
+MODELE = "gpt-4"
+compteur_tokens = CompteurTokens(MODELE)
+compteur_tokens.prechauffer()
+
+# Délai maximal d'un agent (secondes) et appels simultanés au modèle
+DELAI_AGENT = float(os.environ.get('LMNP_AGENTS_DELAI', 60))
+MAX_APPELS_AGENTS = int(os.environ.get('LMNP_AGENTS_PARALLELES', 16))
+
+# Configuration OpenAI : client asynchrone unique, utilisé sur la boucle partagée
+# (src/boucle_asynchrone.py) ; ses connexions HTTP restent ouvertes d'une requête à l'autre
+# et les appels au-delà de MAX_APPELS_AGENTS attendent une connexion libre
+client = AsyncOpenAI(
     api_key=os.environ.get('OPENAI_API_KEY'),
-    base_url=os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1')
+    base_url=os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1'),
+    timeout=DELAI_AGENT,
+    http_client=DefaultAsyncHttpxClient(transport=TransportAiohttp(MAX_APPELS_AGENTS))
 )
 
+
+def cle_demande(agent, user_input: str, context: Optional[Dict[str, Any]]) -> str:
+    """Clé du cache des réponses pour la demande faite à un agent"""
+    return cle_reponse(agent.agent_type.value, agent.VERSION_PROMPT, user_input, context, {
+        "model": MODELE, "temperature": agent.TEMPERATURE, "max_tokens": agent.MAX_TOKENS
+    })
+
+
+def preparer_appel(agent, user_input: str, context: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Paramètres chat completions de la demande faite à un agent, contexte ramené à son
+    budget de tokens (src/prompts_agents.py), et mesures du prompt
+    """
+    contexte, tokens_contexte, contexte_reduit = ajuster_contexte(
+        context, agent.BUDGET_CONTEXTE, compteur_tokens, agent.CHAMPS_PRIORITAIRES
+    )
+    messages = agent.construire_messages(user_input, contexte)
+    parametres = {
+        "model": MODELE,
+        "messages": messages,
+        "temperature": agent.TEMPERATURE,
+        "max_tokens": agent.MAX_TOKENS
+    }
+    return parametres, {
+        "agent": agent.agent_type.value,
+        "tokens_prompt": compteur_tokens.compter_messages(messages),
+        "tokens_contexte": tokens_contexte,
+        "contexte_reduit": contexte_reduit
+    }
+
+
+async def lire_caches(agent, user_input: str, context: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Réponse déjà obtenue pour la même demande (src/cache_agents.py) ou, pour les agents
+    dotés d'un CACHE_SEMANTIQUE, pour une question proche (src/cache_semantique.py)
+    """
+    contenu = await cache_reponses_agents.lire(cle_demande(agent, user_input, context))
+    semantique = getattr(agent, 'CACHE_SEMANTIQUE', None)
+    if contenu is None and semantique is not None:
+        contenu = await semantique.lire(user_input, cle_demande(agent, '', context))
+    return contenu
+
+
+async def ecrire_caches(agent, user_input: str, context: Optional[Dict[str, Any]], contenu: str, tokens: int):
+    await cache_reponses_agents.ecrire(cle_demande(agent, user_input, context), contenu, tokens)
+    semantique = getattr(agent, 'CACHE_SEMANTIQUE', None)
+    if semantique is not None:
+        await semantique.ecrire(user_input, cle_demande(agent, '', context), contenu, tokens)
+
+
+async def completer(agent, user_input: str, context: Optional[Dict[str, Any]]) -> str:
+    """
+    Réponse du modèle à la demande d'un agent ; rejouée depuis les caches si la même
+    demande (ou, pour l'agent fiscal, une question proche) a déjà abouti
+    """
+    contenu = await lire_caches(agent, user_input, context)
+    if contenu is None:
+        parametres, prompt = preparer_appel(agent, user_input, context)
+        debut = time.perf_counter()
+        response = await client.chat.completions.create(**parametres)
+        mesures_prompts.enregistrer(latence_ms=(time.perf_counter() - debut) * 1000, **prompt)
+        contenu = response.choices[0].message.content
+        await ecrire_caches(agent, user_input, context, contenu, response.usage.total_tokens if response.usage else 0)
+    return contenu
+
+
+async def diffuser(agent, user_input: str, context: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Fragments de la réponse au fil de leur génération (une réponse en cache est rejouée
+    d'un bloc) ; la réponse n'est mise en cache que si le flux va à son terme
+    """
+    contenu = await lire_caches(agent, user_input, context)
+    if contenu is not None:
+        yield contenu
+        return
+
+    parametres, prompt = preparer_appel(agent, user_input, context)
+    debut = time.perf_counter()
+    fragments, tokens = [], 0
+    flux = await client.chat.completions.create(**parametres, stream=True, stream_options={"include_usage": True})
+    try:
+        async for morceau in flux:
+            if morceau.usage:
+                tokens = morceau.usage.total_tokens
+            if morceau.choices and morceau.choices[0].delta.content:
+                fragments.append(morceau.choices[0].delta.content)
+                yield fragments[-1]
+    finally:
+        # Flux abandonné (client déconnecté, délai dépassé) : la connexion au modèle est fermée
+        await flux.close()
+    mesures_prompts.enregistrer(latence_ms=(time.perf_counter() - debut) * 1000, flux=True, **prompt)
+    await ecrire_caches(agent, user_input, context, "".join(fragments), tokens)
+
 logger = logging.getLogger(__name__)
 
 class AgentType(Enum):
@@ -48,6 +159,14 @@ class AgentProduit:
     - Créer le cahier des charges de chaque fonctionnalité
     """
     
+    # À incrémenter à chaque modification du prompt : invalide les réponses en cache
+    VERSION_PROMPT = '2024.2'
+    TEMPERATURE = 0.3
+    MAX_TOKENS = 2000
+    # Tokens alloués au contexte JSON, et ses champs à préserver en priorité
+    BUDGET_CONTEXTE = 1000
+    CHAMPS_PRIORITAIRES = ('experience', 'nombreBiens', 'typeInvestissement', 'fonctionnalite')
+    
     def __init__(self):
         self.agent_type = AgentType.PRODUIT
         self.expertise = [
@@ -83,28 +202,22 @@ RÉPONSES :
 - Wireframes en format textuel
 - Recommandations UX/UI"""
 
-    def process_request(self, user_input: str, context: Dict[str, Any] = None) -> AgentResponse:
-        """Traite une demande utilisateur et génère les spécifications produit"""
-        try:
-            messages = [
-                {"role": "system", "content": self.get_system_prompt()},
-                {"role": "user", "content": f"""
-Contexte LMNP : {json.dumps(context or {}, indent=2)}
+    def construire_messages(self, user_input: str, contexte: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.get_system_prompt()},
+            {"role": "user", "content": f"""
+Contexte LMNP : {contexte}
 
 Demande utilisateur : {user_input}
 
 Génère les spécifications produit pour répondre à ce besoin en suivant l'approche "less is more".
 """}
-            ]
-            
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                temperature=0.3,
-                max_tokens=2000
-            )
-            
-            content = response.choices[0].message.content
+        ]
+
+    async def process_request(self, user_input: str, context: Dict[str, Any] = None) -> AgentResponse:
+        """Traite une demande utilisateur et génère les spécifications produit"""
+        try:
+            content = await completer(self, user_input, context)
             
             return AgentResponse(
                 agent_type=self.agent_type,
@@ -140,6 +253,14 @@ class AgentDeveloppeur:
     - Maintenir une architecture scalable
     """
     
+    # À incrémenter à chaque modification du prompt : invalide les réponses en cache
+    VERSION_PROMPT = '2024.2'
+    TEMPERATURE = 0.2
+    MAX_TOKENS = 3000
+    # Tokens alloués au contexte JSON, et ses champs à préserver en priorité
+    BUDGET_CONTEXTE = 1500
+    CHAMPS_PRIORITAIRES = ('langage', 'specifications', 'stack')
+    
     def __init__(self):
         self.agent_type = AgentType.DEVELOPPEUR
         self.expertise = [
@@ -177,28 +298,22 @@ RÉPONSES :
 - APIs documentées avec exemples
 - Scripts de déploiement et configuration"""
 
-    def process_request(self, user_input: str, context: Dict[str, Any] = None) -> AgentResponse:
-        """Traite une demande de développement et génère le code/architecture"""
-        try:
-            messages = [
-                {"role": "system", "content": self.get_system_prompt()},
-                {"role": "user", "content": f"""
-Spécifications techniques : {json.dumps(context or {}, indent=2)}
+    def construire_messages(self, user_input: str, contexte: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.get_system_prompt()},
+            {"role": "user", "content": f"""
+Spécifications techniques : {contexte}
 
 Demande de développement : {user_input}
 
 Génère le code et l'architecture technique pour implémenter cette fonctionnalité.
 """}
-            ]
-            
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                temperature=0.2,
-                max_tokens=3000
-            )
-            
-            content = response.choices[0].message.content
+        ]
+
+    async def process_request(self, user_input: str, context: Dict[str, Any] = None) -> AgentResponse:
+        """Traite une demande de développement et génère le code/architecture"""
+        try:
+            content = await completer(self, user_input, context)
             
             return AgentResponse(
                 agent_type=self.agent_type,
@@ -233,6 +348,17 @@ class AgentFiscal:
     - Assurer la conformité réglementaire et les mises à jour fiscales
     """
     
+    # À incrémenter à chaque modification du prompt : invalide les réponses en cache
+    VERSION_PROMPT = '2024.2'
+    TEMPERATURE = 0.1
+    MAX_TOKENS = 2500
+    # Tokens alloués au contexte JSON, et ses champs à préserver en priorité
+    BUDGET_CONTEXTE = 3000
+    CHAMPS_PRIORITAIRES = ('calculs', 'recettes', 'charges', 'regime', 'nombreBiens', 'annee', 'biens',
+                           'amortissements')
+    # Réponses rejouées pour les questions reformulées (même contexte)
+    CACHE_SEMANTIQUE = cache_semantique_fiscal
+    
     def __init__(self):
         self.agent_type = AgentType.FISCAL
         self.expertise = [
@@ -270,28 +396,22 @@ RÉPONSES :
 - Optimisations recommandées
 - Validation de conformité"""
 
-    def process_request(self, user_input: str, context: Dict[str, Any] = None) -> AgentResponse:
-        """Traite une demande fiscale et génère les calculs/règles appropriés"""
-        try:
-            messages = [
-                {"role": "system", "content": self.get_system_prompt()},
-                {"role": "user", "content": f"""
-Données fiscales : {json.dumps(context or {}, indent=2)}
+    def construire_messages(self, user_input: str, contexte: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.get_system_prompt()},
+            {"role": "user", "content": f"""
+Données fiscales : {contexte}
 
 Question fiscale : {user_input}
 
 Fournis les calculs fiscaux précis et les règles applicables selon la réglementation LMNP.
 """}
-            ]
-            
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                temperature=0.1,
-                max_tokens=2500
-            )
-            
-            content = response.choices[0].message.content
+        ]
+
+    async def process_request(self, user_input: str, context: Dict[str, Any] = None) -> AgentResponse:
+        """Traite une demande fiscale et génère les calculs/règles appropriés"""
+        try:
+            content = await completer(self, user_input, context)
             
             return AgentResponse(
                 agent_type=self.agent_type,
@@ -320,15 +440,17 @@ class OrchestrateursAgentsIA:
     🎭 Orchestrateur des Agents IA Spécialisés
     
     Gère le routage intelligent des requêtes vers les agents appropriés
-    et coordonne les réponses multi-agents pour des demandes complexes
+    et coordonne les réponses multi-agents pour des demandes complexes :
+    les agents sont consultés simultanément, chacun dans la limite de delai_agent
     """
     
-    def __init__(self):
+    def __init__(self, delai_agent: float = DELAI_AGENT):
         self.agents = {
             AgentType.PRODUIT: AgentProduit(),
             AgentType.DEVELOPPEUR: AgentDeveloppeur(),
             AgentType.FISCAL: AgentFiscal()
         }
+        self.delai_agent = delai_agent
         
     def detect_agent_needed(self, user_input: str) -> List[AgentType]:
         """Détecte quel(s) agent(s) sont nécessaires pour traiter la demande"""
@@ -370,24 +492,80 @@ class OrchestrateursAgentsIA:
         return agents_needed
     
     async def process_request(self, user_input: str, context: Dict[str, Any] = None) -> List[AgentResponse]:
-        """Traite une demande en routant vers les agents appropriés"""
+        """
+        Traite une demande en routant vers les agents appropriés, consultés en parallèle :
+        la latence est celle de l'agent le plus lent. Un agent en retard ou en erreur
+        donne une réponse de confiance nulle (metadata["error"]) sans bloquer les autres.
+        """
         agents_needed = self.detect_agent_needed(user_input)
-        responses = []
-        
-        for agent_type in agents_needed:
-            agent = self.agents[agent_type]
-            response = agent.process_request(user_input, context)
-            responses.append(response)
-            
-        return responses
+        return list(await asyncio.gather(*(
+            self._consulter(agent_type, user_input, context) for agent_type in agents_needed
+        )))
     
     async def get_agent_response(self, agent_type: AgentType, user_input: str, context: Dict[str, Any] = None) -> AgentResponse:
         """Obtient une réponse d'un agent spécifique"""
         if agent_type not in self.agents:
             raise ValueError(f"Agent type {agent_type} not found")
             
+        return await self._consulter(agent_type, user_input, context)
+
+    async def diffuser_request(self, user_input: str, context: Dict[str, Any] = None,
+                               agents: Optional[List[AgentType]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Événements d'une consultation en parallèle des agents détectés (ou de ceux indiqués) :
+        "debut" et "fin" de chaque agent, "jeton" à chaque fragment reçu, "termine" en dernier.
+        Fermer le générateur (client déconnecté) annule les appels en cours.
+        """
+        agents = agents or self.detect_agent_needed(user_input)
+        file: asyncio.Queue = asyncio.Queue()
+
+        async def transmettre(agent_type: AgentType):
+            async for fragment in diffuser(self.agents[agent_type], user_input, context):
+                await file.put({"type": "jeton", "agent": agent_type.value, "texte": fragment})
+
+        async def consulter(agent_type: AgentType):
+            await file.put({"type": "debut", "agent": agent_type.value})
+            erreur = None
+            try:
+                await asyncio.wait_for(transmettre(agent_type), self.delai_agent)
+            except asyncio.TimeoutError:
+                logger.warning(f"Agent {agent_type.value}: flux interrompu après {self.delai_agent:g} s")
+                erreur = "timeout"
+            except Exception as e:
+                logger.error(f"Erreur flux {agent_type.value}: {e}")
+                erreur = str(e)
+            await file.put({"type": "fin", "agent": agent_type.value, "erreur": erreur})
+
+        taches = [asyncio.create_task(consulter(agent_type)) for agent_type in agents]
+        try:
+            termines, en_echec = 0, []
+            while termines < len(taches):
+                evenement = await file.get()
+                if evenement["type"] == "fin":
+                    termines += 1
+                    if evenement["erreur"]:
+                        en_echec.append(evenement["agent"])
+                yield evenement
+            yield {"type": "termine", "agents_consultes": [agent_type.value for agent_type in agents],
+                   "agents_en_echec": en_echec}
+        finally:
+            for tache in taches:
+                tache.cancel()
+            await asyncio.gather(*taches, return_exceptions=True)
+
+    async def _consulter(self, agent_type: AgentType, user_input: str, context: Dict[str, Any] = None) -> AgentResponse:
         agent = self.agents[agent_type]
-        return agent.process_request(user_input, context)
+        try:
+            return await asyncio.wait_for(agent.process_request(user_input, context), self.delai_agent)
+        except asyncio.TimeoutError:
+            logger.warning(f"Agent {agent_type.value}: pas de réponse après {self.delai_agent:g} s")
+            return AgentResponse(
+                agent_type=agent_type,
+                content=f"Délai dépassé : l'agent n'a pas répondu en {self.delai_agent:g} s",
+                confidence=0.0,
+                metadata={"error": "timeout", "delai": self.delai_agent},
+                timestamp=datetime.now()
+            )
 
 # Instance globale de l'orchestrateur
 orchestrateur = OrchestrateursAgentsIA()
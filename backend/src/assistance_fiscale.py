@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Réponses calculées des routes d'assistance fiscale des agents IA
+Les demandes structurées de /api/agents/assistance/calculs et /optimisation (recettes,
+charges, nombreBiens, regime, ou un bien avec ses recettes et dépenses) sont calculées
+par ExpertiseFiscaleLMNP et expliquées par un texte modèle, sans appel au modèle de
+langage : quelques millisecondes au lieu de plusieurs secondes, et des montants exacts.
+L'agent fiscal n'est consulté que pour une question libre (il reçoit alors ces calculs
+dans son contexte) ou des données non reconnues.
+"""
+
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+import unicodedata
+
+from src.declaration_lmnp import depenses_depuis_json, emprunt_depuis_json, recettes_depuis_json
+from src.expertise_fiscale_lmnp import Amortissement, BienImmobilier, expert_fiscal
+
+# Correspondance des champs JSON d'un bien (camelCase) vers BienImmobilier
+BIEN_JSON = {
+    'prixAcquisition': 'prix_acquisition',
+    'fraisNotaire': 'frais_notaire',
+    'fraisAgence': 'frais_agence',
+    'partTerrain': 'part_terrain',
+    'partConstruction': 'part_construction'
+}
+
+LIBELLES_REGIMES = {'micro_bic': 'micro-BIC', 'reel': 'régime réel'}
+# Montants détaillés attendus avec un bien (messages d'erreur)
+EXEMPLES_DETAILLES = {
+    'recettes': '{"loyersBruts": 12000}',
+    'depenses': '{"taxeFonciere": 900}',
+    'emprunt': '{"interetsAnnuels": 3000}',
+}
+
+
+def montant(valeur: Any) -> Optional[Decimal]:
+    """Montant positif ou nul d'un champ JSON (nombre ou texte comme "12 500,50 €"), None sinon"""
+    if isinstance(valeur, bool) or valeur is None:
+        return None
+    if isinstance(valeur, str):
+        for separateur in ('€', ' ', '\xa0', '\u202f'):
+            valeur = valeur.replace(separateur, '')
+        valeur = valeur.replace(',', '.')
+    try:
+        resultat = Decimal(str(valeur))
+    except InvalidOperation:
+        return None
+    return resultat if resultat.is_finite() and resultat >= 0 else None
+
+
+def euros(valeur: Decimal) -> str:
+    return f"{valeur:,.2f} €".replace(',', ' ').replace('.', ',')
+
+
+def normaliser_regime(regime: Any) -> Optional[str]:
+    """'micro_bic' ou 'reel' pour les libellés usuels ("Micro-BIC", "réel"...), None sinon"""
+    if not isinstance(regime, str):
+        return None
+    texte = unicodedata.normalize('NFKD', regime.lower())
+    texte = ''.join(caractere for caractere in texte if not unicodedata.combining(caractere))
+    if texte.startswith('micro'):
+        return 'micro_bic'
+    if 'reel' in texte:
+        return 'reel'
+    return None
+
+
+def bien_depuis_json(data: Dict) -> BienImmobilier:
+    """Construit un BienImmobilier à partir du payload du frontend (ValueError si invalide)"""
+    valeurs = {}
+    for cle, champ in BIEN_JSON.items():
+        if data.get(cle) is not None:
+            valeurs[champ] = montant(data[cle])
+            if valeurs[champ] is None:
+                raise ValueError(f"Montant invalide pour {cle}: {data[cle]!r}")
+    return BienImmobilier(
+        id=data.get('id', 0),
+        adresse=data.get('adresse', ''),
+        date_entree_lmnp=date.fromisoformat(data['dateEntreeLmnp']),
+        prix_acquisition=valeurs.pop('prix_acquisition'),
+        frais_notaire=valeurs.pop('frais_notaire', Decimal('0')),
+        frais_agence=valeurs.pop('frais_agence', Decimal('0')),
+        duree_amortissement_construction=int(data.get('dureeAmortissementConstruction', 25)),
+        duree_amortissement_frais=int(data.get('dureeAmortissementFrais', 15)),
+        **valeurs
+    )
+
+
+@dataclass
+class CalculAssistance:
+    """Calculs d'une demande structurée"""
+    recettes: Decimal
+    charges: Decimal
+    amortissements: Decimal
+    nombre_biens: Optional[int]
+    regime_actuel: Optional[str]
+    optimisation: Dict[str, Any]
+    charges_equilibre: Optional[Decimal]
+    conseils: List[str]
+    annee: Optional[int] = None
+    bien: Optional[BienImmobilier] = None
+    resultat: Optional[Dict[str, Decimal]] = None
+    amortissement: Optional[Amortissement] = None
+
+    def en_json(self) -> Dict[str, Any]:
+        """Conversion en float pour JSON"""
+        calculs = {
+            'recettes': float(self.recettes),
+            'charges': float(self.charges),
+            'amortissements': float(self.amortissements),
+            'regime_actuel': self.regime_actuel,
+            'optimisation': {
+                cle: float(valeur) if isinstance(valeur, Decimal) else valeur
+                for cle, valeur in self.optimisation.items()
+            },
+            'charges_equilibre': float(self.charges_equilibre) if self.charges_equilibre is not None else None,
+            'conseils': self.conseils
+        }
+        if self.resultat is not None:
+            calculs['annee'] = self.annee
+            calculs['resultat'] = {cle: float(valeur) for cle, valeur in self.resultat.items()}
+        return calculs
+
+
+def _montants_detailles(donnees: Dict[str, Any], champ: str) -> Dict[str, Any]:
+    """Objet des montants détaillés d'un bien (vide si absent) ; ValueError pour toute autre valeur"""
+    valeur = donnees.get(champ)
+    if valeur is None:
+        return {}
+    if not isinstance(valeur, dict):
+        raise ValueError(f"{champ} : objet de montants détaillés attendu avec un bien "
+                         f"(ex. {EXEMPLES_DETAILLES[champ]})")
+    return valeur
+
+
+def calculer(donnees: Dict[str, Any]) -> Optional[CalculAssistance]:
+    """
+    Calculs d'une demande structurée : un bien (dateEntreeLmnp, prixAcquisition) avec
+    ses recettes et dépenses détaillées, ou des recettes et charges annuelles.
+    None si les données ne le permettent pas ; ValueError si le bien ou ses montants
+    sont invalides (jamais de montant remplacé par zéro).
+    """
+    if not isinstance(donnees, dict):
+        return None
+    nombre_biens = donnees.get('nombreBiens')
+    nombre_biens = nombre_biens if isinstance(nombre_biens, int) and not isinstance(nombre_biens, bool) else None
+    regime_actuel = normaliser_regime(donnees.get('regime'))
+
+    bien_data = donnees.get('bien')
+    if isinstance(bien_data, dict) and bien_data.get('dateEntreeLmnp') and bien_data.get('prixAcquisition') is not None:
+        globaux = [champ for champ in ('charges', 'amortissements') if donnees.get(champ) is not None]
+        if globaux:
+            raise ValueError(f"{', '.join(globaux)} : montants globaux non pris en compte avec un bien, "
+                             "détailler les dépenses (depenses) et l'emprunt (emprunt)")
+        bien = bien_depuis_json(bien_data)
+        annee = int(donnees.get('annee') or expert_fiscal.annee_fiscale)
+        resultat = expert_fiscal.calculer_resultat_bien(
+            bien,
+            recettes_depuis_json(_montants_detailles(donnees, 'recettes')),
+            depenses_depuis_json(_montants_detailles(donnees, 'depenses')),
+            emprunt_depuis_json(_montants_detailles(donnees, 'emprunt')),
+            annee
+        )
+        recettes = resultat['recettes_totales']
+        charges = resultat['depenses_totales'] + resultat['interets_totaux']
+        amortissements = resultat['amortissements']
+        conseils = expert_fiscal.generer_conseils_optimisation(resultat)
+        details = {'annee': annee, 'bien': bien, 'resultat': resultat,
+                   'amortissement': expert_fiscal.calculer_amortissement(bien, annee)}
+    else:
+        recettes = montant(donnees.get('recettes'))
+        charges = montant(donnees.get('charges', 0))
+        amortissements = montant(donnees.get('amortissements', 0))
+        if recettes is None or charges is None or amortissements is None:
+            return None
+        conseils = expert_fiscal.generer_conseils_optimisation({
+            'recettes_totales': recettes,
+            'depenses_totales': charges,
+            'resultat_apres_amortissement': recettes - charges - amortissements
+        })
+        details = {}
+
+    return CalculAssistance(
+        recettes=recettes,
+        charges=charges,
+        amortissements=amortissements,
+        nombre_biens=nombre_biens,
+        regime_actuel=regime_actuel,
+        # Au régime réel, les amortissements s'ajoutent aux charges déductibles
+        optimisation=expert_fiscal.optimiser_regime_fiscal(recettes, charges + amortissements),
+        charges_equilibre=expert_fiscal.calculer_charges_equilibre(recettes, amortissements),
+        conseils=conseils,
+        **details
+    )
+
+
+def _comparaison_regimes(calcul: CalculAssistance) -> List[str]:
+    optimisation = calcul.optimisation
+    lignes = []
+    if optimisation['micro_bic_possible']:
+        lignes.append(f"Micro-BIC : abattement forfaitaire de {optimisation['abattement_micro_bic']:.0%} sur les "
+                      f"recettes, base imposable de {euros(optimisation['base_imposable_micro'])}.")
+    else:
+        lignes.append(f"Micro-BIC : non accessible, les recettes dépassent le seuil de "
+                      f"{euros(optimisation['seuil_micro_bic'])}.")
+    deductions = 'charges réelles et amortissements' if calcul.amortissements else 'charges réelles'
+    lignes.append(f"Régime réel : recettes moins {deductions}, base imposable de "
+                  f"{euros(optimisation['base_imposable_reel'])}.")
+
+    recommande = optimisation['regime_recommande']
+    if optimisation['economie_estimee'] > 0:
+        lignes.append(f"Recommandation : {LIBELLES_REGIMES[recommande]}, qui réduit la base imposable de "
+                      f"{euros(optimisation['economie_estimee'])}.")
+    else:
+        lignes.append(f"Recommandation : {LIBELLES_REGIMES[recommande]}.")
+    if calcul.regime_actuel is not None and calcul.regime_actuel != recommande:
+        lignes.append(f"Votre régime actuel ({LIBELLES_REGIMES[calcul.regime_actuel]}) n'est pas le plus "
+                      f"avantageux pour ces montants.")
+    if calcul.charges_equilibre is not None and calcul.charges_equilibre > 0:
+        lignes.append(f"Le régime réel devient plus avantageux au-delà de {euros(calcul.charges_equilibre)} "
+                      f"de charges déductibles.")
+    return lignes
+
+
+def _situation(calcul: CalculAssistance) -> str:
+    elements = [f"recettes de {euros(calcul.recettes)}", f"charges de {euros(calcul.charges)}"]
+    if calcul.amortissements:
+        elements.append(f"amortissements de {euros(calcul.amortissements)}")
+    precisions = []
+    if calcul.nombre_biens is not None:
+        precisions.append(f"{calcul.nombre_biens} bien{'s' if calcul.nombre_biens > 1 else ''}")
+    if calcul.regime_actuel is not None:
+        precisions.append(f"régime actuel : {LIBELLES_REGIMES[calcul.regime_actuel]}")
+    situation = 'Situation : ' + ', '.join(elements)
+    return situation + (f" ({', '.join(precisions)})." if precisions else '.')
+
+
+def _resultat_bien(calcul: CalculAssistance) -> List[str]:
+    resultat, amortissement, bien = calcul.resultat, calcul.amortissement, calcul.bien
+    premiere_annee = calcul.annee == bien.date_entree_lmnp.year
+    suffixe = 'prorata' if premiere_annee else 'annuel'
+    lignes = [
+        f"Résultat fiscal {calcul.annee}{f' du bien {bien.adresse}' if bien.adresse else ''} :",
+        f"- Recettes : {euros(resultat['recettes_totales'])}",
+        f"- Charges déductibles : {euros(resultat['depenses_totales'])}",
+        f"- Intérêts et frais d'emprunt : {euros(resultat['interets_totaux'])}",
+        f"- Résultat avant amortissement : {euros(resultat['resultat_avant_amortissement'])}",
+        f"- Amortissements{' (prorata temporis, première année)' if premiere_annee else ''} : "
+        f"{euros(resultat['amortissements'])}, dont construction "
+        f"{euros(getattr(amortissement, 'construction_' + suffixe))} "
+        f"({bien.part_construction:.0%} du prix sur {bien.duree_amortissement_construction} ans), "
+        f"frais de notaire {euros(getattr(amortissement, 'frais_notaire_' + suffixe))} et frais d'agence "
+        f"{euros(getattr(amortissement, 'frais_agence_' + suffixe))} (sur {bien.duree_amortissement_frais} ans)",
+        f"- Résultat après amortissement : {euros(resultat['resultat_apres_amortissement'])}",
+    ]
+    return lignes
+
+
+def _conseils(calcul: CalculAssistance) -> List[str]:
+    if not calcul.conseils:
+        return []
+    return ['Conseils :'] + [f"- {conseil}" for conseil in calcul.conseils]
+
+
+def expliquer_calculs(type_calcul: str, calcul: CalculAssistance) -> str:
+    """Explication du calcul demandé (route /agents/assistance/calculs)"""
+    lignes = [f"Calcul {type_calcul} en LMNP :" if type_calcul else "Calcul fiscal LMNP :"]
+    if calcul.resultat is not None:
+        lignes += _resultat_bien(calcul)
+    else:
+        lignes.append(_situation(calcul))
+        lignes.append(f"Résultat au régime réel = recettes - charges"
+                      f"{' - amortissements' if calcul.amortissements else ''} = "
+                      f"{euros(calcul.optimisation['base_imposable_reel'])}.")
+    lignes += [''] + _comparaison_regimes(calcul)
+    conseils = _conseils(calcul)
+    return '\n'.join(lignes + ([''] + conseils if conseils else []))
+
+
+def expliquer_optimisation(calcul: CalculAssistance) -> str:
+    """Conseils d'optimisation chiffrés (route /agents/assistance/optimisation)"""
+    lignes = [_situation(calcul), ''] + _comparaison_regimes(calcul)
+    if calcul.resultat is not None:
+        lignes = _resultat_bien(calcul) + [''] + lignes
+    conseils = _conseils(calcul)
+    return '\n'.join(lignes + ([''] + conseils if conseils else []))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Configuration de la base de données
+SQLite par défaut, avec des pragmas de production appliqués à chaque connexion
+(WAL, synchronous=NORMAL, mmap, cache, busy_timeout), ou PostgreSQL avec un pool
+de connexions dès que DATABASE_URL est défini.
+Les colonnes ajoutées aux modèles sont créées dans les tables existantes
+au démarrage (ajouter_colonnes_manquantes), sans outil de migration.
+"""
+
+from typing import Dict, Optional
+import logging
+import os
+
+from sqlalchemy import MetaData, create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+logger = logging.getLogger(__name__)
+
+# Pragmas SQLite par mode ; chaque valeur est surchargeable par LMNP_SQLITE_<PRAGMA>
+PRAGMAS_SQLITE = {
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # négatif : en Kio, soit 64 Mio
+        'busy_timeout': 5000,  # ms
+        'temp_store': 'MEMORY',
+    },
+    'defaut': {},
+}
+
+# Pool des bases serveur (PostgreSQL), surchargeable par LMNP_DB_<OPTION>
+OPTIONS_POOL = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+}
+
+
+def url_base_donnees(chemin_sqlite: str) -> str:
+    """URL de la base : DATABASE_URL si défini, sinon le fichier SQLite local"""
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return f"sqlite:///{chemin_sqlite}"
+    # Les hébergeurs fournissent souvent l'ancien schéma postgres://
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def pragmas_sqlite(mode: Optional[str] = None) -> Dict[str, object]:
+    """Pragmas du mode demandé (LMNP_SQLITE_MODE par défaut), surcharges d'environnement comprises"""
+    mode = mode or os.environ.get('LMNP_SQLITE_MODE', 'production')
+    if mode not in PRAGMAS_SQLITE:
+        raise ValueError(f"Mode SQLite inconnu: {mode} (disponibles: {', '.join(PRAGMAS_SQLITE)})")
+    pragmas = dict(PRAGMAS_SQLITE[mode])
+    for nom in PRAGMAS_SQLITE['production']:
+        valeur = os.environ.get(f'LMNP_SQLITE_{nom.upper()}')
+        if valeur is not None:
+            pragmas[nom] = valeur
+    return pragmas
+
+
+def options_moteur(url: str) -> Dict[str, object]:
+    """Options create_engine : pool dimensionné pour les bases serveur, rien de plus pour SQLite"""
+    if url.startswith('sqlite'):
+        return {}
+    options = {
+        option: int(os.environ.get(f'LMNP_DB_{option.upper()}', valeur))
+        for option, valeur in OPTIONS_POOL.items()
+    }
+    # Détecte les connexions coupées par le serveur avant de les réutiliser
+    options['pool_pre_ping'] = True
+    return options
+
+
+def activer_pragmas(moteur: Engine, pragmas: Dict[str, object]):
+    """Applique les pragmas à chaque nouvelle connexion SQLite du moteur"""
+    if moteur.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(moteur, 'connect')
+    def _appliquer_pragmas(connexion_dbapi, _):
+        curseur = connexion_dbapi.cursor()
+        try:
+            for nom, valeur in pragmas.items():
+                curseur.execute(f'PRAGMA {nom}={valeur}')
+        finally:
+            curseur.close()
+
+
+def creer_moteur(url: str, mode: Optional[str] = None) -> Engine:
+    """Moteur SQLAlchemy hors Flask (scripts, benchmarks), même configuration que l'application"""
+    moteur = create_engine(url, **options_moteur(url))
+    activer_pragmas(moteur, pragmas_sqlite(mode))
+    return moteur
+
+
+def configurer_base_donnees(app, db, chemin_sqlite: str):
+    """Configure Flask-SQLAlchemy (URL, pool, pragmas) et initialise l'extension"""
+    url = url_base_donnees(chemin_sqlite)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options_moteur(url), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    db.init_app(app)
+
+    with app.app_context():
+        activer_pragmas(db.engine, pragmas_sqlite())
+        logger.info(f"Base de données: {db.engine.url.render_as_string(hide_password=True)}")
+
+
+def ajouter_colonnes_manquantes(moteur: Engine, metadata: MetaData) -> Dict[str, list]:
+    """
+    Ajoute aux tables existantes les colonnes des modèles qui leur manquent
+    (évolutions additives : colonne nullable ou avec server_default) ;
+    retourne les colonnes ajoutées par table
+    """
+    inspecteur = inspect(moteur)
+    preparateur = moteur.dialect.identifier_preparer
+    ajoutees: Dict[str, list] = {}
+    with moteur.begin() as connexion:
+        for table in metadata.sorted_tables:
+            if not inspecteur.has_table(table.name):
+                continue
+            existantes = {colonne['name'] for colonne in inspecteur.get_columns(table.name)}
+            for colonne in table.columns:
+                if colonne.name in existantes:
+                    continue
+                if not colonne.nullable and colonne.server_default is None:
+                    raise RuntimeError(f"Colonne {table.name}.{colonne.name} obligatoire sans server_default : "
+                                       "migration manuelle nécessaire")
+                definition = CreateColumn(colonne).compile(dialect=moteur.dialect)
+                connexion.execute(text(f"ALTER TABLE {preparateur.format_table(table)} ADD COLUMN {definition}"))
+                ajoutees.setdefault(table.name, []).append(colonne.name)
+                logger.info(f"Colonne ajoutée: {table.name}.{colonne.name}")
+    return ajoutees
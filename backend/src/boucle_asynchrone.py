@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Boucle asyncio d'arrière-plan partagée par le processus
+Les vues Flask sont synchrones : elles soumettent leurs coroutines à une boucle
+unique, démarrée à la première utilisation dans un thread dédié (donc après un
+éventuel fork du serveur WSGI). Les clients asynchrones (pool de connexions
+HTTP des agents IA) vivent sur cette boucle et servent toutes les requêtes ;
+iterer() expose un générateur asynchrone aux réponses en flux.
+"""
+
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+import asyncio
+import threading
+
+T = TypeVar('T')
+
+_boucle: Optional[asyncio.AbstractEventLoop] = None
+_verrou = threading.Lock()
+
+
+def boucle_partagee() -> asyncio.AbstractEventLoop:
+    """Boucle d'arrière-plan du processus (démarrée si besoin)"""
+    global _boucle
+    if _boucle is None:
+        with _verrou:
+            if _boucle is None:
+                boucle = asyncio.new_event_loop()
+                threading.Thread(target=boucle.run_forever, name='boucle-asynchrone', daemon=True).start()
+                _boucle = boucle
+    return _boucle
+
+
+def executer(coroutine: Awaitable[T], delai: Optional[float] = None) -> T:
+    """Exécute la coroutine sur la boucle partagée et attend son résultat (depuis un thread synchrone)"""
+    return asyncio.run_coroutine_threadsafe(coroutine, boucle_partagee()).result(delai)
+
+
+async def _suivant(generateur: AsyncIterator[T]) -> T:
+    return await generateur.__anext__()
+
+
+def iterer(generateur: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Parcourt un générateur asynchrone depuis un thread synchrone (réponse WSGI en flux) ;
+    fermer l'itérateur, par exemple quand le client se déconnecte, ferme le générateur
+    """
+    try:
+        while True:
+            try:
+                yield executer(_suivant(generateur))
+            except StopAsyncIteration:
+                return
+    finally:
+        executer(generateur.aclose())
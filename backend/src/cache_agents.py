@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Cache des réponses des agents IA
+Une réponse du modèle est rejouée tant que la demande est identique : même agent,
+même version de son prompt système, même question, même contexte (JSON normalisé)
+et mêmes paramètres d'appel (modèle, température, max_tokens). La clé est le
+SHA-256 de ces éléments sérialisés de façon canonique.
+
+Deux niveaux : un LRU mémoire (CacheLRU) devant une table SQLite sur disque, partagée
+par les processus et conservée aux redémarrages ; les deux expirent après
+LMNP_CACHE_AGENTS_TTL secondes. Seules les réponses abouties sont mises en cache.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src.cache_lmnp import CacheLRU
+
+TAILLE_CACHE_AGENTS = int(os.environ.get('LMNP_CACHE_AGENTS_TAILLE', 2048))
+TTL_CACHE_AGENTS = float(os.environ.get('LMNP_CACHE_AGENTS_TTL', 24 * 3600))  # secondes
+# Purge des entrées expirées du disque, toutes les N écritures
+PURGE_TOUTES_LES = 200
+
+
+def cle_reponse(agent: str, version_prompt: str, question: str, contexte: Optional[Dict],
+                parametres: Dict[str, Any]) -> str:
+    """Empreinte canonique d'une demande (les messages sont exclus : ils dérivent des autres éléments)"""
+    elements = {
+        'agent': agent,
+        'versionPrompt': version_prompt,
+        'question': question.strip(),
+        'contexte': contexte or {},
+        'parametres': {nom: valeur for nom, valeur in parametres.items() if nom != 'messages'},
+    }
+    canonique = json.dumps(elements, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonique.encode()).hexdigest()
+
+
+class DisqueReponses:
+    """Niveau disque : table SQLite (clé, contenu, tokens, expiration)"""
+
+    def __init__(self, fichier: str, ttl: float):
+        os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+        self.fichier = fichier
+        self.ttl = ttl
+        self._connexion = sqlite3.connect(fichier, check_same_thread=False, isolation_level=None)
+        self._connexion.execute('PRAGMA journal_mode=WAL')
+        self._connexion.execute('PRAGMA synchronous=NORMAL')
+        self._connexion.execute('PRAGMA busy_timeout=5000')
+        self._connexion.execute(
+            'CREATE TABLE IF NOT EXISTS reponses_agents '
+            '(cle TEXT PRIMARY KEY, contenu TEXT NOT NULL, tokens INTEGER NOT NULL, expiration REAL NOT NULL)'
+        )
+        self._verrou = threading.Lock()
+        self._ecritures = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lire(self, cle: str) -> Optional[Tuple[str, int]]:
+        with self._verrou:
+            ligne = self._connexion.execute(
+                'SELECT contenu, tokens FROM reponses_agents WHERE cle = ? AND expiration > ?', (cle, time.time())
+            ).fetchone()
+            if ligne is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return ligne[0], ligne[1]
+
+    def ecrire(self, cle: str, contenu: str, tokens: int):
+        with self._verrou:
+            maintenant = time.time()
+            self._connexion.execute(
+                'INSERT OR REPLACE INTO reponses_agents (cle, contenu, tokens, expiration) VALUES (?, ?, ?, ?)',
+                (cle, contenu, tokens, maintenant + self.ttl)
+            )
+            self._ecritures += 1
+            if self._ecritures % PURGE_TOUTES_LES == 0:
+                self._connexion.execute('DELETE FROM reponses_agents WHERE expiration <= ?', (maintenant,))
+
+    def vider(self):
+        with self._verrou:
+            self._connexion.execute('DELETE FROM reponses_agents')
+
+    def statistiques(self) -> Dict[str, Any]:
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                'fichier': self.fichier,
+                'taille': self._connexion.execute('SELECT COUNT(*) FROM reponses_agents').fetchone()[0],
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'taux_succes': round(self.hits / total, 4) if total else 0.0
+            }
+
+    def fermer(self):
+        with self._verrou:
+            self._connexion.close()
+
+
+class CacheReponsesAgents:
+    """LRU mémoire devant le niveau disque optionnel ; les lectures disque remontent en mémoire"""
+
+    def __init__(self, taille_max: int = TAILLE_CACHE_AGENTS, ttl: float = TTL_CACHE_AGENTS):
+        self.memoire = CacheLRU(taille_max, ttl=ttl)
+        self.ttl = ttl
+        self.disque: Optional[DisqueReponses] = None
+        self.tokens_economises = 0
+
+    def ouvrir_disque(self, fichier: str):
+        if self.disque is not None:
+            self.disque.fermer()
+        self.disque = DisqueReponses(fichier, self.ttl)
+
+    async def lire(self, cle: str) -> Optional[str]:
+        trouvee = self.memoire.get(cle)
+        if trouvee is None and self.disque is not None:
+            trouvee = await asyncio.to_thread(self.disque.lire, cle)
+            if trouvee is not None:
+                self.memoire.set(cle, trouvee)
+        if trouvee is None:
+            return None
+        contenu, tokens = trouvee
+        self.tokens_economises += tokens
+        return contenu
+
+    async def ecrire(self, cle: str, contenu: str, tokens: int = 0):
+        self.memoire.set(cle, (contenu, tokens))
+        if self.disque is not None:
+            await asyncio.to_thread(self.disque.ecrire, cle, contenu, tokens)
+
+    def vider(self):
+        self.memoire.vider()
+        if self.disque is not None:
+            self.disque.vider()
+
+    def statistiques(self) -> Dict[str, Any]:
+        return {
+            'memoire': self.memoire.statistiques(),
+            'disque': self.disque.statistiques() if self.disque is not None else None,
+            'tokens_economises': self.tokens_economises
+        }
+
+
+cache_reponses_agents = CacheReponsesAgents()
+
+
+def configurer_cache_agents(fichier_defaut: str) -> CacheReponsesAgents:
+    """Active le niveau disque (LMNP_CACHE_AGENTS_FICHIER, vide pour le désactiver)"""
+    fichier = os.environ.get('LMNP_CACHE_AGENTS_FICHIER', fichier_defaut)
+    if fichier:
+        cache_reponses_agents.ouvrir_disque(fichier)
+    return cache_reponses_agents
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Cache mémoire LMNP
+Cache LRU borné, thread-safe, avec expiration (TTL) et compteurs de succès/échecs/évictions
+"""
+
+from typing import Any, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+import threading
+import time
+
+_ABSENT = object()
+
+
+class CacheLRU:
+    """
+    Cache LRU borné avec durée de vie optionnelle des entrées.
+    Les statistiques (hits, misses, evictions, expirations) sont exposées par statistiques().
+    """
+
+    def __init__(self, taille_max: int = 1024, ttl: Optional[float] = None,
+                 horloge: Callable[[], float] = time.monotonic,
+                 a_l_eviction: Optional[Callable[[Hashable, Any], None]] = None):
+        if taille_max <= 0:
+            raise ValueError("La taille du cache doit être strictement positive")
+        self.taille_max = taille_max
+        self.ttl = ttl or None
+        self._horloge = horloge
+        self._a_l_eviction = a_l_eviction
+        self._entrees: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._verrou = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+    def __contains__(self, cle: Hashable) -> bool:
+        return self.get(cle, _ABSENT, compter=False) is not _ABSENT
+
+    def get(self, cle: Hashable, defaut: Any = None, compter: bool = True) -> Any:
+        """Retourne la valeur en cache (et la marque comme récente), ou defaut"""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                valeur, expiration = entree
+                if expiration is None or expiration > self._horloge():
+                    self._entrees.move_to_end(cle)
+                    if compter:
+                        self.hits += 1
+                    return valeur
+                self._retirer(cle, expiree=True)
+            if compter:
+                self.misses += 1
+            return defaut
+
+    def set(self, cle: Hashable, valeur: Any):
+        """Ajoute ou remplace une entrée, en évinçant la moins récente si le cache est plein"""
+        with self._verrou:
+            expiration = self._horloge() + self.ttl if self.ttl else None
+            self._entrees[cle] = (valeur, expiration)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                ancienne_cle = next(iter(self._entrees))
+                self._retirer(ancienne_cle)
+                self.evictions += 1
+
+    def obtenir_ou_calculer(self, cle: Hashable, calcul: Callable[[], Any]) -> Any:
+        """
+        Retourne la valeur en cache ou la calcule puis la mémorise.
+        Si deux appels calculent la même clé en parallèle, la première valeur stockée gagne.
+        """
+        valeur = self.get(cle, _ABSENT)
+        if valeur is not _ABSENT:
+            return valeur
+        valeur = calcul()
+        with self._verrou:
+            existante = self.get(cle, _ABSENT, compter=False)
+            if existante is not _ABSENT:
+                return existante
+            self.set(cle, valeur)
+            return valeur
+
+    def invalider(self, cle: Hashable) -> bool:
+        """Supprime une entrée ; retourne True si elle était présente"""
+        with self._verrou:
+            if cle not in self._entrees:
+                return False
+            self._retirer(cle)
+            return True
+
+    def invalider_si(self, predicat: Callable[[Hashable], bool]) -> int:
+        """Supprime toutes les entrées dont la clé vérifie le prédicat"""
+        with self._verrou:
+            cles = [cle for cle in self._entrees if predicat(cle)]
+            for cle in cles:
+                self._retirer(cle)
+            return len(cles)
+
+    def vider(self):
+        """Vide le cache (les compteurs sont conservés)"""
+        with self._verrou:
+            for cle in list(self._entrees):
+                self._retirer(cle)
+
+    def reconfigurer(self, taille_max: Optional[int] = None, ttl: Optional[float] = None):
+        """Modifie la taille maximale et/ou la durée de vie des nouvelles entrées"""
+        with self._verrou:
+            if ttl is not None:
+                self.ttl = ttl or None
+            if taille_max is not None:
+                if taille_max <= 0:
+                    raise ValueError("La taille du cache doit être strictement positive")
+                self.taille_max = taille_max
+                while len(self._entrees) > self.taille_max:
+                    self._retirer(next(iter(self._entrees)))
+                    self.evictions += 1
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Compteurs d'utilisation du cache"""
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                'taille': len(self._entrees),
+                'taille_max': self.taille_max,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'taux_succes': round(self.hits / total, 4) if total else 0.0
+            }
+
+    def _retirer(self, cle: Hashable, expiree: bool = False):
+        valeur, _ = self._entrees.pop(cle)
+        if expiree:
+            self.expirations += 1
+        if self._a_l_eviction is not None:
+            self._a_l_eviction(cle, valeur)
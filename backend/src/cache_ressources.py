@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Lectures conditionnelles des utilisateurs et des déclarations
+Chaque ligne porte une colonne version, incrémentée dans la transaction qui la
+modifie (pour une déclaration : elle-même, ses biens ou leurs montants). L'ETag en
+dérive. Les réponses JSON sont gardées dans un cache de lecture (CacheLRU),
+invalidé après chaque commit qui touche la ressource : un client à jour reçoit
+un 304 sans corps ni requête SQL.
+
+Les clés sont préfixées par le cabinet de la requête (src/partitions.py). Le TTL
+borne la fraîcheur du cache lorsque plusieurs processus partagent la base
+(invalidation locale au processus).
+"""
+
+from typing import Callable, Hashable, Optional
+from dataclasses import dataclass
+import threading
+
+from flask import current_app, request
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from src import suivi_ecritures
+from src.cache_lmnp import CacheLRU
+from src.models.user import User
+from src.models.lmnp import Declaration
+from src.partitions import partition_courante
+
+TAILLE_CACHE_RESSOURCES = 10_000
+TTL_CACHE_RESSOURCES = 30.0  # secondes
+
+
+@dataclass(frozen=True)
+class Representation:
+    """Réponse JSON sérialisée d'une ressource, à une version donnée"""
+    etag: str
+    corps: bytes
+    proprietaire: Optional[int] = None
+
+
+cache_ressources = CacheLRU(TAILLE_CACHE_RESSOURCES, ttl=TTL_CACHE_RESSOURCES)
+
+# Incrémentée à chaque invalidation : une lecture commencée avant un commit
+# ne remet pas en cache une représentation périmée
+_generation = 0
+_verrou_generation = threading.Lock()
+
+
+def representation(type_ressource: str, identifiant: int, version: int, contenu,
+                   proprietaire: Optional[int] = None) -> Representation:
+    partition = partition_courante()
+    etag = f'{type_ressource}-{identifiant}-v{version}'
+    return Representation(f'{partition}-{etag}' if partition else etag,
+                          current_app.json.dumps(contenu).encode(), proprietaire)
+
+
+def lire_ressource(cle: Hashable, charger: Callable[[], Optional[Representation]]) -> Optional[Representation]:
+    """Lecture à travers le cache : la représentation en cache, ou celle chargée puis mémorisée"""
+    cle = (partition_courante(), cle)
+    trouvee = cache_ressources.get(cle)
+    if trouvee is not None:
+        return trouvee
+    generation = _generation
+    trouvee = charger()
+    if trouvee is not None:
+        with _verrou_generation:
+            if generation == _generation:
+                cache_ressources.set(cle, trouvee)
+    return trouvee
+
+
+def reponse_conditionnelle(ressource: Representation):
+    """304 sans corps si le client a déjà cette version (If-None-Match), sinon la réponse avec son ETag"""
+    reponse = current_app.response_class(status=304)
+    if not request.if_none_match.contains_weak(ressource.etag):
+        reponse = current_app.response_class(ressource.corps, mimetype='application/json')
+    reponse.set_etag(ressource.etag)
+    # Le navigateur revalide à chaque lecture
+    reponse.headers['Cache-Control'] = 'no-cache'
+    return reponse
+
+
+def _incrementer_versions(session: Session, modifications: suivi_ecritures.Modifications):
+    for modele, identifiants in ((User, modifications.comptes), (Declaration, modifications.declarations)):
+        for paquet in suivi_ecritures.par_paquets(identifiants):
+            session.execute(
+                update(modele).where(modele.id.in_(paquet)).values(version=modele.version + 1),
+                execution_options={'synchronize_session': False}
+            )
+
+
+def _invalider(modifications: suivi_ecritures.Modifications):
+    global _generation
+    with _verrou_generation:
+        _generation += 1
+        partition = partition_courante()
+        for user_id in modifications.comptes:
+            cache_ressources.invalider((partition, ('user', user_id)))
+        for declaration_id in modifications.declarations:
+            cache_ressources.invalider((partition, ('declaration', declaration_id)))
+
+
+suivi_ecritures.avant_validation.append(_incrementer_versions)
+suivi_ecritures.apres_validation.append(_invalider)
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Cache sémantique des réponses de l'agent fiscal
+Là où le cache des réponses (src/cache_agents.py) exige une question identique, ce
+cache rejoue la réponse d'une question formulée autrement : la question est projetée
+localement (vectoriser : mots réduits à leur radical, paires de mots et trigrammes de
+caractères hachés, sans accents ni mots vides), puis cherchée par produit scalaire dans
+un index FAISS, restreinte (IDSelector) aux entrées vivantes de la même portée (agent,
+version du prompt, contexte et paramètres d'appel). La réponse la plus proche est rendue
+si sa similarité atteint le seuil, pour les mêmes nombres (montants, années) et les
+mêmes négations dans la question.
+Inactif sauf si LMNP_CACHE_SEMANTIQUE_DOSSIER est défini.
+
+Sur disque, dans un dossier : entrees.db (SQLite : question, réponse, vecteur) et
+index.faiss, instantané de l'index projeté en mémoire (IO_FLAG_MMAP) à l'ouverture.
+Les nouvelles entrées vont dans un index mémoire ; au-delà de TAILLE_DELTA, ou quand
+trop d'entrées de l'instantané ont été évincées, l'instantané est reconstruit en
+arrière-plan depuis SQLite (index IVF au-delà de SEUIL_IVF entrées, exhaustif sinon).
+Éviction : entrées expirées (TTL), puis les moins récemment utilisées au-delà de la
+taille maximale, par lots de 10 %. Les processus qui partagent le dossier voient les
+entrées ajoutées par les autres à la reconstruction suivante.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIMENSION = 256
+SEUIL_SIMILARITE = float(os.environ.get('LMNP_CACHE_SEMANTIQUE_SEUIL', 0.85))
+TAILLE_CACHE_SEMANTIQUE = int(os.environ.get('LMNP_CACHE_SEMANTIQUE_TAILLE', 100_000))
+TTL_CACHE_SEMANTIQUE = float(os.environ.get('LMNP_CACHE_SEMANTIQUE_TTL', 7 * 24 * 3600))  # secondes
+# Candidats examinés par recherche, parmi les entrées vivantes de la portée ; élargi
+# (×4) tant que tous dépassent le seuil sans que les nombres ou négations ne coïncident
+CANDIDATS = 8
+# Entrées de l'index mémoire déclenchant la reconstruction de l'instantané
+TAILLE_DELTA = 10_000
+# Part d'entrées évincées de l'instantané déclenchant sa reconstruction
+PART_EVINCEES = 0.2
+# Index IVF (listes explorées par recherche) au-delà de SEUIL_IVF entrées
+SEUIL_IVF = 50_000
+LISTES_MAX = 1024
+SONDES = 16
+# Purge des entrées expirées, toutes les N écritures
+PURGE_TOUTES_LES = 200
+
+# Poids des caractéristiques de la projection
+POIDS_MOT = 1.0
+POIDS_PAIRE = 0.5
+POIDS_TRIGRAMME = 0.25
+
+# Les négations n'en font pas partie : elles changent le sens de la question (cf. negations())
+MOTS_VIDES = frozenset("""
+a au aux avec c ce ces cet cette comment combien d dans de des du elle elles en est et il ils
+j je l la le les leur lui m ma mes mon nous on ou par pour qu quand que quel quelle quelles
+quels qui quoi s sa se ses son sont sur t ta te tes ton un une vos votre vous y
+lmnp
+""".split())
+# Toutes les questions de l'agent fiscal portent sur la location meublée (lmnp ci-dessus)
+
+# Marqueurs de négation ; "ne" seul n'entre dans la signature qu'à défaut d'un autre marqueur
+NEGATIONS = frozenset('ne n pas non jamais aucun aucune sans ni rien nullement guere'.split())
+# Terminaisons retirées (la première qui laisse au moins RADICAL_MIN caractères) :
+# "calculer", "calculs" et "calcul" partagent le radical "calcul"
+SUFFIXES = ('ements', 'ement', 'ations', 'ation', 'ables', 'able', 'ees', 'ee', 'es', 'er', 'ez', 'e', 's', 'x')
+RADICAL_MIN = 4
+
+
+def _sans_accents(texte: str) -> List[str]:
+    texte = unicodedata.normalize('NFKD', texte.lower())
+    return re.findall(r'[a-z0-9]+', ''.join(caractere for caractere in texte if not unicodedata.combining(caractere)))
+
+
+def radical(mot: str) -> str:
+    if mot.isdigit() or mot in NEGATIONS:
+        return 'ne' if mot == 'n' else mot
+    for suffixe in SUFFIXES:
+        if mot.endswith(suffixe) and len(mot) - len(suffixe) >= RADICAL_MIN:
+            return mot[:-len(suffixe)]
+    return mot
+
+
+def mots(texte: str) -> List[str]:
+    """Mots normalisés : minuscules sans accents, mots vides retirés, réduits à leur radical"""
+    return [radical(mot) for mot in _sans_accents(texte) if mot not in MOTS_VIDES]
+
+
+def nombres(texte: str) -> Tuple[str, ...]:
+    """Nombres de la question (montants, années), qui doivent coïncider pour rejouer une réponse"""
+    return tuple(sorted(re.sub(r'[\s.,]', '', nombre) for nombre in re.findall(r'\d[\d\s.,]*\d|\d', texte)))
+
+
+def negations(texte: str) -> Tuple[str, ...]:
+    """Négations de la question, qui doivent coïncider pour rejouer une réponse"""
+    marqueurs = {'ne' if mot == 'n' else mot for mot in _sans_accents(texte) if mot in NEGATIONS}
+    return tuple(sorted(marqueurs - {'ne'} or marqueurs))
+
+
+def vectoriser(texte: str, dimension: int = DIMENSION) -> np.ndarray:
+    """Projection locale de la question, de norme 1 (hachage signé des caractéristiques)"""
+    normalises = mots(texte)
+    caracteristiques = [(mot, POIDS_MOT) for mot in normalises]
+    caracteristiques += [(f'{a} {b}', POIDS_PAIRE) for a, b in zip(normalises, normalises[1:])]
+    for mot in normalises:
+        borne = f'<{mot}>'
+        caracteristiques += [(borne[i:i + 3], POIDS_TRIGRAMME) for i in range(len(borne) - 2)]
+
+    vecteur = np.zeros(dimension, dtype=np.float32)
+    for caracteristique, poids in caracteristiques:
+        empreinte = zlib.crc32(caracteristique.encode())
+        vecteur[empreinte % dimension] += poids if empreinte & 0x80000000 else -poids
+    norme = np.linalg.norm(vecteur)
+    return vecteur / norme if norme else vecteur
+
+
+def construire_index(vecteurs: np.ndarray, ids: np.ndarray, dimension: int = DIMENSION) -> faiss.Index:
+    """Index par produit scalaire des vecteurs : IVF au-delà de SEUIL_IVF entrées, exhaustif sinon"""
+    if len(ids) < SEUIL_IVF:
+        return _index_exhaustif(vecteurs, ids, dimension)
+    listes = min(LISTES_MAX, int(4 * math.sqrt(len(ids))))
+    index = faiss.index_factory(dimension, f'IDMap2,IVF{listes},Flat', faiss.METRIC_INNER_PRODUCT)
+    echantillon = np.random.default_rng(0).choice(len(ids), min(len(ids), 40 * listes), replace=False)
+    index.train(vecteurs[np.sort(echantillon)])
+    index.add_with_ids(vecteurs, ids)
+    return index
+
+
+def _index_exhaustif(vecteurs: Optional[np.ndarray] = None, ids: Optional[np.ndarray] = None,
+                     dimension: int = DIMENSION) -> faiss.Index:
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+    if ids is not None and len(ids):
+        index.add_with_ids(vecteurs, ids)
+    return index
+
+
+def charger_index(fichier: str) -> faiss.Index:
+    """Instantané projeté en mémoire (lecture seule : les ajouts vont dans l'index mémoire)"""
+    index = faiss.read_index(fichier, faiss.IO_FLAG_MMAP)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = SONDES
+    return index
+
+
+class CacheSemantique:
+    """
+    Inactif (lire rend None) tant qu'ouvrir() n'a pas désigné son dossier ;
+    les méthodes synchrones sont sûres entre threads
+    """
+
+    def __init__(self, seuil: float = SEUIL_SIMILARITE, taille_max: int = TAILLE_CACHE_SEMANTIQUE,
+                 ttl: float = TTL_CACHE_SEMANTIQUE, dimension: int = DIMENSION):
+        self.seuil = seuil
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self.dimension = dimension
+        self.dossier: Optional[str] = None
+        self._connexion: Optional[sqlite3.Connection] = None
+        self._instantane: Optional[faiss.Index] = None
+        self._id_max_instantane = 0
+        self._delta = _index_exhaustif(dimension=dimension)
+        self._taille = 0
+        self._evincees_instantane = 0
+        self._ecritures = 0
+        self._reconstruction: Optional[threading.Thread] = None
+        self._verrou = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_economises = 0
+
+    @property
+    def actif(self) -> bool:
+        return self._connexion is not None
+
+    @property
+    def fichier_index(self) -> str:
+        return os.path.join(self.dossier, 'index.faiss')
+
+    def ouvrir(self, dossier: str):
+        self.fermer()
+        os.makedirs(dossier, exist_ok=True)
+        connexion = sqlite3.connect(os.path.join(dossier, 'entrees.db'), check_same_thread=False,
+                                    isolation_level=None)
+        connexion.execute('PRAGMA journal_mode=WAL')
+        connexion.execute('PRAGMA synchronous=NORMAL')
+        connexion.execute('PRAGMA busy_timeout=5000')
+        connexion.execute(
+            'CREATE TABLE IF NOT EXISTS entrees_semantiques '
+            '(id INTEGER PRIMARY KEY, portee TEXT NOT NULL, question TEXT NOT NULL, reponse TEXT NOT NULL, '
+            'tokens INTEGER NOT NULL, creation REAL NOT NULL, utilisation REAL NOT NULL, vecteur BLOB NOT NULL)'
+        )
+        connexion.execute('CREATE INDEX IF NOT EXISTS idx_entrees_semantiques_utilisation '
+                          'ON entrees_semantiques (utilisation)')
+        connexion.execute('CREATE INDEX IF NOT EXISTS idx_entrees_semantiques_portee '
+                          'ON entrees_semantiques (portee, creation)')
+        with self._verrou:
+            self.dossier = dossier
+            self._connexion = connexion
+            self._delta.reset()
+            if os.path.exists(self.fichier_index):
+                self._instantane = charger_index(self.fichier_index)
+                identifiants = faiss.vector_to_array(self._instantane.id_map)
+                self._id_max_instantane = int(identifiants.max()) if len(identifiants) else 0
+            # Entrées postérieures à l'instantané
+            for identifiant, vecteur in connexion.execute(
+                    'SELECT id, vecteur FROM entrees_semantiques WHERE id > ?', (self._id_max_instantane,)):
+                self._delta.add_with_ids(np.frombuffer(vecteur, dtype=np.float32).reshape(1, -1),
+                                         np.array([identifiant], dtype=np.int64))
+            self._taille = connexion.execute('SELECT COUNT(*) FROM entrees_semantiques').fetchone()[0]
+
+    def fermer(self):
+        self.attendre_reconstruction()
+        with self._verrou:
+            if self._connexion is not None:
+                self._connexion.close()
+            self._connexion = None
+            self._instantane = None
+            self._id_max_instantane = 0
+            self._evincees_instantane = 0
+            self._delta.reset()
+
+    def _candidats(self, vecteur: np.ndarray, selecteur: faiss.IDSelector, nombre: int
+                   ) -> Tuple[List[Tuple[float, int]], bool]:
+        """
+        Plus proches voisins restreints aux identifiants du sélecteur, au-dessus du seuil,
+        et vrai si aucun autre ne dépasse le seuil (moins de nombre voisins rendus par index)
+        """
+        requete = vecteur.reshape(1, -1)
+        candidats, epuise = [], True
+        for index in (self._instantane, self._delta):
+            if index is None or not index.ntotal:
+                continue
+            if faiss.try_extract_index_ivf(index) is not None:
+                parametres = faiss.SearchParametersIVF(sel=selecteur, nprobe=SONDES)
+            else:
+                parametres = faiss.SearchParameters(sel=selecteur)
+            similarites, identifiants = index.search(requete, min(nombre, index.ntotal), params=parametres)
+            retenus = [(float(s), int(i)) for s, i in zip(similarites[0], identifiants[0])
+                       if i >= 0 and s >= self.seuil]
+            candidats += retenus
+            epuise = epuise and len(retenus) < min(nombre, index.ntotal)
+        return sorted(candidats, reverse=True), epuise
+
+    def chercher(self, question: str, portee: str) -> Optional[Tuple[str, float]]:
+        """Réponse à la question la plus proche et sa similarité, ou None"""
+        if not self.actif:
+            return None
+        vecteur = vectoriser(question, self.dimension)
+        signature = nombres(question), negations(question)
+        maintenant = time.time()
+        with self._verrou:
+            # Recherche restreinte aux entrées vivantes de la portée : les autres portées et
+            # les entrées évincées encore dans l'instantané n'occupent pas les candidats
+            ids = np.array([ligne[0] for ligne in self._connexion.execute(
+                'SELECT id FROM entrees_semantiques WHERE portee = ? AND creation > ?', (portee, maintenant - self.ttl)
+            )], dtype=np.int64)
+            selecteur = faiss.IDSelectorBatch(ids) if len(ids) else None
+            nombre, examines = CANDIDATS, set()
+            while selecteur is not None:
+                candidats, epuise = self._candidats(vecteur, selecteur, nombre)
+                for similarite, identifiant in candidats:
+                    if identifiant in examines:
+                        continue
+                    examines.add(identifiant)
+                    ligne = self._connexion.execute(
+                        'SELECT question, reponse, tokens FROM entrees_semantiques WHERE id = ?', (identifiant,)
+                    ).fetchone()
+                    if ligne is None or (nombres(ligne[0]), negations(ligne[0])) != signature:
+                        continue
+                    self._connexion.execute('UPDATE entrees_semantiques SET utilisation = ? WHERE id = ?',
+                                            (maintenant, identifiant))
+                    self.hits += 1
+                    self.tokens_economises += ligne[2]
+                    return ligne[1], similarite
+                if epuise or nombre >= len(ids):
+                    break
+                nombre *= 4
+            self.misses += 1
+            return None
+
+    def ajouter(self, question: str, portee: str, reponse: str, tokens: int = 0):
+        if not self.actif:
+            return
+        vecteur = vectoriser(question, self.dimension)
+        maintenant = time.time()
+        with self._verrou:
+            identifiant = self._connexion.execute(
+                'INSERT INTO entrees_semantiques (portee, question, reponse, tokens, creation, utilisation, vecteur) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', (portee, question, reponse, tokens, maintenant, maintenant,
+                                                 vecteur.tobytes())
+            ).lastrowid
+            self._delta.add_with_ids(vecteur.reshape(1, -1), np.array([identifiant], dtype=np.int64))
+            self._taille += 1
+            self._ecritures += 1
+            if self._ecritures % PURGE_TOUTES_LES == 0:
+                self._supprimer('SELECT id FROM entrees_semantiques WHERE creation <= ?', (maintenant - self.ttl,))
+            if self._taille > self.taille_max:
+                self._supprimer('SELECT id FROM entrees_semantiques ORDER BY utilisation LIMIT ?',
+                                (self._taille - self.taille_max + max(1, self.taille_max // 10),))
+            a_reconstruire = (self._delta.ntotal >= TAILLE_DELTA or
+                              self._instantane is not None and
+                              self._evincees_instantane > PART_EVINCEES * self._instantane.ntotal)
+        if a_reconstruire:
+            self.reconstruire(attendre=False)
+
+    def _supprimer(self, selection: str, parametres: Tuple):
+        """Évince les entrées sélectionnées (celles de l'instantané y restent jusqu'à sa reconstruction)"""
+        ids = np.array([ligne[0] for ligne in self._connexion.execute(selection, parametres)], dtype=np.int64)
+        if not len(ids):
+            return
+        self._connexion.executemany('DELETE FROM entrees_semantiques WHERE id = ?', ((int(i),) for i in ids))
+        self._delta.remove_ids(faiss.IDSelectorBatch(ids))
+        self._taille -= len(ids)
+        self._evincees_instantane += int((ids <= self._id_max_instantane).sum())
+
+    def reconstruire(self, attendre: bool = True):
+        """Reconstruit l'instantané depuis SQLite (dans un thread si attendre est faux)"""
+        with self._verrou:
+            if not self.actif or (self._reconstruction is not None and self._reconstruction.is_alive()):
+                return
+            self._reconstruction = threading.Thread(target=self._reconstruire, name='cache-semantique', daemon=True)
+            self._reconstruction.start()
+        if attendre:
+            self.attendre_reconstruction()
+
+    def attendre_reconstruction(self):
+        reconstruction = self._reconstruction
+        if reconstruction is not None:
+            reconstruction.join()
+
+    def _reconstruire(self):
+        try:
+            self._reconstruire_instantane()
+        except Exception as e:
+            logger.error(f"Cache sémantique : reconstruction de l'instantané impossible: {e}")
+
+    def _reconstruire_instantane(self):
+        debut = time.perf_counter()
+        dossier = self.dossier
+        # Connexion de lecture dédiée (WAL) : les recherches se poursuivent pendant la lecture
+        lecture = sqlite3.connect(os.path.join(dossier, 'entrees.db'), isolation_level=None)
+        try:
+            lecture.execute('BEGIN')
+            nombre = lecture.execute('SELECT COUNT(*) FROM entrees_semantiques').fetchone()[0]
+            ids = np.empty(nombre, dtype=np.int64)
+            vecteurs = np.empty((nombre, self.dimension), dtype=np.float32)
+            for rang, (identifiant, vecteur) in enumerate(
+                    lecture.execute('SELECT id, vecteur FROM entrees_semantiques ORDER BY id')):
+                ids[rang] = identifiant
+                vecteurs[rang] = np.frombuffer(vecteur, dtype=np.float32)
+            lecture.execute('COMMIT')
+        finally:
+            lecture.close()
+        id_max = int(ids[-1]) if nombre else 0
+
+        index = construire_index(vecteurs, ids, self.dimension)
+        temporaire = f'{self.fichier_index}.{os.getpid()}.tmp'
+        faiss.write_index(index, temporaire)
+        del index, vecteurs
+        os.replace(temporaire, self.fichier_index)
+        instantane = charger_index(self.fichier_index)
+
+        with self._verrou:
+            if self.dossier != dossier:
+                return
+            self._instantane = instantane
+            self._id_max_instantane = id_max
+            self._evincees_instantane = 0
+            self._delta.remove_ids(faiss.IDSelectorRange(0, id_max + 1))
+        logger.info(f"Cache sémantique : instantané de {len(ids)} entrées reconstruit en "
+                    f"{time.perf_counter() - debut:.1f} s")
+
+    async def lire(self, question: str, portee: str) -> Optional[str]:
+        trouvee = await asyncio.to_thread(self.chercher, question, portee)
+        return trouvee[0] if trouvee is not None else None
+
+    async def ecrire(self, question: str, portee: str, reponse: str, tokens: int = 0):
+        await asyncio.to_thread(self.ajouter, question, portee, reponse, tokens)
+
+    def vider(self):
+        self.attendre_reconstruction()
+        with self._verrou:
+            if not self.actif:
+                return
+            self._connexion.execute('DELETE FROM entrees_semantiques')
+            self._delta.reset()
+            self._instantane = None
+            self._id_max_instantane = 0
+            self._evincees_instantane = 0
+            self._taille = 0
+            if os.path.exists(self.fichier_index):
+                os.remove(self.fichier_index)
+
+    def statistiques(self) -> Dict[str, Any]:
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                'actif': self.actif,
+                'dossier': self.dossier,
+                'taille': self._taille,
+                'taille_max': self.taille_max,
+                'instantane': self._instantane.ntotal if self._instantane is not None else 0,
+                'memoire': self._delta.ntotal,
+                'seuil': self.seuil,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'taux_succes': round(self.hits / total, 4) if total else 0.0,
+                'tokens_economises': self.tokens_economises
+            }
+
+
+cache_semantique_fiscal = CacheSemantique()
+
+
+def configurer_cache_semantique() -> CacheSemantique:
+    """
+    Active le cache sémantique de l'agent fiscal si LMNP_CACHE_SEMANTIQUE_DOSSIER est défini :
+    la projection par hachage rapproche des questions de sens voisin mais pas identique,
+    le cache reste donc un choix explicite du déploiement
+    """
+    dossier = os.environ.get('LMNP_CACHE_SEMANTIQUE_DOSSIER')
+    if dossier:
+        cache_semantique_fiscal.ouvrir(dossier)
+    return cache_semantique_fiscal
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Calculs fiscaux LMNP vectorisés
+Traite des portefeuilles entiers (N biens × M années) en une seule passe NumPy,
+en centimes entiers, avec les mêmes arrondis (ROUND_HALF_UP) que le calcul unitaire
+"""
+
+from typing import Dict, List, Optional, Sequence
+from dataclasses import dataclass, fields
+from datetime import date
+from decimal import Decimal
+import logging
+
+import numpy as np
+
+from src.expertise_fiscale_lmnp import (
+    Amortissement,
+    BienImmobilier,
+    Depenses,
+    Emprunt,
+    ExpertiseFiscaleLMNP,
+    Recettes,
+    expert_fiscal,
+)
+
+logger = logging.getLogger(__name__)
+
+# Les parts terrain/construction sont manipulées en points de base (0.80 -> 8000)
+PRECISION_PART = 10_000
+
+# Nombre de jours utilisé par le prorata temporis (cf. calculer_amortissement)
+JOURS_ANNEE = 365
+
+# Borne haute des numérateurs intermédiaires pour rester en int64
+_MAX_INT64 = np.iinfo(np.int64).max
+
+
+def montant_vers_centimes(montant) -> int:
+    """Convertit un montant (Decimal, int, float ou str) en centimes entiers, sans perte"""
+    valeur = Decimal(str(montant)) if isinstance(montant, float) else Decimal(montant)
+    centimes = valeur.scaleb(2)
+    if centimes != centimes.to_integral_value():
+        raise ValueError(f"Montant non exprimable en centimes: {montant}")
+    return int(centimes)
+
+
+def part_vers_points_base(part) -> int:
+    """Convertit une part (0.80) en points de base (8000), sans perte"""
+    valeur = Decimal(str(part)) if isinstance(part, float) else Decimal(part)
+    points = valeur * PRECISION_PART
+    if points != points.to_integral_value():
+        raise ValueError(f"Part non exprimable en points de base: {part}")
+    return int(points)
+
+
+def centimes_vers_decimal(centimes: int) -> Decimal:
+    """Convertit des centimes entiers en Decimal à deux décimales"""
+    return Decimal(int(centimes)).scaleb(-2)
+
+
+def biens_vers_colonnes(biens: Sequence[BienImmobilier]) -> Dict[str, np.ndarray]:
+    """Transforme une liste de biens en colonnes prêtes pour calculer_amortissements_lot"""
+    return {
+        'prix_acquisition': np.array([montant_vers_centimes(b.prix_acquisition) for b in biens], dtype=np.int64),
+        'part_construction': np.array([part_vers_points_base(b.part_construction) for b in biens], dtype=np.int64),
+        'frais_notaire': np.array([montant_vers_centimes(b.frais_notaire) for b in biens], dtype=np.int64),
+        'frais_agence': np.array([montant_vers_centimes(b.frais_agence) for b in biens], dtype=np.int64),
+        'date_entree_lmnp': np.array([b.date_entree_lmnp for b in biens], dtype='datetime64[D]'),
+        'duree_amortissement_construction': np.array(
+            [b.duree_amortissement_construction for b in biens], dtype=np.int64
+        ),
+        'duree_amortissement_frais': np.array([b.duree_amortissement_frais for b in biens], dtype=np.int64),
+    }
+
+
+def _arrondir_demi_haut(numerateur: np.ndarray, denominateur: np.ndarray):
+    """
+    Division entière arrondie à l'unité la plus proche, moitié vers le haut
+    (numérateurs et dénominateurs positifs). Retourne aussi le masque des
+    égalités exactes à une demi-unité.
+    """
+    quotient, reste = np.divmod(numerateur, denominateur)
+    double_reste = 2 * reste
+    return quotient + (double_reste >= denominateur), double_reste == denominateur
+
+
+@dataclass
+class AmortissementsLot:
+    """
+    Amortissements de N biens sur M années, en centimes entiers.
+    Chaque champ est un tableau (N, M) ; les champs annuels ne dépendent pas de l'année.
+    """
+    annees: np.ndarray
+    construction_annuel: np.ndarray
+    construction_prorata: np.ndarray
+    frais_notaire_annuel: np.ndarray
+    frais_notaire_prorata: np.ndarray
+    frais_agence_annuel: np.ndarray
+    frais_agence_prorata: np.ndarray
+    total_annuel: np.ndarray
+    total_prorata: np.ndarray
+
+    CHAMPS = (
+        'construction_annuel', 'construction_prorata',
+        'frais_notaire_annuel', 'frais_notaire_prorata',
+        'frais_agence_annuel', 'frais_agence_prorata',
+        'total_annuel', 'total_prorata',
+    )
+
+    def amortissement(self, indice_bien: int, indice_annee: int) -> Amortissement:
+        """Reconstitue l'Amortissement (en Decimal) d'un bien pour une année"""
+        return Amortissement(**{
+            champ: centimes_vers_decimal(getattr(self, champ)[indice_bien, indice_annee])
+            for champ in self.CHAMPS
+        })
+
+
+def calculer_amortissements_lot(
+    prix_acquisition,
+    part_construction,
+    frais_notaire,
+    frais_agence,
+    date_entree_lmnp,
+    annees,
+    duree_amortissement_construction=25,
+    duree_amortissement_frais=15
+) -> AmortissementsLot:
+    """
+    Calcule les amortissements linéaires de N biens pour M années en une passe.
+
+    Montants en centimes entiers, part_construction en points de base, dates
+    en datetime64[D] (ou objets date), durées scalaires ou par bien.
+    Le résultat est identique au centime près à ExpertiseFiscaleLMNP.calculer_amortissement :
+    chaque valeur est calculée comme une fraction exacte puis arrondie ROUND_HALF_UP.
+    Les rares égalités exactes à un demi-centime, où l'arithmétique Decimal à 28
+    chiffres peut trancher différemment, sont recalculées par le chemin unitaire.
+    """
+    prix = np.asarray(prix_acquisition, dtype=np.int64)
+    part = np.asarray(part_construction, dtype=np.int64)
+    notaire = np.asarray(frais_notaire, dtype=np.int64)
+    agence = np.asarray(frais_agence, dtype=np.int64)
+    dates = np.asarray(date_entree_lmnp, dtype='datetime64[D]')
+    annees = np.asarray(annees, dtype=np.int64).reshape(-1)
+    nb_biens = prix.shape[0]
+    duree_c = np.broadcast_to(np.asarray(duree_amortissement_construction, dtype=np.int64), (nb_biens,))
+    duree_f = np.broadcast_to(np.asarray(duree_amortissement_frais, dtype=np.int64), (nb_biens,))
+
+    for nom, colonne in (('part_construction', part), ('frais_notaire', notaire),
+                         ('frais_agence', agence), ('date_entree_lmnp', dates)):
+        if colonne.shape != (nb_biens,):
+            raise ValueError(f"Colonne {nom} de taille {colonne.shape}, attendu ({nb_biens},)")
+    if nb_biens and (min(prix.min(), part.min(), notaire.min(), agence.min()) < 0):
+        raise ValueError("Les montants et parts doivent être positifs")
+    if nb_biens and min(duree_c.min(), duree_f.min()) <= 0:
+        raise ValueError("Les durées d'amortissement doivent être strictement positives")
+
+    if nb_biens:
+        # Plus grand numérateur manipulé : total prorata sur une année bissextile
+        borne = (
+            int(prix.max()) * int(part.max()) * int(duree_f.max())
+            + (int(notaire.max()) + int(agence.max())) * PRECISION_PART * int(duree_c.max())
+        ) * 366
+        if borne > _MAX_INT64:
+            raise ValueError("Montants trop élevés pour le calcul vectorisé en int64")
+
+    # Prorata temporis : jours restants l'année d'entrée, année pleine sinon
+    debut_annee = dates.astype('datetime64[Y]')
+    annee_entree = debut_annee.astype(np.int64) + 1970
+    fin_annee = (debut_annee + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')
+    jours_restants = (fin_annee - dates).astype(np.int64) + 1
+    premiere_annee = annee_entree[:, None] == annees[None, :]
+    jours = np.where(premiere_annee, jours_restants[:, None], JOURS_ANNEE)
+
+    # Fractions exactes (numérateur / dénominateur) en centimes
+    num_construction = prix * part
+    den_construction = PRECISION_PART * duree_c
+    num_total = num_construction * duree_f + (notaire + agence) * den_construction
+    den_total = den_construction * duree_f
+
+    construction_annuel, _ = _arrondir_demi_haut(num_construction, den_construction)
+    notaire_annuel, _ = _arrondir_demi_haut(notaire, duree_f)
+    agence_annuel, _ = _arrondir_demi_haut(agence, duree_f)
+    total_annuel, egalite_total_annuel = _arrondir_demi_haut(num_total, den_total)
+
+    construction_prorata, egalite_c = _arrondir_demi_haut(
+        num_construction[:, None] * jours, den_construction[:, None] * JOURS_ANNEE)
+    notaire_prorata, egalite_n = _arrondir_demi_haut(
+        notaire[:, None] * jours, duree_f[:, None] * JOURS_ANNEE)
+    agence_prorata, egalite_a = _arrondir_demi_haut(
+        agence[:, None] * jours, duree_f[:, None] * JOURS_ANNEE)
+    total_prorata, egalite_t = _arrondir_demi_haut(
+        num_total[:, None] * jours, den_total[:, None] * JOURS_ANNEE)
+
+    forme = (nb_biens, annees.shape[0])
+    lot = AmortissementsLot(
+        annees=annees,
+        construction_annuel=np.broadcast_to(construction_annuel[:, None], forme).copy(),
+        construction_prorata=construction_prorata,
+        frais_notaire_annuel=np.broadcast_to(notaire_annuel[:, None], forme).copy(),
+        frais_notaire_prorata=notaire_prorata,
+        frais_agence_annuel=np.broadcast_to(agence_annuel[:, None], forme).copy(),
+        frais_agence_prorata=agence_prorata,
+        total_annuel=np.broadcast_to(total_annuel[:, None], forme).copy(),
+        total_prorata=total_prorata,
+    )
+
+    # Une division unique tombant pile sur un demi-centime est exacte en Decimal ;
+    # seules les sommes et les produits par le prorata peuvent diverger
+    a_recalculer = egalite_total_annuel[:, None] | (
+        premiere_annee & (egalite_c | egalite_n | egalite_a | egalite_t)
+    )
+    for i, j in zip(*np.nonzero(a_recalculer)):
+        _recalculer_unitaire(lot, i, j, dates[i], duree_c[i], duree_f[i],
+                             prix[i], part[i], notaire[i], agence[i])
+
+    return lot
+
+
+def _recalculer_unitaire(lot: AmortissementsLot, i, j, date_entree, duree_c, duree_f,
+                         prix, part, notaire, agence):
+    """Recalcule une cellule du lot avec le moteur Decimal de référence"""
+    bien = BienImmobilier(
+        id=int(i),
+        adresse='',
+        date_entree_lmnp=date_entree.astype(date),
+        prix_acquisition=centimes_vers_decimal(prix),
+        frais_notaire=centimes_vers_decimal(notaire),
+        frais_agence=centimes_vers_decimal(agence),
+        part_terrain=Decimal(PRECISION_PART - int(part)) / PRECISION_PART,
+        part_construction=Decimal(int(part)) / PRECISION_PART,
+        duree_amortissement_construction=int(duree_c),
+        duree_amortissement_frais=int(duree_f)
+    )
+    amortissement = expert_fiscal.calculer_amortissement(bien, int(lot.annees[j]))
+    for champ in AmortissementsLot.CHAMPS:
+        getattr(lot, champ)[i, j] = montant_vers_centimes(getattr(amortissement, champ))
+
+
+def calculer_amortissements_portefeuille(biens: Sequence[BienImmobilier], annees) -> AmortissementsLot:
+    """Calcule les amortissements d'une liste de biens pour plusieurs années"""
+    return calculer_amortissements_lot(annees=annees, **biens_vers_colonnes(biens))
+
+
+class _MontantsLot:
+    """
+    Montants de N objets d'une même dataclass, stockés en une matrice (N, champs)
+    de centimes int64 : une colonne par champ, sans objet Python par bien
+    """
+    __slots__ = ('montants',)
+    CLASSE = None
+
+    def __init__(self, montants):
+        montants = np.asarray(montants, dtype=np.int64)
+        if montants.ndim != 2 or montants.shape[1] != len(self.champs()):
+            raise ValueError(f"Matrice de forme {montants.shape}, attendu (N, {len(self.champs())})")
+        self.montants = montants
+
+    @classmethod
+    def champs(cls) -> tuple:
+        return tuple(champ.name for champ in fields(cls.CLASSE))
+
+    @classmethod
+    def vide(cls, nombre: int):
+        return cls(np.zeros((nombre, len(cls.champs())), dtype=np.int64))
+
+    @classmethod
+    def depuis_objets(cls, objets: Sequence):
+        """Construit le lot à partir d'objets (None compte pour des montants nuls)"""
+        lot = cls.vide(len(objets))
+        for i, objet in enumerate(objets):
+            if objet is not None:
+                lot.montants[i] = [montant_vers_centimes(getattr(objet, champ)) for champ in lot.champs()]
+        return lot
+
+    def colonne(self, champ: str) -> np.ndarray:
+        return self.montants[:, self.champs().index(champ)]
+
+    def totaux(self) -> np.ndarray:
+        """Somme des champs de chaque objet (centimes)"""
+        return self.montants.sum(axis=1)
+
+    def __len__(self) -> int:
+        return self.montants.shape[0]
+
+    def __getitem__(self, indice: int):
+        """Reconstitue l'objet (en Decimal) d'une ligne du lot"""
+        return self.CLASSE(*(centimes_vers_decimal(v) for v in self.montants[indice]))
+
+    @property
+    def nbytes(self) -> int:
+        return self.montants.nbytes
+
+
+class RecettesLot(_MontantsLot):
+    """Recettes de N biens en colonnes"""
+    __slots__ = ()
+    CLASSE = Recettes
+
+
+class DepensesLot(_MontantsLot):
+    """Dépenses de N biens en colonnes (15 champs)"""
+    __slots__ = ()
+    CLASSE = Depenses
+
+
+class EmpruntsLot(_MontantsLot):
+    """Emprunts de N biens en colonnes ; un bien sans emprunt a des montants nuls"""
+    __slots__ = ()
+    CLASSE = Emprunt
+
+
+@dataclass(slots=True)
+class BiensLot:
+    """
+    N biens en colonnes typées : montants en centimes, parts en points de base,
+    dates en datetime64[D]. Les adresses, inutiles aux calculs, sont facultatives.
+    """
+    ids: np.ndarray
+    prix_acquisition: np.ndarray
+    frais_notaire: np.ndarray
+    frais_agence: np.ndarray
+    part_construction: np.ndarray
+    date_entree_lmnp: np.ndarray
+    duree_amortissement_construction: np.ndarray
+    duree_amortissement_frais: np.ndarray
+    adresses: Optional[List[str]] = None
+
+    @classmethod
+    def depuis_objets(cls, biens: Sequence[BienImmobilier], adresses: bool = True) -> 'BiensLot':
+        colonnes = biens_vers_colonnes(biens)
+        return cls(
+            ids=np.array([b.id for b in biens], dtype=np.int64),
+            prix_acquisition=colonnes['prix_acquisition'],
+            frais_notaire=colonnes['frais_notaire'],
+            frais_agence=colonnes['frais_agence'],
+            part_construction=colonnes['part_construction'].astype(np.int16),
+            date_entree_lmnp=colonnes['date_entree_lmnp'],
+            duree_amortissement_construction=colonnes['duree_amortissement_construction'].astype(np.int16),
+            duree_amortissement_frais=colonnes['duree_amortissement_frais'].astype(np.int16),
+            adresses=[b.adresse for b in biens] if adresses else None
+        )
+
+    def colonnes(self) -> Dict[str, np.ndarray]:
+        """Colonnes au format de calculer_amortissements_lot"""
+        return {
+            'prix_acquisition': self.prix_acquisition,
+            'part_construction': self.part_construction,
+            'frais_notaire': self.frais_notaire,
+            'frais_agence': self.frais_agence,
+            'date_entree_lmnp': self.date_entree_lmnp,
+            'duree_amortissement_construction': self.duree_amortissement_construction,
+            'duree_amortissement_frais': self.duree_amortissement_frais,
+        }
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def __getitem__(self, indice: int) -> BienImmobilier:
+        """Reconstitue le BienImmobilier (en Decimal) d'une ligne du lot"""
+        part = int(self.part_construction[indice])
+        return BienImmobilier(
+            id=int(self.ids[indice]),
+            adresse=self.adresses[indice] if self.adresses is not None else '',
+            date_entree_lmnp=self.date_entree_lmnp[indice].astype(date),
+            prix_acquisition=centimes_vers_decimal(self.prix_acquisition[indice]),
+            frais_notaire=centimes_vers_decimal(self.frais_notaire[indice]),
+            frais_agence=centimes_vers_decimal(self.frais_agence[indice]),
+            part_terrain=Decimal(PRECISION_PART - part) / PRECISION_PART,
+            part_construction=Decimal(part) / PRECISION_PART,
+            duree_amortissement_construction=int(self.duree_amortissement_construction[indice]),
+            duree_amortissement_frais=int(self.duree_amortissement_frais[indice])
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Taille des colonnes numériques (hors adresses)"""
+        return sum(colonne.nbytes for colonne in self.colonnes().values()) + self.ids.nbytes
+
+
+def calculer_resultats_lot(
+    biens: BiensLot,
+    recettes: RecettesLot,
+    depenses: DepensesLot,
+    annee: int,
+    emprunts: Optional[EmpruntsLot] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Résultat fiscal de N biens pour une année, en centimes : mêmes champs et mêmes
+    valeurs que ExpertiseFiscaleLMNP.calculer_resultat_bien, bien par bien
+    """
+    nombre = len(biens)
+    for nom, lot in (('recettes', recettes), ('depenses', depenses), ('emprunts', emprunts)):
+        if lot is not None and len(lot) != nombre:
+            raise ValueError(f"Lot {nom} de taille {len(lot)}, attendu {nombre}")
+
+    amortissements = calculer_amortissements_lot(annees=[annee], **biens.colonnes())
+    annee_entree = biens.date_entree_lmnp.astype('datetime64[Y]').astype(np.int64) + 1970
+    amort_a_deduire = np.where(
+        annee_entree == annee, amortissements.total_prorata[:, 0], amortissements.total_annuel[:, 0]
+    )
+
+    total_recettes = recettes.totaux()
+    total_depenses = depenses.totaux()
+    total_interets = emprunts.totaux() if emprunts is not None else np.zeros(nombre, dtype=np.int64)
+    resultat_avant_amort = total_recettes - total_depenses - total_interets
+
+    return {
+        'recettes_totales': total_recettes,
+        'depenses_totales': total_depenses,
+        'interets_totaux': total_interets,
+        'amortissements': amort_a_deduire,
+        'resultat_avant_amortissement': resultat_avant_amort,
+        'resultat_apres_amortissement': resultat_avant_amort - amort_a_deduire
+    }
+
+
+@dataclass
+class BalayageRegimes:
+    """
+    Comparaison micro-BIC / réel sur une grille recettes × charges × amortissements.
+    Montants en centimes ; tableaux de forme (R, C, A) sauf mention contraire.
+    """
+    recettes: np.ndarray
+    charges: np.ndarray
+    amortissements: np.ndarray
+    micro_bic_possible: np.ndarray  # (R,)
+    base_imposable_micro: np.ndarray  # (R,)
+    base_imposable_reel: np.ndarray
+    micro_bic_recommande: np.ndarray
+    economie_estimee: np.ndarray
+    # Charges (hors amortissements) en dessous desquelles le micro-BIC l'emporte,
+    # en euros exacts ; NaN si le micro-BIC n'est pas accessible. Forme (R, A)
+    charges_equilibre: np.ndarray
+
+
+def balayer_regimes(recettes, charges, amortissements=(0,)) -> BalayageRegimes:
+    """
+    Évalue optimiser_regime_fiscal(recettes, charges + amortissements) sur toute la grille
+    en une passe (montants en centimes), au centime près.
+
+    Le point d'équilibre est calculé analytiquement : le micro-BIC est recommandé
+    si et seulement si charges + amortissements < recettes × abattement.
+    """
+    recettes = np.asarray(recettes, dtype=np.int64).reshape(-1)
+    charges = np.asarray(charges, dtype=np.int64).reshape(-1)
+    amortissements = np.asarray(amortissements, dtype=np.int64).reshape(-1)
+    if recettes.size and recettes.min() < 0:
+        raise ValueError("Les recettes doivent être positives")
+
+    seuil = int(ExpertiseFiscaleLMNP.SEUIL_MICRO_BIC * 100)
+    abattement = part_vers_points_base(ExpertiseFiscaleLMNP.ABATTEMENT_MICRO_BIC)
+
+    r = recettes[:, None, None]
+    possible = recettes <= seuil
+    # Bases exprimées en 1/PRECISION_PART de centime pour rester exactes
+    micro = np.where(possible, recettes * (PRECISION_PART - abattement), recettes * PRECISION_PART)
+    base_reel = r - (charges[None, :, None] + amortissements[None, None, :])
+    reel = base_reel * PRECISION_PART
+    micro_3d = micro[:, None, None]
+    possible_3d = possible[:, None, None]
+
+    recommande = possible_3d & (micro_3d < reel)
+    economie = np.where(recommande, reel - micro_3d, np.where(possible_3d, micro_3d - reel, 0))
+
+    equilibre = (recettes[:, None] * abattement - amortissements[None, :] * PRECISION_PART) / (PRECISION_PART * 100)
+
+    return BalayageRegimes(
+        recettes=recettes,
+        charges=charges,
+        amortissements=amortissements,
+        micro_bic_possible=possible,
+        base_imposable_micro=_arrondir_demi_haut(micro, PRECISION_PART)[0],
+        base_imposable_reel=base_reel,
+        micro_bic_recommande=recommande,
+        economie_estimee=_arrondir_demi_haut(economie, PRECISION_PART)[0],
+        charges_equilibre=np.where(possible[:, None], equilibre, np.nan)
+    )
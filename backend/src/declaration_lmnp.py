@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Calcul d'une déclaration LMNP complète
+Agrège les résultats fiscaux de tous les biens d'une déclaration et ne recalcule,
+à chaque modification, que la contribution du bien concerné
+"""
+
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+from decimal import Decimal
+import logging
+import threading
+
+from src.cache_lmnp import CacheLRU
+from src.expertise_fiscale_lmnp import (
+    BienImmobilier,
+    CHAMPS_DECIMAUX_BIEN,
+    Depenses,
+    Emprunt,
+    ExpertiseFiscaleLMNP,
+    Recettes,
+    _convertir_montants,
+    expert_fiscal,
+)
+
+logger = logging.getLogger(__name__)
+
+# Champs additifs du résultat d'un bien (cf. calculer_resultat_bien)
+CHAMPS_RESULTAT = (
+    'recettes_totales',
+    'depenses_totales',
+    'interets_totaux',
+    'amortissements',
+    'resultat_avant_amortissement',
+    'resultat_apres_amortissement'
+)
+
+# Correspondance des champs JSON du frontend (camelCase) vers les dataclasses fiscales
+RECETTES_JSON = {
+    'loyersBruts': 'loyers_bruts',
+    'autresRecettes': 'autres_recettes'
+}
+
+DEPENSES_JSON = {
+    'fraisGestion': 'frais_gestion',
+    'chargesCopropriete': 'charges_copropriete',
+    'assurances': 'assurances',
+    'fraisMenageEntretien': 'frais_menage_entretien',
+    'fraisPlateformes': 'frais_plateformes',
+    'fraisComptabilite': 'frais_comptabilite',
+    'abonnements': 'abonnements',
+    'taxeFonciere': 'taxes_fonciere',
+    'taxeHabitation': 'taxes_habitation',
+    'taxeSejour': 'taxe_sejour',
+    'cfe': 'cfe',
+    'chargesSociales': 'charges_sociales',
+    'depensesDiverses': 'depenses_diverses',
+    'petitsTravaux': 'petits_travaux',
+    'petitsMeubles': 'petits_meubles'
+}
+
+EMPRUNT_JSON = {
+    'interetsAnnuels': 'interets_annuels',
+    'assuranceEmprunt': 'assurance_emprunt',
+    'fraisDossier': 'frais_dossier',
+    'fraisCourtier': 'frais_courtier'
+}
+
+
+def _depuis_json(data: Dict, correspondance: Dict[str, str]) -> Dict[str, Decimal]:
+    """Extrait et convertit en Decimal les champs connus d'un payload camelCase"""
+    return _convertir_montants({
+        champ: data[cle] for cle, champ in correspondance.items() if data.get(cle) is not None
+    })
+
+
+def recettes_depuis_json(data: Dict) -> Recettes:
+    """Construit des Recettes à partir du payload du frontend"""
+    valeurs = _depuis_json(data, RECETTES_JSON)
+    valeurs.setdefault('loyers_bruts', Decimal('0'))
+    return Recettes(**valeurs)
+
+
+def depenses_depuis_json(data: Dict) -> Depenses:
+    """Construit des Depenses à partir du payload du frontend"""
+    return Depenses(**_depuis_json(data, DEPENSES_JSON))
+
+
+def emprunt_depuis_json(data: Optional[Dict]) -> Optional[Emprunt]:
+    """Construit un Emprunt à partir du payload du frontend (None sans intérêts)"""
+    valeurs = _depuis_json(data or {}, EMPRUNT_JSON)
+    return Emprunt(**valeurs) if 'interets_annuels' in valeurs else None
+
+
+@dataclass
+class ContributionBien:
+    """Données et résultat fiscal d'un bien au sein d'une déclaration"""
+    bien: BienImmobilier
+    recettes: Recettes
+    depenses: Depenses
+    emprunt: Optional[Emprunt]
+    resultat: Dict[str, Decimal]
+
+
+class CalculateurDeclaration:
+    """
+    Résultat fiscal d'une déclaration multi-biens
+
+    Conserve le résultat partiel de chaque bien et les totaux de la déclaration.
+    Une modification des recettes, dépenses ou de l'emprunt d'un bien ne recalcule
+    que ce bien et ajuste les totaux de l'écart : le coût est indépendant du nombre de biens.
+    """
+
+    def __init__(self, declaration_id: int, annee: int, expert: ExpertiseFiscaleLMNP = expert_fiscal):
+        self.declaration_id = declaration_id
+        self.annee = annee
+        self.expert = expert
+        self.contributions: Dict[int, ContributionBien] = {}
+        self.totaux = {champ: Decimal('0') for champ in CHAMPS_RESULTAT}
+        self._verrou = threading.Lock()
+
+    def ajouter_bien(self, bien: BienImmobilier, recettes: Recettes, depenses: Depenses,
+                     emprunt: Optional[Emprunt] = None,
+                     resultat: Optional[Dict[str, Decimal]] = None) -> Dict[str, Decimal]:
+        """
+        Ajoute (ou remplace) un bien et retourne son résultat ;
+        un résultat déjà connu (résultat persisté à jour) évite le recalcul
+        """
+        with self._verrou:
+            ancienne = self.contributions.get(bien.id)
+            contribution = ContributionBien(bien, recettes, depenses, emprunt, resultat={})
+            self._recalculer(contribution, ancienne.resultat if ancienne else None, resultat)
+            self.contributions[bien.id] = contribution
+            return contribution.resultat
+
+    def retirer_bien(self, bien_id: int) -> bool:
+        """Retire un bien de la déclaration"""
+        with self._verrou:
+            contribution = self.contributions.pop(bien_id, None)
+            if contribution is None:
+                return False
+            for champ in CHAMPS_RESULTAT:
+                self.totaux[champ] -= contribution.resultat[champ]
+            return True
+
+    def mettre_a_jour_recettes(self, bien_id: int, recettes: Recettes) -> Dict[str, Decimal]:
+        """Remplace les recettes d'un bien et ajuste les totaux"""
+        return self._mettre_a_jour(bien_id, recettes=recettes)
+
+    def mettre_a_jour_depenses(self, bien_id: int, depenses: Depenses) -> Dict[str, Decimal]:
+        """Remplace les dépenses d'un bien et ajuste les totaux"""
+        return self._mettre_a_jour(bien_id, depenses=depenses)
+
+    def mettre_a_jour_emprunt(self, bien_id: int, emprunt: Optional[Emprunt]) -> Dict[str, Decimal]:
+        """Remplace l'emprunt d'un bien et ajuste les totaux"""
+        return self._mettre_a_jour(bien_id, emprunt=emprunt)
+
+    def contient(self, bien_id: int) -> bool:
+        return bien_id in self.contributions
+
+    def synthese(self) -> Dict:
+        """Totaux de la déclaration et optimisation du régime, en types JSON"""
+        with self._verrou:
+            totaux = dict(self.totaux)
+            nombre_biens = len(self.contributions)
+        charges = totaux['depenses_totales'] + totaux['interets_totaux'] + totaux['amortissements']
+        optimisation = self.expert.optimiser_regime_fiscal(totaux['recettes_totales'], charges)
+        return {
+            'declarationId': self.declaration_id,
+            'annee': self.annee,
+            'nombreBiens': nombre_biens,
+            'totaux': {champ: float(valeur) for champ, valeur in totaux.items()},
+            'regimeRecommande': optimisation['regime_recommande'],
+            'economieEstimee': float(optimisation['economie_estimee']),
+            'conseils': self.expert.generer_conseils_optimisation(totaux)
+        }
+
+    def resultats_biens(self) -> Dict[int, Dict[str, float]]:
+        """Résultat partiel de chaque bien, en types JSON"""
+        with self._verrou:
+            return {
+                bien_id: {champ: float(valeur) for champ, valeur in contribution.resultat.items()}
+                for bien_id, contribution in self.contributions.items()
+            }
+
+    def _mettre_a_jour(self, bien_id: int, **modifications) -> Dict[str, Decimal]:
+        with self._verrou:
+            contribution = self.contributions.get(bien_id)
+            if contribution is None:
+                raise KeyError(f"Bien {bien_id} absent de la déclaration {self.declaration_id}")
+            ancien_resultat = contribution.resultat
+            for attribut, valeur in modifications.items():
+                setattr(contribution, attribut, valeur)
+            self._recalculer(contribution, ancien_resultat)
+            return contribution.resultat
+
+    def _recalculer(self, contribution: ContributionBien, ancien_resultat: Optional[Dict[str, Decimal]],
+                    resultat: Optional[Dict[str, Decimal]] = None):
+        """Recalcule un bien et reporte l'écart sur les totaux (appelé sous verrou)"""
+        if resultat is None:
+            resultat = self.expert.calculer_resultat_bien(
+                contribution.bien, contribution.recettes, contribution.depenses, contribution.emprunt, self.annee
+            )
+        for champ in CHAMPS_RESULTAT:
+            self.totaux[champ] += resultat[champ] - (ancien_resultat[champ] if ancien_resultat else 0)
+        contribution.resultat = resultat
+
+
+class RegistreDeclarations:
+    """Calculateurs des déclarations en cours d'édition, retrouvables par bien"""
+
+    def __init__(self, taille_max: int = 10_000):
+        self._biens: Dict[int, int] = {}
+        self._calculateurs = CacheLRU(taille_max, a_l_eviction=self._oublier)
+
+    def ouvrir(self, declaration_id: int, annee: int) -> CalculateurDeclaration:
+        """Crée un calculateur vierge pour la déclaration (remplace l'existant)"""
+        self._calculateurs.invalider(declaration_id)
+        calculateur = CalculateurDeclaration(declaration_id, annee)
+        self._calculateurs.set(declaration_id, calculateur)
+        return calculateur
+
+    def inscrire(self, calculateur: CalculateurDeclaration) -> CalculateurDeclaration:
+        """Inscrit un calculateur déjà alimenté (remplace l'existant) et rattache ses biens"""
+        self._calculateurs.invalider(calculateur.declaration_id)
+        self._calculateurs.set(calculateur.declaration_id, calculateur)
+        for bien_id in calculateur.contributions:
+            self.rattacher(calculateur.declaration_id, bien_id)
+        return calculateur
+
+    def obtenir(self, declaration_id: int) -> Optional[CalculateurDeclaration]:
+        return self._calculateurs.get(declaration_id)
+
+    def rattacher(self, declaration_id: int, bien_id: int):
+        """Mémorise à quelle déclaration appartient un bien"""
+        self._biens[bien_id] = declaration_id
+
+    def pour_bien(self, bien_id: int) -> Optional[CalculateurDeclaration]:
+        """Retrouve le calculateur qui contient ce bien"""
+        declaration_id = self._biens.get(bien_id)
+        if declaration_id is None:
+            return None
+        calculateur = self._calculateurs.get(declaration_id)
+        return calculateur if calculateur is not None and calculateur.contient(bien_id) else None
+
+    def _oublier(self, declaration_id: int, calculateur: CalculateurDeclaration):
+        for bien_id in list(calculateur.contributions):
+            if self._biens.get(bien_id) == declaration_id:
+                del self._biens[bien_id]
+
+
+def ajouter_enregistrements(calculateur: CalculateurDeclaration, enregistrements: List[Dict],
+                            resultats: Optional[Dict[int, Dict[str, Decimal]]] = None) -> CalculateurDeclaration:
+    """
+    Ajoute au calculateur des enregistrements bien/recettes/depenses/emprunt
+    (même format que /api/calculs/resultat) ; resultats fournit, par id de bien,
+    des résultats déjà calculés
+    """
+    resultats = resultats or {}
+    for enregistrement in enregistrements:
+        emprunt_data = enregistrement.get('emprunt')
+        calculateur.ajouter_bien(
+            BienImmobilier(**_convertir_montants(enregistrement['bien'], CHAMPS_DECIMAUX_BIEN)),
+            Recettes(**_convertir_montants(enregistrement.get('recettes', {}))),
+            Depenses(**_convertir_montants(enregistrement.get('depenses', {}))),
+            Emprunt(**_convertir_montants(emprunt_data)) if emprunt_data else None,
+            resultats.get(enregistrement['bien'].get('id'))
+        )
+    return calculateur
+
+
+def charger_declaration(declaration_id: int, annee: int, enregistrements: List[Dict],
+                        registre: Optional[RegistreDeclarations] = None) -> CalculateurDeclaration:
+    """Construit le calculateur d'une déclaration et l'inscrit au registre (global par défaut)"""
+    registre = registre or registre_declarations
+    calculateur = ajouter_enregistrements(registre.ouvrir(declaration_id, annee), enregistrements)
+    for bien_id in calculateur.contributions:
+        registre.rattacher(declaration_id, bien_id)
+    return calculateur
+
+
+# Registre global des déclarations en cours de calcul
+registre_declarations = RegistreDeclarations()
@@ -4,15 +4,19 @@ Module d'Expertise Fiscale LMNP
 Implémente toutes les règles fiscales et calculs pour les locations meublées non professionnelles
 """
 
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, astuple
 from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
 import logging
+import os
+import threading
+
+from src.cache_lmnp import CacheLRU
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class BienImmobilier:
     """Représente un bien immobilier LMNP"""
     id: int
@@ -26,13 +30,31 @@ class BienImmobilier:
     duree_amortissement_construction: int = 25  # années
     duree_amortissement_frais: int = 15  # années
     
-@dataclass
+    def figer(self) -> 'BienImmobilierFige':
+        """Retourne la forme immuable et hashable du bien (empreinte pour les caches)"""
+        return BienImmobilierFige(*astuple(self))
+    
+@dataclass(frozen=True, slots=True)
+class BienImmobilierFige:
+    """Forme immuable de BienImmobilier, utilisable comme clé de cache"""
+    id: int
+    adresse: str
+    date_entree_lmnp: date
+    prix_acquisition: Decimal
+    frais_notaire: Decimal
+    frais_agence: Decimal
+    part_terrain: Decimal = Decimal('0.20')
+    part_construction: Decimal = Decimal('0.80')
+    duree_amortissement_construction: int = 25
+    duree_amortissement_frais: int = 15
+    
+@dataclass(slots=True)
 class Recettes:
     """Recettes d'un bien LMNP"""
     loyers_bruts: Decimal
     autres_recettes: Decimal = Decimal('0')
     
-@dataclass
+@dataclass(slots=True)
 class Depenses:
     """Dépenses d'un bien LMNP"""
     frais_gestion: Decimal = Decimal('0')
@@ -51,7 +73,7 @@ class Depenses:
     petits_travaux: Decimal = Decimal('0')
     petits_meubles: Decimal = Decimal('0')
     
-@dataclass
+@dataclass(slots=True)
 class Emprunt:
     """Informations sur l'emprunt d'un bien"""
     interets_annuels: Decimal
@@ -59,7 +81,7 @@ class Emprunt:
     frais_dossier: Decimal = Decimal('0')
     frais_courtier: Decimal = Decimal('0')
     
-@dataclass
+@dataclass(slots=True)
 class Amortissement:
     """Calcul des amortissements d'un bien"""
     construction_annuel: Decimal
@@ -71,6 +93,72 @@ class Amortissement:
     total_annuel: Decimal
     total_prorata: Decimal
 
+@dataclass(slots=True)
+class LigneAmortissement:
+    """Ligne du tableau d'amortissement pluriannuel d'un bien"""
+    annee: int
+    construction: Decimal
+    frais_notaire: Decimal
+    frais_agence: Decimal
+    total: Decimal
+    cumul: Decimal
+    valeur_residuelle: Decimal
+
+class _EtatTableauAmortissement:
+    """Tableau d'amortissement d'un bien, construit au fur et à mesure de sa lecture"""
+
+    def __init__(self, bien: BienImmobilier):
+        premiere_annee = bien.date_entree_lmnp.year
+        jours_restants = (date(premiere_annee, 12, 31) - bien.date_entree_lmnp).days + 1
+        self.premiere_annee = premiere_annee
+        # Le prorata ne peut dépasser une annuité pleine (1er janvier d'une année bissextile)
+        self.prorata = min(Decimal(jours_restants) / Decimal(365), Decimal('1'))
+        # (annuité non arrondie, base amortissable au centime, durée) par composante
+        self.composantes = [
+            (base / duree, base.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP), duree)
+            for base, duree in (
+                (bien.prix_acquisition * bien.part_construction, bien.duree_amortissement_construction),
+                (bien.frais_notaire, bien.duree_amortissement_frais),
+                (bien.frais_agence, bien.duree_amortissement_frais),
+            )
+        ]
+        self.base_totale = sum((base for _, base, _ in self.composantes), Decimal('0'))
+        self.cumuls = [Decimal('0')] * len(self.composantes)
+        self.lignes: List[LigneAmortissement] = []
+        self.verrou = threading.Lock()
+
+    def etendre(self) -> bool:
+        """Calcule la ligne suivante ; retourne False une fois le bien totalement amorti"""
+        indice = len(self.lignes)
+        cumul = self.lignes[-1].cumul if self.lignes else Decimal('0')
+        if cumul == self.base_totale:
+            return False
+
+        montants = []
+        for rang, (annuite, base, duree) in enumerate(self.composantes):
+            # Un prorata la première année décale le solde sur une année supplémentaire
+            derniere = duree - 1 if self.prorata == 1 else duree
+            restant = base - self.cumuls[rang]
+            if indice >= derniere:
+                montant = restant
+            else:
+                prorata = self.prorata if indice == 0 else Decimal('1')
+                montant = min((annuite * prorata).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP), restant)
+            self.cumuls[rang] += montant
+            montants.append(montant)
+
+        total = sum(montants, Decimal('0'))
+        self.lignes.append(LigneAmortissement(
+            annee=self.premiere_annee + indice,
+            construction=montants[0],
+            frais_notaire=montants[1],
+            frais_agence=montants[2],
+            total=total,
+            cumul=cumul + total,
+            valeur_residuelle=self.base_totale - cumul - total
+        ))
+        return True
+
 class ExpertiseFiscaleLMNP:
     """
     Expert-comptable virtuel spécialisé dans la fiscalité LMNP
@@ -81,8 +169,16 @@ class ExpertiseFiscaleLMNP:
     SEUIL_MICRO_BIC = Decimal('77700')  # Seuil micro-BIC
     ABATTEMENT_MICRO_BIC = Decimal('0.50')  # 50% d'abattement
     
+    # Version des règles de calcul (seuils, barèmes, méthodes) : à changer à chaque
+    # évolution, les résultats persistés sous une autre version sont recalculés
+    VERSION_REGLES = '2024.1'
+    
+    # Nombre de tableaux d'amortissement conservés en mémoire
+    TAILLE_CACHE_TABLEAUX = 1024
+    
     def __init__(self):
         self.annee_fiscale = datetime.now().year
+        self.cache_tableaux = CacheLRU(self.TAILLE_CACHE_TABLEAUX)
         
     def calculer_amortissement(self, bien: BienImmobilier, annee: int) -> Amortissement:
         """
@@ -131,6 +227,30 @@ class ExpertiseFiscaleLMNP:
             logger.error(f"Erreur calcul amortissement: {e}")
             raise
     
+    def tableau_amortissement(self, bien: BienImmobilier) -> Iterator[LigneAmortissement]:
+        """
+        Génère le tableau d'amortissement complet d'un bien, de l'année d'entrée
+        en LMNP jusqu'à la fin de la durée d'amortissement.
+        
+        L'année d'entrée est calculée au prorata temporis ; le reliquat est amorti
+        sur une année supplémentaire en fin de plan, de sorte que le cumul atteigne
+        exactement la base amortissable. Le générateur est paresseux et les lignes
+        déjà calculées sont partagées entre les lectures d'un même bien.
+        """
+        etat = self._etat_tableau(bien)
+        indice = 0
+        while True:
+            if indice >= len(etat.lignes):
+                with etat.verrou:
+                    if indice >= len(etat.lignes) and not etat.etendre():
+                        return
+            yield etat.lignes[indice]
+            indice += 1
+    
+    def _etat_tableau(self, bien: BienImmobilier) -> _EtatTableauAmortissement:
+        """Retrouve (ou crée) le tableau en cours de construction pour ce bien"""
+        return self.cache_tableaux.obtenir_ou_calculer(bien.figer(), lambda: _EtatTableauAmortissement(bien))
+    
     def calculer_total_depenses(self, depenses: Depenses) -> Decimal:
         """Calcule le total des dépenses déductibles"""
         return sum([
@@ -238,6 +358,17 @@ class ExpertiseFiscaleLMNP:
             'abattement_micro_bic': self.ABATTEMENT_MICRO_BIC
         }
     
+    def calculer_charges_equilibre(self, recettes_totales: Decimal,
+                                   amortissements: Decimal = Decimal('0')) -> Optional[Decimal]:
+        """
+        Niveau de charges (hors amortissements) à partir duquel le régime réel
+        devient au moins aussi avantageux que le micro-BIC, None si le micro-BIC
+        n'est pas accessible
+        """
+        if recettes_totales > self.SEUIL_MICRO_BIC:
+            return None
+        return recettes_totales * self.ABATTEMENT_MICRO_BIC - amortissements
+    
     def valider_repartition_terrain_construction(self, part_terrain: Decimal, part_construction: Decimal) -> bool:
         """Valide que la répartition terrain/construction est cohérente"""
         total = part_terrain + part_construction
@@ -308,9 +439,25 @@ class ExpertiseFiscaleLMNP:
 # Instance globale de l'expert fiscal
 expert_fiscal = ExpertiseFiscaleLMNP()
 
+# Moteurs de calcul disponibles : Decimal (référence) ou centimes entiers (src.moteur_centimes)
+MOTEURS_CALCUL = ('decimal', 'centimes')
+moteur_calcul_par_defaut = os.environ.get('LMNP_MOTEUR_CALCUL', 'decimal')
+
+def definir_moteur_calcul(moteur: str):
+    """Sélectionne globalement le moteur de calcul utilisé par les fonctions utilitaires"""
+    global moteur_calcul_par_defaut
+    moteur_calcul_par_defaut = _resoudre_moteur(moteur)
+
+def _resoudre_moteur(moteur: Optional[str]) -> str:
+    """Retourne le moteur demandé pour l'appel, ou le moteur global"""
+    moteur = moteur or moteur_calcul_par_defaut
+    if moteur not in MOTEURS_CALCUL:
+        raise ValueError(f"Moteur de calcul inconnu: {moteur} (attendu: {', '.join(MOTEURS_CALCUL)})")
+    return moteur
+
 # Fonctions utilitaires pour l'utilisation dans l'application
-def calculer_amortissement_bien(bien_data: Dict, annee: int = None) -> Dict:
-    """Fonction utilitaire pour calculer les amortissements"""
+def _convertir_bien(bien_data: Dict) -> BienImmobilier:
+    """Construit un BienImmobilier à partir de données JSON"""
     # Conversion des types pour éviter les erreurs float/Decimal
     bien_data_converted = {
         'id': bien_data['id'],
@@ -321,8 +468,37 @@ def calculer_amortissement_bien(bien_data: Dict, annee: int = None) -> Dict:
         'frais_agence': Decimal(str(bien_data['frais_agence']))
     }
     
-    bien = BienImmobilier(**bien_data_converted)
-    amortissement = expert_fiscal.calculer_amortissement(bien, annee or datetime.now().year)
+    return BienImmobilier(**bien_data_converted)
+
+# Cache des amortissements par (empreinte du bien, année)
+cache_amortissements = CacheLRU(
+    taille_max=int(os.environ.get('LMNP_CACHE_AMORTISSEMENT_TAILLE', 4096)),
+    ttl=float(os.environ.get('LMNP_CACHE_AMORTISSEMENT_TTL', 3600))
+)
+
+def configurer_cache_amortissement(taille_max: int = None, ttl: float = None):
+    """Ajuste la taille et la durée de vie (secondes, 0 = illimitée) du cache des amortissements"""
+    cache_amortissements.reconfigurer(taille_max=taille_max, ttl=ttl)
+
+def invalider_cache_bien(bien_id: int) -> int:
+    """Supprime des caches tous les calculs d'un bien (à appeler quand le bien est modifié)"""
+    supprimes = cache_amortissements.invalider_si(lambda cle: cle[0].id == bien_id)
+    supprimes += expert_fiscal.cache_tableaux.invalider_si(lambda cle: cle.id == bien_id)
+    return supprimes
+
+def calculer_amortissement_bien(bien_data: Dict, annee: int = None) -> Dict:
+    """Fonction utilitaire pour calculer les amortissements"""
+    bien = _convertir_bien(bien_data)
+    annee = annee or datetime.now().year
+    # L'empreinte couvre tous les champs du bien : toute modification change la clé
+    resultat = cache_amortissements.obtenir_ou_calculer(
+        (bien.figer(), annee),
+        lambda: _amortissement_en_json(expert_fiscal.calculer_amortissement(bien, annee))
+    )
+    return dict(resultat)
+
+def _amortissement_en_json(amortissement: Amortissement) -> Dict:
+    """Conversion en float pour JSON"""
     return {
         'construction_annuel': float(amortissement.construction_annuel),
         'construction_prorata': float(amortissement.construction_prorata),
@@ -334,20 +510,55 @@ def calculer_amortissement_bien(bien_data: Dict, annee: int = None) -> Dict:
         'total_prorata': float(amortissement.total_prorata)
     }
 
-def calculer_resultat_fiscal(bien_data: Dict, recettes_data: Dict, depenses_data: Dict, emprunt_data: Dict = None) -> Dict:
+def tableau_amortissement_bien(bien_data: Dict) -> List[Dict]:
+    """Fonction utilitaire pour obtenir le tableau d'amortissement complet"""
+    bien = _convertir_bien(bien_data)
+    return [
+        {
+            'annee': ligne.annee,
+            'construction': float(ligne.construction),
+            'frais_notaire': float(ligne.frais_notaire),
+            'frais_agence': float(ligne.frais_agence),
+            'total': float(ligne.total),
+            'cumul': float(ligne.cumul),
+            'valeur_residuelle': float(ligne.valeur_residuelle)
+        }
+        for ligne in expert_fiscal.tableau_amortissement(bien)
+    ]
+
+# Champs numériques d'un bien à convertir en Decimal
+CHAMPS_DECIMAUX_BIEN = ('prix_acquisition', 'frais_notaire', 'frais_agence', 'part_terrain', 'part_construction')
+
+def _convertir_montants(donnees: Dict, champs=None) -> Dict:
+    """Convertit les montants JSON (int/float) en Decimal"""
+    return {
+        cle: Decimal(str(valeur)) if champs is None or cle in champs else valeur
+        for cle, valeur in donnees.items()
+    }
+
+def calculer_resultat_fiscal(bien_data: Dict, recettes_data: Dict, depenses_data: Dict, emprunt_data: Dict = None,
+                             moteur: str = None) -> Dict:
     """Fonction utilitaire pour calculer le résultat fiscal complet"""
-    bien = BienImmobilier(**bien_data)
-    recettes = Recettes(**recettes_data)
-    depenses = Depenses(**depenses_data)
-    emprunt = Emprunt(**emprunt_data) if emprunt_data else None
+    if _resoudre_moteur(moteur) == 'centimes':
+        from src.moteur_centimes import moteur_centimes
+        return moteur_centimes.calculer_resultat_fiscal(bien_data, recettes_data, depenses_data, emprunt_data)
+    
+    bien = BienImmobilier(**_convertir_montants(bien_data, CHAMPS_DECIMAUX_BIEN))
+    recettes = Recettes(**_convertir_montants(recettes_data))
+    depenses = Depenses(**_convertir_montants(depenses_data))
+    emprunt = Emprunt(**_convertir_montants(emprunt_data)) if emprunt_data else None
     
     resultats = expert_fiscal.calculer_resultat_bien(bien, recettes, depenses, emprunt)
     
     # Conversion en float pour JSON
     return {k: float(v) for k, v in resultats.items()}
 
-def optimiser_regime(recettes_totales: float, charges_totales: float) -> Dict:
+def optimiser_regime(recettes_totales: float, charges_totales: float, moteur: str = None) -> Dict:
     """Fonction utilitaire pour l'optimisation du régime fiscal"""
+    if _resoudre_moteur(moteur) == 'centimes':
+        from src.moteur_centimes import moteur_centimes
+        return moteur_centimes.optimiser_regime(recettes_totales, charges_totales)
+    
     optimisation = expert_fiscal.optimiser_regime_fiscal(Decimal(str(recettes_totales)), Decimal(str(charges_totales)))
     
     # Conversion en types JSON-compatibles
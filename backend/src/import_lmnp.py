@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Import en masse de biens et de transactions depuis un fichier CSV ou XLSX
+Le fichier est lu en flux (openpyxl en lecture seule pour XLSX), validé par lots
+et écrit par insertions groupées (executemany), une transaction par lot :
+la mémoire consommée ne dépend pas de la taille du fichier.
+
+Les en-têtes reprennent les clés camelCase de l'API :
+- biens : declarationId, adresse, dateEntreeLmnp, prixAcquisition, et en option
+  codePostal, fraisNotaire, fraisAgence, partTerrain, partConstruction,
+  dureeAmortissementConstruction, dureeAmortissementFrais, ainsi que les rubriques
+  de recettes et de dépenses (loyersBruts, fraisGestion, taxeFonciere...) ;
+- transactions : bienId, date, categorie (rubrique de recettes, dépenses ou emprunt),
+  montant et en option libelle. Les montants de l'année de la déclaration sont
+  ensuite totalisés par rubrique dans les recettes, dépenses et emprunts du bien.
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import io
+import itertools
+import logging
+import time
+
+from sqlalchemy import func, insert, select
+
+from src.declaration_lmnp import DEPENSES_JSON, EMPRUNT_JSON, RECETTES_JSON
+from src.expertise_fiscale_lmnp import expert_fiscal
+from src.models.user import db
+from src.suivi_ecritures import marquer
+from src.models.lmnp import (
+    Bien,
+    Declaration,
+    DepensesBien,
+    EmpruntBien,
+    RecettesBien,
+    TransactionBien,
+)
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT_DEFAUT = 10_000
+
+CENTIME = Decimal('0.01')
+
+# Au-delà, les erreurs sont seulement comptées
+MAX_ERREURS_DETAILLEES = 1000
+
+# Rubriques importables : clé camelCase -> (modèle, colonne)
+RUBRIQUES = {
+    **{cle: (RecettesBien, champ) for cle, champ in RECETTES_JSON.items()},
+    **{cle: (DepensesBien, champ) for cle, champ in DEPENSES_JSON.items()},
+    **{cle: (EmpruntBien, champ) for cle, champ in EMPRUNT_JSON.items()},
+}
+
+# Nombre maximal d'identifiants par clause IN
+TAILLE_IN = 500
+
+
+class ErreurValidation(ValueError):
+    """Ligne rejetée à la validation"""
+
+
+@dataclass
+class ErreurLigne:
+    ligne: int
+    message: str
+
+    def to_dict(self) -> Dict:
+        return {'ligne': self.ligne, 'message': self.message}
+
+
+@dataclass
+class ResumeImport:
+    """Avancement puis bilan d'un import"""
+    type: str
+    lignes_lues: int = 0
+    lignes_importees: int = 0
+    lignes_rejetees: int = 0
+    lots: int = 0
+    biens_mis_a_jour: int = 0
+    erreurs: List[ErreurLigne] = field(default_factory=list)
+    duree: float = 0.0
+
+    def rejeter(self, ligne: int, message: str):
+        self.lignes_rejetees += 1
+        if len(self.erreurs) < MAX_ERREURS_DETAILLEES:
+            self.erreurs.append(ErreurLigne(ligne, message))
+
+    def to_dict(self, avec_erreurs: bool = True) -> Dict:
+        donnees = {
+            'import': self.type,
+            'lignesLues': self.lignes_lues,
+            'lignesImportees': self.lignes_importees,
+            'lignesRejetees': self.lignes_rejetees,
+            'lots': self.lots,
+            'biensMisAJour': self.biens_mis_a_jour,
+            'duree': round(self.duree, 3)
+        }
+        if avec_erreurs:
+            donnees['erreurs'] = [erreur.to_dict() for erreur in self.erreurs]
+            donnees['erreursTronquees'] = self.lignes_rejetees > len(self.erreurs)
+        return donnees
+
+
+# ==========================================
+# LECTURE EN FLUX
+# ==========================================
+
+def lire_lignes(fichier, format: str) -> Iterator[Tuple[int, Dict]]:
+    """Itère sur (numéro de ligne, valeurs par en-tête) d'un fichier binaire CSV ou XLSX"""
+    if format == 'xlsx':
+        return _lire_xlsx(fichier)
+    if format == 'csv':
+        return _lire_csv(fichier)
+    raise ValueError(f"Format non supporté: {format} (csv ou xlsx)")
+
+
+def _lire_csv(fichier) -> Iterator[Tuple[int, Dict]]:
+    texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    echantillon = texte.read(4096)
+    try:
+        dialecte = csv.Sniffer().sniff(echantillon, delimiters=',;\t')
+    except csv.Error:
+        dialecte = csv.excel
+    lecteur = csv.reader(_rechainer(echantillon, texte), dialecte)
+    en_tetes = [en_tete.strip() for en_tete in next(lecteur, [])]
+    for numero, valeurs in enumerate(lecteur, start=2):
+        if any(valeurs):
+            yield numero, dict(zip(en_tetes, valeurs))
+
+
+def _rechainer(echantillon: str, texte) -> Iterator[str]:
+    """Relit l'échantillon consommé par la détection du séparateur, puis la suite du flux"""
+    reste = io.StringIO(echantillon + texte.readline())
+    yield from reste
+    yield from texte
+
+
+def _lire_xlsx(fichier) -> Iterator[Tuple[int, Dict]]:
+    from openpyxl import load_workbook
+
+    classeur = load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        lignes = classeur.active.iter_rows(values_only=True)
+        en_tetes = [str(en_tete).strip() if en_tete is not None else '' for en_tete in next(lignes, ())]
+        for numero, valeurs in enumerate(lignes, start=2):
+            if any(valeur not in (None, '') for valeur in valeurs):
+                yield numero, dict(zip(en_tetes, valeurs))
+    finally:
+        classeur.close()
+
+
+# ==========================================
+# CONVERSIONS
+# ==========================================
+
+def _montant(valeur, nom: str, requis: bool = False) -> Optional[Decimal]:
+    """Montant CSV (1234.56, "1 234,56") ou XLSX (nombre) en Decimal au centime"""
+    if valeur is None or valeur == '':
+        if requis:
+            raise ErreurValidation(f"{nom} manquant")
+        return None
+    try:
+        montant = Decimal(str(valeur)) if isinstance(valeur, float) else Decimal(valeur)
+    except InvalidOperation:
+        # Séparateurs de milliers (espaces, espaces insécables) et virgule décimale
+        normalise = str(valeur).replace(' ', '').replace('\u00a0', '').replace('\u202f', '').replace(',', '.')
+        try:
+            montant = Decimal(normalise)
+        except InvalidOperation:
+            raise ErreurValidation(f"{nom} invalide: {valeur!r}")
+    if not montant.is_finite() or montant != montant.quantize(CENTIME):
+        raise ErreurValidation(f"{nom} invalide: {valeur!r}")
+    return montant
+
+
+def _date(valeur, nom: str) -> date:
+    """Date ISO (AAAA-MM-JJ), française (JJ/MM/AAAA) ou cellule date XLSX"""
+    if isinstance(valeur, datetime):
+        return valeur.date()
+    if isinstance(valeur, date):
+        return valeur
+    if not valeur:
+        raise ErreurValidation(f"{nom} manquant")
+    valeur = str(valeur).strip()
+    try:
+        if '/' in valeur:
+            jour, mois, annee = valeur.split('/')
+            return date(int(annee), int(mois), int(jour))
+        return date.fromisoformat(valeur)
+    except ValueError:
+        raise ErreurValidation(f"{nom} invalide: {valeur!r}")
+
+
+def _entier(valeur, nom: str, defaut: Optional[int] = None) -> int:
+    if valeur is None or valeur == '':
+        if defaut is None:
+            raise ErreurValidation(f"{nom} manquant")
+        return defaut
+    if type(valeur) is int:
+        return valeur
+    if isinstance(valeur, str) and valeur.isdigit():
+        return int(valeur)
+    # Cellules XLSX numériques (12.0) ou texte "12.0"
+    try:
+        nombre = float(valeur)
+    except (TypeError, ValueError):
+        raise ErreurValidation(f"{nom} invalide: {valeur!r}")
+    if not nombre.is_integer():
+        raise ErreurValidation(f"{nom} invalide: {valeur!r}")
+    return int(nombre)
+
+
+def _identifiants_existants(modele, identifiants: Set[int]) -> Set[int]:
+    """Identifiants présents en base, par paquets de TAILLE_IN"""
+    existants = set()
+    identifiants = list(identifiants)
+    for debut in range(0, len(identifiants), TAILLE_IN):
+        paquet = identifiants[debut:debut + TAILLE_IN]
+        existants.update(db.session.scalars(select(modele.id).where(modele.id.in_(paquet))))
+    return existants
+
+
+def _inserer_en_masse(table, lignes: List[Dict]):
+    """
+    INSERT par executemany directement sur le curseur du pilote : l'instruction est
+    compilée une fois par lot et chaque colonne convertie par le processeur du dialecte,
+    sans le coût par ligne de la construction des paramètres SQLAlchemy
+    """
+    connexion = db.session.connection()
+    dialecte = connexion.dialect
+    cles = list(lignes[0])
+    instruction = table.insert().compile(dialect=dialecte, column_keys=cles)
+    processeurs = {
+        cle: table.c[cle].type.dialect_impl(dialecte).bind_processor(dialecte) for cle in cles
+    }
+    if instruction.positional:
+        ordre = [(cle, processeurs[cle]) for cle in instruction.positiontup]
+        parametres = [
+            tuple(processeur(ligne[cle]) if processeur else ligne[cle] for cle, processeur in ordre)
+            for ligne in lignes
+        ]
+    else:
+        parametres = [
+            {cle: processeur(ligne[cle]) if processeur else ligne[cle] for cle, processeur in processeurs.items()}
+            for ligne in lignes
+        ]
+    connexion.exec_driver_sql(instruction.string, parametres)
+
+
+def _par_lots(lignes: Iterable, taille: int) -> Iterator[List]:
+    iterateur = iter(lignes)
+    while True:
+        lot = list(itertools.islice(iterateur, taille))
+        if not lot:
+            return
+        yield lot
+
+
+# ==========================================
+# IMPORT DES BIENS
+# ==========================================
+
+def _valider_bien(valeurs: Dict) -> Tuple[Dict, Dict[type, Dict]]:
+    """Ligne de bien -> (colonnes de biens, colonnes par modèle de recettes/dépenses)"""
+    adresse = str(valeurs.get('adresse') or '').strip()
+    if not adresse:
+        raise ErreurValidation("adresse manquante")
+    code_postal = str(valeurs.get('codePostal') or '').strip()
+    part_terrain, part_construction = expert_fiscal.suggerer_repartition_par_localisation(code_postal)
+    part_terrain = _montant(valeurs.get('partTerrain'), 'partTerrain') or part_terrain
+    part_construction = _montant(valeurs.get('partConstruction'), 'partConstruction') or part_construction
+    if not expert_fiscal.valider_repartition_terrain_construction(part_terrain, part_construction):
+        raise ErreurValidation("répartition terrain/construction incohérente")
+
+    bien = {
+        'declaration_id': _entier(valeurs.get('declarationId'), 'declarationId'),
+        'adresse': adresse,
+        'code_postal': code_postal or None,
+        'date_entree_lmnp': _date(valeurs.get('dateEntreeLmnp'), 'dateEntreeLmnp'),
+        'prix_acquisition': _montant(valeurs.get('prixAcquisition'), 'prixAcquisition', requis=True),
+        'frais_notaire': _montant(valeurs.get('fraisNotaire'), 'fraisNotaire') or Decimal('0'),
+        'frais_agence': _montant(valeurs.get('fraisAgence'), 'fraisAgence') or Decimal('0'),
+        'part_terrain': part_terrain,
+        'part_construction': part_construction,
+        'duree_amortissement_construction': _entier(
+            valeurs.get('dureeAmortissementConstruction'), 'dureeAmortissementConstruction', 25),
+        'duree_amortissement_frais': _entier(valeurs.get('dureeAmortissementFrais'), 'dureeAmortissementFrais', 15),
+        'credit_bancaire': False
+    }
+
+    montants: Dict[type, Dict] = {}
+    for cle, (modele, colonne) in RUBRIQUES.items():
+        montant = _montant(valeurs.get(cle), cle)
+        if montant is not None:
+            montants.setdefault(modele, {})[colonne] = montant
+    return bien, montants
+
+
+def importer_biens_par_lots(lignes: Iterable[Tuple[int, Dict]],
+                            taille_lot: int = TAILLE_LOT_DEFAUT) -> Iterator[ResumeImport]:
+    """
+    Importe des biens (et leurs recettes/dépenses éventuelles), une transaction par lot ;
+    produit le résumé après chaque lot
+    """
+    resume = ResumeImport('biens')
+    debut = time.perf_counter()
+    declarations_connues: Set[int] = set()
+
+    for lot in _par_lots(lignes, taille_lot):
+        resume.lignes_lues += len(lot)
+        valides = []
+        for numero, valeurs in lot:
+            try:
+                valides.append((numero, *_valider_bien(valeurs)))
+            except ErreurValidation as e:
+                resume.rejeter(numero, str(e))
+
+        inconnues = {bien['declaration_id'] for _, bien, _ in valides} - declarations_connues
+        declarations_connues |= _identifiants_existants(Declaration, inconnues)
+        a_inserer = []
+        for numero, bien, montants in valides:
+            if bien['declaration_id'] in declarations_connues:
+                a_inserer.append((bien, montants))
+            else:
+                resume.rejeter(numero, f"déclaration {bien['declaration_id']} introuvable")
+
+        if a_inserer:
+            identifiants = db.session.scalars(
+                insert(Bien).returning(Bien.id, sort_by_parameter_order=True),
+                [bien for bien, _ in a_inserer]
+            ).all()
+            for modele in (RecettesBien, DepensesBien, EmpruntBien):
+                lignes_modele = [
+                    {'bien_id': bien_id, **montants[modele]}
+                    for bien_id, (_, montants) in zip(identifiants, a_inserer) if modele in montants
+                ]
+                if lignes_modele:
+                    db.session.execute(insert(modele), lignes_modele)
+            marquer(db.session, declarations={bien['declaration_id'] for bien, _ in a_inserer})
+        db.session.commit()
+
+        resume.lignes_importees += len(a_inserer)
+        resume.lots += 1
+        resume.duree = time.perf_counter() - debut
+        yield resume
+
+    logger.info(f"Import biens: {resume.lignes_importees}/{resume.lignes_lues} lignes en {resume.duree:.2f} s")
+
+
+# ==========================================
+# IMPORT DES TRANSACTIONS
+# ==========================================
+
+def _valider_transaction(valeurs: Dict) -> Dict:
+    categorie = valeurs.get('categorie')
+    if categorie not in RUBRIQUES:
+        categorie = str(categorie or '').strip()
+        if categorie not in RUBRIQUES:
+            raise ErreurValidation(f"categorie inconnue: {categorie!r}")
+    libelle = valeurs.get('libelle')
+    return {
+        'bien_id': _entier(valeurs.get('bienId'), 'bienId'),
+        'date_operation': _date(valeurs.get('date'), 'date'),
+        'categorie': categorie,
+        'montant': _montant(valeurs.get('montant'), 'montant', requis=True),
+        'libelle': str(libelle)[:255] if libelle not in (None, '') else None
+    }
+
+
+def importer_transactions_par_lots(lignes: Iterable[Tuple[int, Dict]],
+                                  taille_lot: int = TAILLE_LOT_DEFAUT) -> Iterator[ResumeImport]:
+    """
+    Importe des transactions, une transaction SQL par lot, puis totalise les
+    rubriques des biens concernés dans leurs recettes, dépenses et emprunts ;
+    produit le résumé après chaque lot puis après la totalisation
+    """
+    resume = ResumeImport('transactions')
+    debut = time.perf_counter()
+    biens_connus: Set[int] = set()
+    biens_inconnus: Set[int] = set()
+
+    for lot in _par_lots(lignes, taille_lot):
+        resume.lignes_lues += len(lot)
+        valides = []
+        for numero, valeurs in lot:
+            try:
+                valides.append((numero, _valider_transaction(valeurs)))
+            except ErreurValidation as e:
+                resume.rejeter(numero, str(e))
+
+        a_verifier = {t['bien_id'] for _, t in valides} - biens_connus - biens_inconnus
+        existants = _identifiants_existants(Bien, a_verifier)
+        biens_connus |= existants
+        biens_inconnus |= a_verifier - existants
+
+        a_inserer = []
+        for numero, transaction in valides:
+            if transaction['bien_id'] in biens_connus:
+                a_inserer.append(transaction)
+            else:
+                resume.rejeter(numero, f"bien {transaction['bien_id']} introuvable")
+        if a_inserer:
+            _inserer_en_masse(TransactionBien.__table__, a_inserer)
+        db.session.commit()
+
+        resume.lignes_importees += len(a_inserer)
+        resume.lots += 1
+        resume.duree = time.perf_counter() - debut
+        yield resume
+
+    resume.biens_mis_a_jour = totaliser_transactions(biens_connus)
+    resume.duree = time.perf_counter() - debut
+    logger.info(f"Import transactions: {resume.lignes_importees}/{resume.lignes_lues} lignes en {resume.duree:.2f} s")
+    yield resume
+
+
+def _executer(etapes: Iterator[ResumeImport], type_import: str,
+              progression: Optional[Callable[[ResumeImport], None]]) -> ResumeImport:
+    resume = ResumeImport(type_import)
+    for resume in etapes:
+        if progression:
+            progression(resume)
+    return resume
+
+
+def importer_biens(lignes: Iterable[Tuple[int, Dict]], taille_lot: int = TAILLE_LOT_DEFAUT,
+                   progression: Optional[Callable[[ResumeImport], None]] = None) -> ResumeImport:
+    """Importe des biens et retourne le bilan ; progression est appelée après chaque lot"""
+    return _executer(importer_biens_par_lots(lignes, taille_lot), 'biens', progression)
+
+
+def importer_transactions(lignes: Iterable[Tuple[int, Dict]], taille_lot: int = TAILLE_LOT_DEFAUT,
+                          progression: Optional[Callable[[ResumeImport], None]] = None) -> ResumeImport:
+    """Importe des transactions et retourne le bilan ; progression est appelée après chaque lot"""
+    return _executer(importer_transactions_par_lots(lignes, taille_lot), 'transactions', progression)
+
+
+# Import par lots, par type de fichier importé
+IMPORTS_PAR_LOTS = {
+    'biens': importer_biens_par_lots,
+    'transactions': importer_transactions_par_lots,
+}
+
+
+def totaliser_transactions(biens_ids: Iterable[int]) -> int:
+    """
+    Reporte, pour chaque bien, la somme de ses transactions de l'année de sa déclaration
+    dans la rubrique correspondante ; les rubriques sans transaction sont conservées
+    """
+    biens_ids = sorted(biens_ids)
+    for debut in range(0, len(biens_ids), TAILLE_IN):
+        paquet = biens_ids[debut:debut + TAILLE_IN]
+        annees: Dict[int, List[int]] = {}
+        for bien_id, annee in db.session.execute(
+            select(Bien.id, Declaration.annee).join(Declaration).where(Bien.id.in_(paquet))
+        ):
+            annees.setdefault(annee, []).append(bien_id)
+
+        # Plage de dates de l'exercice : parcours de l'index (bien_id, date_operation)
+        totaux: Dict[int, Dict[str, Decimal]] = {}
+        for annee, ids in annees.items():
+            requete = (
+                select(TransactionBien.bien_id, TransactionBien.categorie, func.sum(TransactionBien.montant))
+                .where(TransactionBien.bien_id.in_(ids))
+                .where(TransactionBien.date_operation >= date(annee, 1, 1))
+                .where(TransactionBien.date_operation < date(annee + 1, 1, 1))
+                .group_by(TransactionBien.bien_id, TransactionBien.categorie)
+            )
+            for bien_id, categorie, total in db.session.execute(requete):
+                totaux.setdefault(bien_id, {})[categorie] = Decimal(str(total)).quantize(Decimal('0.01'))
+
+        for modele in (RecettesBien, DepensesBien, EmpruntBien):
+            lignes = {ligne.bien_id: ligne for ligne in db.session.scalars(
+                select(modele).where(modele.bien_id.in_(list(totaux))))}
+            for bien_id, rubriques in totaux.items():
+                colonnes = {RUBRIQUES[cle][1]: total for cle, total in rubriques.items() if RUBRIQUES[cle][0] is modele}
+                if not colonnes:
+                    continue
+                ligne = lignes.get(bien_id)
+                if ligne is None:
+                    ligne = modele(bien_id=bien_id, **{c.name: Decimal('0') for c in modele.__table__.columns
+                                                       if c.name != 'bien_id'})
+                    db.session.add(ligne)
+                for colonne, total in colonnes.items():
+                    setattr(ligne, colonne, total)
+        db.session.commit()
+    return len(biens_ids)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Résultats fiscaux persistés par (déclaration, bien, année)
+Le résultat de chaque bien est enregistré avec la version des règles de calcul
+(ExpertiseFiscaleLMNP.VERSION_REGLES) et resservi tel quel tant que ses entrées
+n'ont pas changé. L'invalidation suit les dépendances : toute écriture sur un bien,
+ses recettes, dépenses ou son emprunt supprime ses résultats dans la même
+transaction (cf. src/suivi_ecritures.py) ; un changement de version des règles
+rend caducs tous les résultats antérieurs.
+
+Le préchauffage calcule à l'avance les résultats de toutes les déclarations
+ouvertes (non télétransmises), avant le pic de déclarations de mai :
+    python -m src.instantanes_lmnp [--taille-lot 200]
+"""
+
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from decimal import Decimal
+import logging
+import time
+
+from sqlalchemy import delete, event, insert, select, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from src import suivi_ecritures
+from src.declaration_lmnp import CalculateurDeclaration, ajouter_enregistrements
+from src.expertise_fiscale_lmnp import ExpertiseFiscaleLMNP, expert_fiscal
+from src.models.lmnp import Bien, Declaration, ResultatInstantane
+
+logger = logging.getLogger(__name__)
+
+# Déclarations traitées par transaction lors du préchauffage
+TAILLE_LOT_PRECHAUFFAGE = 200
+# INSERT ... ON CONFLICT DO UPDATE par dialecte (insertion simple sinon)
+INSERTIONS_UPSERT = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+@dataclass
+class BilanInstantanes:
+    """Résultats resservis et recalculés"""
+    reutilises: int = 0
+    calcules: int = 0
+
+    def to_dict(self) -> Dict:
+        return {'reutilises': self.reutilises, 'calcules': self.calcules}
+
+
+def _invalider(session: Session, modifications: suivi_ecritures.Modifications):
+    for paquet in suivi_ecritures.par_paquets(modifications.biens):
+        session.execute(delete(ResultatInstantane).where(ResultatInstantane.bien_id.in_(paquet)))
+
+
+# Inscrit avant les abonnés qui relisent les résultats (statistiques du tableau de bord)
+suivi_ecritures.avant_validation.append(_invalider)
+
+
+@event.listens_for(Session, 'before_flush')
+def _supprimer_avec_parents(session, contexte_flush, instances):
+    """
+    Supprime les résultats des biens et déclarations supprimés avant que le flush
+    ne supprime ces lignes (tables créées avant ondelete='CASCADE', clés étrangères appliquées)
+    """
+    biens = [objet.id for objet in session.deleted if isinstance(objet, Bien) and objet.id is not None]
+    declarations = [objet.id for objet in session.deleted if isinstance(objet, Declaration) and objet.id is not None]
+    if biens or declarations:
+        session.execute(delete(ResultatInstantane).where(or_(
+            ResultatInstantane.bien_id.in_(biens), ResultatInstantane.declaration_id.in_(declarations)
+        )))
+
+
+def resultats_declaration(session: Session, declaration: Declaration,
+                          expert: ExpertiseFiscaleLMNP = expert_fiscal
+                          ) -> Tuple[CalculateurDeclaration, BilanInstantanes]:
+    """
+    Calculateur de la déclaration (biens et montants chargés) alimenté par les résultats
+    persistés à jour ; les résultats manquants ou d'une autre version des règles sont
+    calculés et écrits dans la transaction courante, sans commit
+    """
+    persistes = {
+        bien_id: (version, resultat) for bien_id, version, resultat in session.execute(
+            select(ResultatInstantane.bien_id, ResultatInstantane.version_regles, ResultatInstantane.resultat)
+            .where(ResultatInstantane.declaration_id == declaration.id,
+                   ResultatInstantane.annee == declaration.annee)
+        )
+    }
+    calculateur = CalculateurDeclaration(declaration.id, declaration.annee, expert)
+    bilan = BilanInstantanes()
+    nouveaux, perimes = [], []
+    for bien in declaration.biens:
+        version, resultat = persistes.get(bien.id, (None, None))
+        if version == expert.VERSION_REGLES:
+            ajouter_enregistrements(calculateur, [bien.enregistrement()], {
+                bien.id: {champ: Decimal(valeur) for champ, valeur in resultat.items()}
+            })
+            bilan.reutilises += 1
+            continue
+
+        ajouter_enregistrements(calculateur, [bien.enregistrement()])
+        ligne = {
+            'declaration_id': declaration.id, 'bien_id': bien.id, 'annee': declaration.annee,
+            'version_regles': expert.VERSION_REGLES,
+            'resultat': {champ: str(valeur) for champ, valeur in calculateur.contributions[bien.id].resultat.items()}
+        }
+        (perimes if bien.id in persistes else nouveaux).append(ligne)
+        bilan.calcules += 1
+
+    _ecrire_resultats(session, nouveaux, perimes)
+    return calculateur, bilan
+
+
+def _ecrire_resultats(session: Session, nouveaux: List[Dict], perimes: List[Dict]):
+    """
+    Écrit les résultats calculés en une insertion avec remplacement : les lignes qu'un
+    autre écrivain a insérées ou supprimées depuis leur lecture (calcul concurrent de la
+    même déclaration, préchauffage) ne font pas échouer la transaction
+    """
+    if not (nouveaux or perimes):
+        return
+    dialecte = session.get_bind().dialect.name
+    if dialecte not in INSERTIONS_UPSERT:
+        if nouveaux:
+            session.execute(insert(ResultatInstantane), nouveaux)
+        if perimes:
+            session.execute(update(ResultatInstantane), perimes)
+        return
+    requete = INSERTIONS_UPSERT[dialecte](ResultatInstantane)
+    requete = requete.on_conflict_do_update(
+        index_elements=[ResultatInstantane.declaration_id, ResultatInstantane.bien_id, ResultatInstantane.annee],
+        set_={'version_regles': requete.excluded.version_regles, 'resultat': requete.excluded.resultat,
+              'date_calcul': requete.excluded.date_calcul}
+    )
+    session.execute(requete, nouveaux + perimes)
+
+
+def _declarations_ouvertes(session: Session, apres: int, limite: int):
+    return session.scalars(
+        select(Declaration)
+        .options(selectinload(Declaration.biens).options(
+            joinedload(Bien.recettes), joinedload(Bien.depenses), joinedload(Bien.emprunt)
+        ))
+        .where(Declaration.teletransmise.is_(False), Declaration.id > apres)
+        .order_by(Declaration.id)
+        .limit(limite)
+    ).all()
+
+
+def prechauffer_instantanes(session: Session, taille_lot: int = TAILLE_LOT_PRECHAUFFAGE,
+                            expert: ExpertiseFiscaleLMNP = expert_fiscal) -> Dict:
+    """
+    Calcule les résultats manquants ou périmés de toutes les déclarations ouvertes,
+    une transaction par lot de déclarations (pagination par clé)
+    """
+    debut = time.perf_counter()
+    bilan = BilanInstantanes()
+    declarations, dernier_id = 0, 0
+    while True:
+        lot = _declarations_ouvertes(session, dernier_id, taille_lot)
+        if not lot:
+            break
+        for declaration in lot:
+            _, bilan_declaration = resultats_declaration(session, declaration, expert)
+            bilan.reutilises += bilan_declaration.reutilises
+            bilan.calcules += bilan_declaration.calcules
+        declarations += len(lot)
+        dernier_id = lot[-1].id
+        session.commit()
+        session.expunge_all()
+    duree = time.perf_counter() - debut
+    logger.info(f"Préchauffage: {declarations} déclarations, {bilan.calcules} résultats calculés en {duree:.2f} s")
+    return {'declarations': declarations, **bilan.to_dict(), 'versionRegles': expert.VERSION_REGLES,
+            'duree': round(duree, 3)}
+
+
+def main(arguments: Optional[list] = None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Préchauffage des résultats fiscaux des déclarations ouvertes")
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT_PRECHAUFFAGE)
+    args = parser.parse_args(arguments)
+
+    from src.main import app
+    from src.models.user import db
+    with app.app_context():
+        print(prechauffer_instantanes(db.session, args.taille_lot))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory, jsonify, request
 from flask_cors import CORS
 from src.models.user import db
+from src.base_donnees import ajouter_colonnes_manquantes, configurer_base_donnees
+from src.partitions import configurer_partitions
+from src.cache_agents import configurer_cache_agents
+from src.cache_semantique import configurer_cache_semantique
 from src.routes.user import user_bp
 from src.routes.lmnp_routes import lmnp_bp
 from src.routes.agents_routes import agents_bp
@@ -21,10 +25,15 @@ app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(lmnp_bp, url_prefix='/api')
 app.register_blueprint(agents_bp, url_prefix='/api')
 
-# Configuration base de données
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+# Configuration base de données (DATABASE_URL pour PostgreSQL, SQLite local sinon)
+configurer_base_donnees(app, db, os.path.join(os.path.dirname(__file__), 'database', 'app.db'))
+# Une base par cabinet (en-tête X-Tenant-Id) si LMNP_PARTITIONS est défini
+configurer_partitions(app, db, os.path.join(os.path.dirname(__file__), 'database', 'cabinets'))
+# Réponses des agents IA rejouées pour les demandes identiques (mémoire + disque)
+configurer_cache_agents(os.path.join(os.path.dirname(__file__), 'database', 'cache_agents.db'))
+# Réponses de l'agent fiscal rejouées pour les questions reformulées (index FAISS),
+# si LMNP_CACHE_SEMANTIQUE_DOSSIER est défini
+configurer_cache_semantique()
 
 # Route de santé pour vérifier que l'API fonctionne
 @app.route('/api/health')
@@ -39,6 +48,7 @@ def health_check():
 # Initialisation de la base de données
 with app.app_context():
     db.create_all()
+    ajouter_colonnes_manquantes(db.engine, db.metadata)
     print("✅ Base de données LMNP initialisée")
 
 @app.route('/', defaults={'path': ''})
@@ -0,0 +1,244 @@
+from datetime import datetime
+
+from src.models.user import db
+from src.declaration_lmnp import DEPENSES_JSON, EMPRUNT_JSON, RECETTES_JSON
+
+# Montants au centime, parts au point de base
+MONTANT = db.Numeric(12, 2)
+PART = db.Numeric(5, 4)
+
+
+def _montants_json(ligne, correspondance):
+    """Montants d'une ligne (recettes, dépenses, emprunt) au format camelCase du frontend"""
+    return {cle: float(getattr(ligne, champ)) for cle, champ in correspondance.items()}
+
+
+def _montants(ligne, correspondance):
+    """Montants d'une ligne avec les noms de champs des dataclasses fiscales"""
+    return {champ: getattr(ligne, champ) for champ in correspondance.values()}
+
+
+class Declaration(db.Model):
+    """Déclaration LMNP annuelle d'un contribuable"""
+    __tablename__ = 'declarations'
+    __table_args__ = (
+        db.Index('ix_declarations_user_annee', 'user_id', 'annee'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    annee = db.Column(db.Integer, nullable=False)
+    statut = db.Column(db.String(20), nullable=False, default='brouillon')
+    progression = db.Column(db.Integer, nullable=False, default=0)
+    teletransmise = db.Column(db.Boolean, nullable=False, default=False)
+    date_creation = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    date_modification = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+    # Version, incrémentée à chaque modification de la déclaration, de ses biens ou de leurs montants
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    biens = db.relationship('Bien', back_populates='declaration', cascade='all, delete-orphan',
+                            order_by='Bien.id')
+
+    def __repr__(self):
+        return f'<Declaration {self.user_id} {self.annee}>'
+
+    def to_dict(self, nombre_biens=None, recettes=None):
+        """Résumé de la déclaration (liste) ; les agrégats sont fournis par la requête de liste"""
+        return {
+            'id': self.id,
+            'annee': self.annee,
+            'statut': self.statut,
+            'progression': self.progression,
+            'biens': nombre_biens if nombre_biens is not None else len(self.biens),
+            'recettes': float(recettes or 0),
+            'dateCreation': self.date_creation.isoformat(),
+            'dateModification': self.date_modification.isoformat(),
+            'teletransmise': self.teletransmise
+        }
+
+    def to_dict_detail(self):
+        """Déclaration complète avec ses biens (biens et lignes chargés en amont)"""
+        return {**self.to_dict(nombre_biens=len(self.biens),
+                               recettes=sum((b.recettes.total for b in self.biens if b.recettes), 0)),
+                'biens': [bien.to_dict() for bien in self.biens]}
+
+
+class Bien(db.Model):
+    """Bien immobilier loué en meublé, rattaché à une déclaration"""
+    __tablename__ = 'biens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    declaration_id = db.Column(db.Integer, db.ForeignKey('declarations.id'), nullable=False, index=True)
+    adresse = db.Column(db.String(255), nullable=False)
+    code_postal = db.Column(db.String(10))
+    date_entree_lmnp = db.Column(db.Date, nullable=False)
+    prix_acquisition = db.Column(MONTANT, nullable=False)
+    frais_notaire = db.Column(MONTANT, nullable=False, default=0)
+    frais_agence = db.Column(MONTANT, nullable=False, default=0)
+    part_terrain = db.Column(PART, nullable=False, default=0.2)
+    part_construction = db.Column(PART, nullable=False, default=0.8)
+    duree_amortissement_construction = db.Column(db.Integer, nullable=False, default=25)
+    duree_amortissement_frais = db.Column(db.Integer, nullable=False, default=15)
+    credit_bancaire = db.Column(db.Boolean, nullable=False, default=False)
+
+    declaration = db.relationship('Declaration', back_populates='biens')
+    recettes = db.relationship('RecettesBien', uselist=False, cascade='all, delete-orphan')
+    depenses = db.relationship('DepensesBien', uselist=False, cascade='all, delete-orphan')
+    emprunt = db.relationship('EmpruntBien', uselist=False, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<Bien {self.id} {self.adresse}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'declarationId': self.declaration_id,
+            'adresse': self.adresse,
+            'codePostal': self.code_postal,
+            'dateEntreeLmnp': self.date_entree_lmnp.isoformat(),
+            'prixAcquisition': float(self.prix_acquisition),
+            'fraisNotaire': float(self.frais_notaire),
+            'fraisAgence': float(self.frais_agence),
+            'partTerrain': float(self.part_terrain),
+            'partConstruction': float(self.part_construction),
+            'dureeAmortissementConstruction': self.duree_amortissement_construction,
+            'dureeAmortissementFrais': self.duree_amortissement_frais,
+            'creditBancaire': self.credit_bancaire,
+            'recettes': _montants_json(self.recettes, RECETTES_JSON) if self.recettes else None,
+            'depenses': _montants_json(self.depenses, DEPENSES_JSON) if self.depenses else None,
+            'emprunt': _montants_json(self.emprunt, EMPRUNT_JSON) if self.emprunt else None
+        }
+
+    def enregistrement(self):
+        """Données du bien au format de charger_declaration (/api/calculs/resultat)"""
+        return {
+            'bien': {
+                'id': self.id,
+                'adresse': self.adresse,
+                'date_entree_lmnp': self.date_entree_lmnp,
+                'prix_acquisition': self.prix_acquisition,
+                'frais_notaire': self.frais_notaire,
+                'frais_agence': self.frais_agence,
+                'part_terrain': self.part_terrain,
+                'part_construction': self.part_construction,
+                'duree_amortissement_construction': self.duree_amortissement_construction,
+                'duree_amortissement_frais': self.duree_amortissement_frais
+            },
+            'recettes': _montants(self.recettes, RECETTES_JSON) if self.recettes else {'loyers_bruts': 0},
+            'depenses': _montants(self.depenses, DEPENSES_JSON) if self.depenses else {},
+            'emprunt': _montants(self.emprunt, EMPRUNT_JSON) if self.emprunt else None
+        }
+
+
+class RecettesBien(db.Model):
+    """Recettes annuelles d'un bien"""
+    __tablename__ = 'recettes'
+
+    bien_id = db.Column(db.Integer, db.ForeignKey('biens.id'), primary_key=True)
+    loyers_bruts = db.Column(MONTANT, nullable=False, default=0)
+    autres_recettes = db.Column(MONTANT, nullable=False, default=0)
+
+    @property
+    def total(self):
+        return self.loyers_bruts + self.autres_recettes
+
+
+class DepensesBien(db.Model):
+    """Dépenses déductibles annuelles d'un bien"""
+    __tablename__ = 'depenses'
+
+    bien_id = db.Column(db.Integer, db.ForeignKey('biens.id'), primary_key=True)
+    frais_gestion = db.Column(MONTANT, nullable=False, default=0)
+    charges_copropriete = db.Column(MONTANT, nullable=False, default=0)
+    assurances = db.Column(MONTANT, nullable=False, default=0)
+    frais_menage_entretien = db.Column(MONTANT, nullable=False, default=0)
+    frais_plateformes = db.Column(MONTANT, nullable=False, default=0)
+    frais_comptabilite = db.Column(MONTANT, nullable=False, default=0)
+    abonnements = db.Column(MONTANT, nullable=False, default=0)
+    taxes_fonciere = db.Column(MONTANT, nullable=False, default=0)
+    taxes_habitation = db.Column(MONTANT, nullable=False, default=0)
+    taxe_sejour = db.Column(MONTANT, nullable=False, default=0)
+    cfe = db.Column(MONTANT, nullable=False, default=0)
+    charges_sociales = db.Column(MONTANT, nullable=False, default=0)
+    depenses_diverses = db.Column(MONTANT, nullable=False, default=0)
+    petits_travaux = db.Column(MONTANT, nullable=False, default=0)
+    petits_meubles = db.Column(MONTANT, nullable=False, default=0)
+
+    @property
+    def total(self):
+        return sum(getattr(self, champ) for champ in DEPENSES_JSON.values())
+
+
+class EmpruntBien(db.Model):
+    """Frais d'emprunt annuels déductibles d'un bien"""
+    __tablename__ = 'emprunts'
+
+    bien_id = db.Column(db.Integer, db.ForeignKey('biens.id'), primary_key=True)
+    interets_annuels = db.Column(MONTANT, nullable=False, default=0)
+    assurance_emprunt = db.Column(MONTANT, nullable=False, default=0)
+    frais_dossier = db.Column(MONTANT, nullable=False, default=0)
+    frais_courtier = db.Column(MONTANT, nullable=False, default=0)
+
+
+class TransactionBien(db.Model):
+    """Opération (recette, dépense ou frais d'emprunt) importée pour un bien"""
+    __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_bien_date', 'bien_id', 'date_operation'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    bien_id = db.Column(db.Integer, db.ForeignKey('biens.id'), nullable=False)
+    date_operation = db.Column(db.Date, nullable=False)
+    # Clé camelCase d'une rubrique de recettes, dépenses ou emprunt (ex. loyersBruts, taxeFonciere)
+    categorie = db.Column(db.String(40), nullable=False)
+    montant = db.Column(MONTANT, nullable=False)
+    libelle = db.Column(db.String(255))
+
+
+class StatistiquesUtilisateur(db.Model):
+    """
+    Statistiques du tableau de bord d'un utilisateur, matérialisées : recalculées dans la
+    transaction qui modifie ses déclarations, biens, recettes ou dépenses (src/statistiques_lmnp.py)
+    """
+    __tablename__ = 'statistiques_utilisateurs'
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    # Déclaration la plus récente, base des totaux et de l'optimisation
+    declaration_id = db.Column(db.Integer)
+    total_biens = db.Column(db.Integer, nullable=False, default=0)
+    recettes_annuelles = db.Column(MONTANT, nullable=False, default=0)
+    economies_fiscales = db.Column(MONTANT, nullable=False, default=0)
+    declarations_completes = db.Column(db.Integer, nullable=False, default=0)
+    regime_recommande = db.Column(db.String(20))
+    conseil = db.Column(db.Text)
+    date_modification = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    def to_dict(self):
+        return {
+            'totalBiens': self.total_biens or 0,
+            'recettesAnnuelles': float(self.recettes_annuelles or 0),
+            'economiesFiscales': float(self.economies_fiscales or 0),
+            'declarationsCompletes': self.declarations_completes or 0,
+            'optimisationPossible': {
+                'regime': self.regime_recommande,
+                'economie': float(self.economies_fiscales),
+                'conseil': self.conseil
+            } if self.regime_recommande else None
+        }
+
+
+class ResultatInstantane(db.Model):
+    """
+    Résultat fiscal persisté d'un bien pour l'année d'une déclaration, sous une version
+    des règles de calcul ; supprimé dès que le bien ou ses montants changent (src/instantanes_lmnp.py)
+    """
+    __tablename__ = 'resultats_instantanes'
+
+    declaration_id = db.Column(db.Integer, db.ForeignKey('declarations.id', ondelete='CASCADE'), primary_key=True)
+    bien_id = db.Column(db.Integer, db.ForeignKey('biens.id', ondelete='CASCADE'), primary_key=True, index=True)
+    annee = db.Column(db.Integer, primary_key=True)
+    version_regles = db.Column(db.String(20), nullable=False)
+    # Champs de calculer_resultat_bien, montants en chaînes décimales (exacts)
+    resultat = db.Column(db.JSON, nullable=False)
+    date_calcul = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1,19 @@
+from src.models.user import db
+
+class PointControleReports(db.Model):
+    """Point de contrôle annuel du registre des reports (déficits et ARD) d'un contribuable"""
+    __tablename__ = 'point_controle_reports'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'annee', name='uq_point_controle_reports_user_annee'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    annee = db.Column(db.Integer, nullable=False)
+    # Données de l'année (entrées), ligne calculée et état des stocks après l'année
+    entrees = db.Column(db.JSON, nullable=False)
+    ligne = db.Column(db.JSON, nullable=False)
+    etat = db.Column(db.JSON, nullable=False)
+
+    def __repr__(self):
+        return f'<PointControleReports {self.user_id} {self.annee}>'
@@ -1,11 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from src.partitions import SessionPartitionnee
+
+# Session routée vers la base du cabinet quand le partitionnement est actif (src/partitions.py)
+db = SQLAlchemy(session_options={'class_': SessionPartitionnee})
 
 class User(db.Model):
+    # Recherche par préfixe (LIKE 'x%') sous PostgreSQL, quelle que soit la collation de la base
+    __table_args__ = (
+        db.Index('ix_user_username_prefixe', 'username', postgresql_ops={'username': 'text_pattern_ops'})
+        .ddl_if(dialect='postgresql'),
+        db.Index('ix_user_email_prefixe', 'email', postgresql_ops={'email': 'text_pattern_ops'})
+        .ddl_if(dialect='postgresql'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    # Version de la ligne, incrémentée à chaque modification (ETag, cf. src/cache_ressources.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     def __repr__(self):
         return f'<User {self.username}>'
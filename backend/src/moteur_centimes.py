@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Moteur de calcul fiscal LMNP en centimes entiers
+Alternative au moteur Decimal : les montants restent des entiers de bout en bout, avec
+des points d'arrondi explicites identiques au ROUND_HALF_UP du moteur Decimal. Comme
+lui, les montants saisis au-delà du centime ne sont pas arrondis en entrée : un calcul
+compte en unités de 10^-n euro, n étant le plus grand nombre de décimales de ses
+montants (2 dans le cas général), et n'arrondit au centime qu'aux mêmes points que
+le moteur Decimal.
+"""
+
+from typing import Dict, Optional
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+import logging
+
+from src.expertise_fiscale_lmnp import (
+    BienImmobilier,
+    CHAMPS_DECIMAUX_BIEN,
+    Depenses,
+    ExpertiseFiscaleLMNP,
+    _convertir_montants,
+    expert_fiscal,
+)
+from src.calculs_vectorises import JOURS_ANNEE, PRECISION_PART, part_vers_points_base
+
+logger = logging.getLogger(__name__)
+
+CHAMPS_DEPENSES = tuple(Depenses.__dataclass_fields__)
+CHAMPS_RECETTES = ('loyers_bruts', 'autres_recettes')
+CHAMPS_EMPRUNT = ('interets_annuels', 'assurance_emprunt', 'frais_dossier', 'frais_courtier')
+
+# Part construction par défaut de BienImmobilier, en points de base
+PART_CONSTRUCTION_DEFAUT = part_vers_points_base(BienImmobilier.__dataclass_fields__['part_construction'].default)
+
+
+def en_centimes(valeur) -> int:
+    """
+    Convertit un montant JSON (int, float, str ou Decimal) en centimes entiers.
+    Point d'arrondi unique en entrée : un montant au-delà du centime est arrondi ROUND_HALF_UP.
+    """
+    if type(valeur) is float:
+        # Chemin rapide : le float est l'arrondi d'un montant au centime (cas général des saisies)
+        centimes = round(valeur * 100)
+        if centimes / 100 == valeur:
+            return centimes
+        valeur = str(valeur)
+    elif isinstance(valeur, int):
+        return valeur * 100
+    return int(Decimal(valeur).scaleb(2).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def decimales_montant(valeur) -> int:
+    """Décimales nécessaires pour représenter exactement un montant JSON (2 au minimum)"""
+    if type(valeur) is float:
+        if round(valeur * 100) / 100 == valeur:
+            return 2
+        valeur = str(valeur)
+    elif isinstance(valeur, int):
+        return 2
+    exposant = Decimal(valeur).as_tuple().exponent
+    return max(2, -exposant) if isinstance(exposant, int) else 2
+
+
+def decimales_communes(*groupes: Optional[Dict]) -> int:
+    """Décimales d'un calcul : celles du montant le plus précis de ses données"""
+    return max((decimales_montant(valeur) for groupe in groupes if groupe for valeur in groupe.values()), default=2)
+
+
+def en_unites(valeur, decimales: int) -> int:
+    """Convertit un montant JSON en unités entières de 10^-decimales euro (exact si decimales suffit)"""
+    if decimales == 2:
+        return en_centimes(valeur)
+    if type(valeur) is float:
+        valeur = str(valeur)
+    elif isinstance(valeur, int):
+        return valeur * 10 ** decimales
+    return int(Decimal(valeur).scaleb(decimales).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def en_euros(centimes: int) -> float:
+    """Convertit des centimes en float pour JSON (identique à float(Decimal) au centime)"""
+    return centimes / 100
+
+
+def _arrondir_demi_haut(numerateur: int, denominateur: int) -> int:
+    """Division entière arrondie au plus proche, égalité loin de zéro (ROUND_HALF_UP)"""
+    quotient = (2 * abs(numerateur) + denominateur) // (2 * denominateur)
+    return quotient if numerateur >= 0 else -quotient
+
+
+def _valider_champs(donnees: Dict, champs, requis: str = None):
+    """Mêmes contrôles que la construction des dataclasses du moteur Decimal"""
+    inconnus = set(donnees) - set(champs)
+    if inconnus:
+        raise TypeError(f"Champs inconnus: {', '.join(sorted(inconnus))}")
+    if requis and requis not in donnees:
+        raise TypeError(f"Champ requis manquant: {requis}")
+
+
+class MoteurCentimes:
+    """
+    Moteur de calcul fiscal en centimes entiers
+    Mêmes règles et mêmes résultats que ExpertiseFiscaleLMNP, sans objets Decimal
+    """
+
+    SEUIL_MICRO_BIC = int(ExpertiseFiscaleLMNP.SEUIL_MICRO_BIC * 100)
+    ABATTEMENT_MICRO_BIC = part_vers_points_base(ExpertiseFiscaleLMNP.ABATTEMENT_MICRO_BIC)
+
+    def calculer_total_depenses(self, depenses: Dict[str, int]) -> int:
+        """Calcule le total des dépenses déductibles (centimes)"""
+        return sum(depenses.values())
+
+    def calculer_total_recettes(self, recettes: Dict[str, int]) -> int:
+        """Calcule le total des recettes (centimes)"""
+        return sum(recettes.values())
+
+    def calculer_total_interets(self, emprunt: Optional[Dict[str, int]]) -> int:
+        """Calcule le total des intérêts d'emprunt déductibles (centimes)"""
+        return sum(emprunt.values()) if emprunt else 0
+
+    def calculer_amortissement_deductible(self, bien_data: Dict, annee: int) -> int:
+        """
+        Amortissement total à déduire pour l'année (centimes) : prorata temporis
+        l'année d'entrée, annuité pleine ensuite. La fraction exacte est arrondie
+        ROUND_HALF_UP ; une égalité exacte à un demi-centime est confiée au moteur Decimal.
+        """
+        date_entree: date = bien_data['date_entree_lmnp']
+        montants = {cle: bien_data[cle] for cle in ('prix_acquisition', 'frais_notaire', 'frais_agence')}
+        n = decimales_communes(montants)
+        prix, notaire, agence = (en_unites(valeur, n) for valeur in montants.values())
+        part = part_vers_points_base(bien_data['part_construction']) \
+            if 'part_construction' in bien_data else PART_CONSTRUCTION_DEFAUT
+        duree_c = bien_data.get('duree_amortissement_construction', 25)
+        duree_f = bien_data.get('duree_amortissement_frais', 15)
+
+        numerateur = prix * part * duree_f + (notaire + agence) * PRECISION_PART * duree_c
+        denominateur = PRECISION_PART * duree_c * duree_f * 10 ** (n - 2)
+        if annee == date_entree.year:
+            numerateur *= (date(annee, 12, 31) - date_entree).days + 1
+            denominateur *= JOURS_ANNEE
+
+        if 2 * (numerateur % denominateur) == denominateur:
+            bien = BienImmobilier(**_convertir_montants(bien_data, CHAMPS_DECIMAUX_BIEN))
+            amortissement = expert_fiscal.calculer_amortissement(bien, annee)
+            total = amortissement.total_prorata if annee == date_entree.year else amortissement.total_annuel
+            return int(total * 100)
+        return _arrondir_demi_haut(numerateur, denominateur)
+
+    def calculer_resultat_bien(
+        self,
+        bien_data: Dict,
+        recettes: Dict[str, int],
+        depenses: Dict[str, int],
+        emprunt: Optional[Dict[str, int]] = None,
+        annee: int = None,
+        decimales: int = 2
+    ) -> Dict[str, int]:
+        """
+        Calcule le résultat fiscal d'un bien LMNP : montants en unités de 10^-decimales
+        euro (centimes par défaut), résultats arrondis au centime
+        """
+        if annee is None:
+            annee = expert_fiscal.annee_fiscale
+        unites_par_centime = 10 ** (decimales - 2)
+
+        total_recettes = self.calculer_total_recettes(recettes)
+        total_depenses = self.calculer_total_depenses(depenses)
+        total_interets = self.calculer_total_interets(emprunt)
+        amort_a_deduire = self.calculer_amortissement_deductible(bien_data, annee)
+
+        resultat_avant_amort = total_recettes - total_depenses - total_interets
+        resultat_apres_amort = resultat_avant_amort - amort_a_deduire * unites_par_centime
+
+        return {
+            cle: _arrondir_demi_haut(valeur, unites_par_centime)
+            for cle, valeur in (
+                ('recettes_totales', total_recettes),
+                ('depenses_totales', total_depenses),
+                ('interets_totaux', total_interets),
+                ('amortissements', amort_a_deduire * unites_par_centime),
+                ('resultat_avant_amortissement', resultat_avant_amort),
+                ('resultat_apres_amortissement', resultat_apres_amort)
+            )
+        }
+
+    def optimiser_regime_fiscal(self, recettes_totales: int, charges_totales: int,
+                                decimales: int = 2) -> Dict[str, object]:
+        """
+        Compare micro-BIC vs régime réel et recommande le plus avantageux : montants en
+        unités de 10^-decimales euro (centimes par défaut), résultats en centimes
+        """
+        unites_par_centime = 10 ** (decimales - 2)
+        # Bases exprimées en 1/PRECISION_PART d'unité pour rester exactes
+        if recettes_totales <= self.SEUIL_MICRO_BIC * unites_par_centime:
+            micro = recettes_totales * (PRECISION_PART - self.ABATTEMENT_MICRO_BIC)
+            micro_possible = True
+        else:
+            micro = recettes_totales * PRECISION_PART
+            micro_possible = False
+
+        base_imposable_reel = recettes_totales - charges_totales
+        reel = base_imposable_reel * PRECISION_PART
+
+        if micro_possible and micro < reel:
+            regime_recommande = "micro_bic"
+            economie = reel - micro
+        else:
+            regime_recommande = "reel"
+            economie = micro - reel if micro_possible else 0
+
+        return {
+            'regime_recommande': regime_recommande,
+            'micro_bic_possible': micro_possible,
+            'base_imposable_micro': _arrondir_demi_haut(micro, PRECISION_PART * unites_par_centime),
+            'base_imposable_reel': _arrondir_demi_haut(base_imposable_reel, unites_par_centime),
+            'economie_estimee': _arrondir_demi_haut(economie, PRECISION_PART * unites_par_centime),
+            'seuil_micro_bic': self.SEUIL_MICRO_BIC,
+            'abattement_micro_bic': self.ABATTEMENT_MICRO_BIC
+        }
+
+    # Points d'entrée JSON, équivalents aux fonctions utilitaires du moteur Decimal
+
+    def calculer_resultat_fiscal(self, bien_data: Dict, recettes_data: Dict, depenses_data: Dict,
+                                 emprunt_data: Dict = None) -> Dict:
+        """Calcule le résultat fiscal complet à partir de données JSON"""
+        _valider_champs(recettes_data, CHAMPS_RECETTES, 'loyers_bruts')
+        _valider_champs(depenses_data, CHAMPS_DEPENSES)
+        if emprunt_data:
+            _valider_champs(emprunt_data, CHAMPS_EMPRUNT, 'interets_annuels')
+
+        n = decimales_communes(recettes_data, depenses_data, emprunt_data)
+        resultats = self.calculer_resultat_bien(
+            bien_data,
+            {cle: en_unites(valeur, n) for cle, valeur in recettes_data.items()},
+            {cle: en_unites(valeur, n) for cle, valeur in depenses_data.items()},
+            {cle: en_unites(valeur, n) for cle, valeur in emprunt_data.items()} if emprunt_data else None,
+            decimales=n
+        )
+        return {cle: en_euros(valeur) for cle, valeur in resultats.items()}
+
+    def optimiser_regime(self, recettes_totales: float, charges_totales: float) -> Dict:
+        """Optimisation du régime fiscal à partir de montants JSON"""
+        n = max(decimales_montant(recettes_totales), decimales_montant(charges_totales))
+        optimisation = self.optimiser_regime_fiscal(en_unites(recettes_totales, n), en_unites(charges_totales, n),
+                                                    decimales=n)
+        return {
+            'regime_recommande': optimisation['regime_recommande'],
+            'micro_bic_possible': optimisation['micro_bic_possible'],
+            'base_imposable_micro': en_euros(optimisation['base_imposable_micro']),
+            'base_imposable_reel': en_euros(optimisation['base_imposable_reel']),
+            'economie_estimee': en_euros(optimisation['economie_estimee']),
+            'seuil_micro_bic': en_euros(optimisation['seuil_micro_bic']),
+            'abattement_micro_bic': optimisation['abattement_micro_bic'] / PRECISION_PART
+        }
+
+
+# Instance globale du moteur en centimes
+moteur_centimes = MoteurCentimes()
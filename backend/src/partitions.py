@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Partitionnement des données par cabinet (tenant)
+Mode optionnel (LMNP_PARTITIONS) : chaque cabinet dispose de sa propre base SQLite
+(LMNP_PARTITIONS=sqlite, un fichier par cabinet dans LMNP_PARTITIONS_DOSSIER) ou de son
+propre schéma PostgreSQL (LMNP_PARTITIONS=postgresql, schéma tenant_<id> de DATABASE_URL).
+Les écritures de cabinets différents ne se sérialisent plus sur un même fichier.
+
+Le cabinet de la requête est lu dans l'en-tête X-Tenant-Id ; la session SQLAlchemy
+(SessionPartitionnee) route alors chaque requête SQL vers le moteur du cabinet. Seuls
+les cabinets existants (fichier ou schéma) sont servis, un cabinet inconnu renvoie 404 :
+ils sont créés par l'administrateur (POST /api/admin/partitions). Les moteurs ouverts
+sont gardés dans un LRU borné (LMNP_PARTITIONS_MAX_MOTEURS) : le moteur évincé est
+fermé. En PostgreSQL, leurs pools se partagent LMNP_PARTITIONS_MAX_CONNEXIONS connexions.
+Sans en-tête, la base partagée habituelle est utilisée.
+"""
+
+from typing import Callable, Dict, List, Optional, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import re
+import threading
+
+from flask import current_app, g, has_app_context, jsonify, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import MetaData, create_engine, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import NullPool
+
+from src.base_donnees import activer_pragmas, ajouter_colonnes_manquantes, pragmas_sqlite, url_base_donnees
+from src.cache_lmnp import CacheLRU
+
+logger = logging.getLogger(__name__)
+
+CLE_EXTENSION = 'lmnp_partitions'
+ENTETE_PARTITION = 'X-Tenant-Id'
+MODES_PARTITIONS = ('sqlite', 'postgresql')
+MAX_MOTEURS_DEFAUT = 64
+# Connexions PostgreSQL de tous les moteurs de cabinets réunis (LMNP_PARTITIONS_MAX_CONNEXIONS)
+MAX_CONNEXIONS_DEFAUT = 64
+PREFIXE_SCHEMA = 'tenant_'
+# Identifiant de cabinet : sert de nom de fichier ou de schéma
+FORMAT_PARTITION = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+
+# Pool réduit par schéma PostgreSQL : les moteurs sont nombreux ; taille et débordement
+# sont répartis par options_pool() pour que le total reste sous max_connexions
+OPTIONS_POOL_PARTITION = {
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True,
+}
+TAILLE_POOL_PARTITION = 2
+
+T = TypeVar('T')
+
+
+class ErreurPartition(ValueError):
+    """Identifiant de cabinet invalide"""
+
+
+class PartitionInconnue(LookupError):
+    """Cabinet non créé"""
+
+
+def options_pool(max_moteurs: int, max_connexions: int) -> Dict:
+    """
+    Options du pool de chaque moteur PostgreSQL : max_moteurs moteurs ouverts à la fois
+    n'ouvrent jamais plus de max_connexions connexions au total
+    """
+    par_moteur = max_connexions // max_moteurs
+    if par_moteur < 1:
+        raise ValueError(f"LMNP_PARTITIONS_MAX_CONNEXIONS ({max_connexions}) inférieur au nombre de moteurs "
+                         f"ouverts (LMNP_PARTITIONS_MAX_MOTEURS={max_moteurs})")
+    taille = min(TAILLE_POOL_PARTITION, par_moteur)
+    return {**OPTIONS_POOL_PARTITION, 'pool_size': taille, 'max_overflow': par_moteur - taille}
+
+
+def valider_partition(partition: str) -> str:
+    partition = (partition or '').strip().lower()
+    if not FORMAT_PARTITION.match(partition):
+        raise ErreurPartition(f"Identifiant de cabinet invalide: {partition!r} (a-z, 0-9, '_' et '-', 63 max)")
+    return partition
+
+
+class RouteurPartitions:
+    """Moteurs SQLAlchemy par cabinet, ouverts à la demande et gardés dans un LRU borné"""
+
+    def __init__(self, mode: str, metadata: MetaData, dossier: Optional[str] = None,
+                 url_base: Optional[str] = None, max_moteurs: int = MAX_MOTEURS_DEFAUT,
+                 max_connexions: int = MAX_CONNEXIONS_DEFAUT):
+        if mode not in MODES_PARTITIONS:
+            raise ValueError(f"Mode de partitionnement inconnu: {mode} (disponibles: {', '.join(MODES_PARTITIONS)})")
+        if mode == 'sqlite' and not dossier:
+            raise ValueError("Dossier des bases SQLite requis (LMNP_PARTITIONS_DOSSIER)")
+        if mode == 'postgresql' and not (url_base or '').startswith('postgresql'):
+            raise ValueError("DATABASE_URL PostgreSQL requis pour le partitionnement par schéma")
+        self.mode = mode
+        self.metadata = metadata
+        self.dossier = dossier
+        self.url_base = url_base
+        self.options_pool = options_pool(max_moteurs, max_connexions) if mode == 'postgresql' else {}
+        self._moteurs = CacheLRU(max_moteurs, a_l_eviction=lambda partition, moteur: moteur.dispose())
+        self._verrou = threading.Lock()
+        self._moteur_administration: Optional[Engine] = None
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+    def moteur(self, partition: str) -> Engine:
+        """Moteur d'un cabinet existant, ouvert à la première utilisation (PartitionInconnue sinon)"""
+        moteur = self._moteurs.get(partition)
+        if moteur is not None:
+            return moteur
+        with self._verrou:
+            moteur = self._moteurs.get(partition, compter=False)
+            if moteur is None:
+                if not self.existe(partition):
+                    raise PartitionInconnue(f"Cabinet inconnu: {partition}")
+                moteur = self._creer_moteur(partition, **self.options_pool)
+                self._moteurs.set(partition, moteur)
+            return moteur
+
+    def existe(self, partition: str) -> bool:
+        """Le cabinet a été créé (fichier SQLite ou schéma PostgreSQL)"""
+        if self.mode == 'sqlite':
+            return os.path.isfile(self._fichier(partition))
+        with self._administration().connect() as connexion:
+            return connexion.execute(text(
+                "SELECT 1 FROM information_schema.schemata WHERE schema_name = :schema"
+            ), {'schema': PREFIXE_SCHEMA + partition}).first() is not None
+
+    def creer(self, partition: str) -> bool:
+        """Crée le cabinet (base ou schéma et tables) ; False s'il existait déjà"""
+        with self._verrou:
+            if self.existe(partition):
+                return False
+            if self.mode == 'postgresql':
+                with self._administration().begin() as connexion:
+                    connexion.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{PREFIXE_SCHEMA + partition}"'))
+            self._moteurs.set(partition, self._creer_moteur(partition, **self.options_pool))
+            logger.info(f"Partition créée: {partition} ({self.mode})")
+            return True
+
+    def _fichier(self, partition: str) -> str:
+        return os.path.join(self.dossier, partition + '.db')
+
+    def _creer_moteur(self, partition: str, tables: bool = True, **options) -> Engine:
+        """Moteur du cabinet ; tables : crée les tables et colonnes manquantes"""
+        if self.mode == 'sqlite':
+            moteur = create_engine(f"sqlite:///{self._fichier(partition)}", **options)
+            activer_pragmas(moteur, pragmas_sqlite())
+        else:
+            schema = PREFIXE_SCHEMA + partition
+            moteur = create_engine(self.url_base, **options)
+
+            @event.listens_for(moteur, 'connect')
+            def _chemin_de_recherche(connexion_dbapi, _):
+                curseur = connexion_dbapi.cursor()
+                curseur.execute(f'SET search_path TO "{schema}"')
+                curseur.close()
+
+        if tables:
+            self.metadata.create_all(moteur)
+            ajouter_colonnes_manquantes(moteur, self.metadata)
+            logger.info(f"Partition ouverte: {partition} ({self.mode})")
+        return moteur
+
+    def partitions(self) -> List[str]:
+        """Cabinets existants (fichiers SQLite ou schémas PostgreSQL)"""
+        if self.mode == 'sqlite':
+            return sorted(nom[:-3] for nom in os.listdir(self.dossier)
+                          if nom.endswith('.db') and FORMAT_PARTITION.match(nom[:-3]))
+        with self._administration().connect() as connexion:
+            schemas = connexion.execute(text(
+                "SELECT schema_name FROM information_schema.schemata WHERE schema_name LIKE :prefixe"
+            ), {'prefixe': PREFIXE_SCHEMA + '%'}).scalars()
+            return sorted(schema[len(PREFIXE_SCHEMA):] for schema in schemas)
+
+    def _administration(self) -> Engine:
+        """Moteur sans pool sur la base PostgreSQL (création et liste des schémas)"""
+        if self._moteur_administration is None:
+            self._moteur_administration = create_engine(self.url_base, poolclass=NullPool)
+        return self._moteur_administration
+
+    def pour_chaque_partition(self, fonction: Callable[[Connection], T], paralleles: int = 8) -> Dict[str, T]:
+        """
+        Exécute fonction(connexion) sur chaque cabinet, en parallèle ; résultats par cabinet.
+        Chaque cabinet est lu par un moteur éphémère sans pool, hors du LRU : le parcours
+        n'évince pas les moteurs des cabinets actifs et ouvre au plus `paralleles` connexions
+        """
+        def executer(partition):
+            moteur = self._creer_moteur(partition, tables=False, poolclass=NullPool)
+            try:
+                with moteur.connect() as connexion:
+                    return fonction(connexion)
+            finally:
+                moteur.dispose()
+
+        partitions = self.partitions()
+        with ThreadPoolExecutor(max_workers=max(1, min(paralleles, len(partitions)))) as executeur:
+            return dict(zip(partitions, executeur.map(executer, partitions)))
+
+    def fermer(self):
+        self._moteurs.vider()
+
+    def statistiques(self) -> Dict:
+        return {'mode': self.mode, **self._moteurs.statistiques()}
+
+
+class SessionPartitionnee(Session):
+    """Session Flask-SQLAlchemy routée vers la base du cabinet de la requête"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            partition = g.get('partition')
+            routeur = current_app.extensions.get(CLE_EXTENSION)
+            if partition is not None and routeur is not None:
+                return routeur.moteur(partition)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def partition_courante() -> Optional[str]:
+    """Cabinet de la requête en cours (None : base partagée)"""
+    return g.get('partition') if has_app_context() else None
+
+
+def routeur_courant() -> Optional[RouteurPartitions]:
+    return current_app.extensions.get(CLE_EXTENSION) if has_app_context() else None
+
+
+def configurer_partitions(app, db, dossier_defaut: str) -> Optional[RouteurPartitions]:
+    """
+    Active le partitionnement si LMNP_PARTITIONS est défini : routeur de moteurs et
+    lecture du cabinet (X-Tenant-Id, cabinet existant) avant chaque requête
+    """
+    mode = os.environ.get('LMNP_PARTITIONS', '').strip().lower()
+    if not mode:
+        return None
+    routeur = RouteurPartitions(
+        mode, db.metadata,
+        dossier=os.environ.get('LMNP_PARTITIONS_DOSSIER', dossier_defaut),
+        url_base=url_base_donnees('') if mode == 'postgresql' else None,
+        max_moteurs=int(os.environ.get('LMNP_PARTITIONS_MAX_MOTEURS', MAX_MOTEURS_DEFAUT)),
+        max_connexions=int(os.environ.get('LMNP_PARTITIONS_MAX_CONNEXIONS', MAX_CONNEXIONS_DEFAUT))
+    )
+    app.extensions[CLE_EXTENSION] = routeur
+
+    @app.before_request
+    def _lire_partition():
+        valeur = request.headers.get(ENTETE_PARTITION)
+        g.partition = None
+        if valeur is None:
+            return None
+        try:
+            partition = valider_partition(valeur)
+            routeur.moteur(partition)
+        except ErreurPartition as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except PartitionInconnue as e:
+            return jsonify({'success': False, 'error': str(e)}), 404
+        g.partition = partition
+        return None
+
+    logger.info(f"Partitionnement par cabinet activé ({mode})")
+    return routeur
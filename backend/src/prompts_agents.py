@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Construction des prompts des agents IA dans un budget de tokens
+Le contexte est sérialisé en JSON compact (sans indentation ni échappement des
+accents, facturés comme autant de tokens). S'il dépasse le budget de l'agent, les
+champs les moins pertinents sont d'abord résumés (listes réduites à leur effectif
+et à leurs totaux, textes tronqués) puis retirés : d'abord les champs absents des
+CHAMPS_PRIORITAIRES de l'agent, du plus volumineux au plus petit, puis les champs
+prioritaires en partant du dernier.
+
+Les tokens sont comptés avec tiktoken (encodage du modèle) ; la taille des prompts
+et la latence de chaque appel au modèle sont relevées par MesuresPrompts.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import deque
+import json
+import logging
+import threading
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Tokens ajoutés par le format chat : par message, et pour amorcer la réponse
+TOKENS_PAR_MESSAGE = 3
+TOKENS_AMORCE_REPONSE = 3
+# Estimation sans encodage tiktoken disponible
+CARACTERES_PAR_TOKEN = 4
+# Résumés : éléments de liste et caractères conservés
+ELEMENTS_CONSERVES = 5
+CARACTERES_CONSERVES = 300
+# Appels conservés pour les statistiques
+MESURES_CONSERVEES = 1000
+
+
+class CompteurTokens:
+    """
+    Nombre de tokens d'un texte pour un modèle. Si l'encodage tiktoken ne peut être
+    chargé (fichier absent du cache et pas d'accès réseau) ou si estimer est vrai,
+    le nombre est estimé.
+    """
+
+    def __init__(self, modele: str, estimer: bool = False):
+        self.modele = modele
+        self._encodage: Optional[tiktoken.Encoding] = None
+        self._charge = estimer
+        self._verrou = threading.Lock()
+
+    def prechauffer(self):
+        """Charge l'encodage en arrière-plan (téléchargement au premier lancement)"""
+        threading.Thread(target=self._encodeur, args=(True,), name='encodage-tiktoken', daemon=True).start()
+
+    def _encodeur(self, attendre: bool = False) -> Optional[tiktoken.Encoding]:
+        """
+        Encodage du modèle ; None (tokens estimés) tant qu'un autre fil le charge, sauf si
+        attendre : compter() tourne sur la boucle asynchrone partagée et ne doit pas s'y bloquer
+        """
+        if not self._charge:
+            if not self._verrou.acquire(blocking=attendre):
+                return None
+            try:
+                if not self._charge:
+                    try:
+                        self._encodage = tiktoken.encoding_for_model(self.modele)
+                    except Exception as e:
+                        logger.warning(f"Encodage tiktoken indisponible pour {self.modele}, tokens estimés: {e}")
+                    self._charge = True
+            finally:
+                self._verrou.release()
+        return self._encodage
+
+    @property
+    def exact(self) -> bool:
+        return self._encodeur() is not None
+
+    def compter(self, texte: str) -> int:
+        encodage = self._encodeur()
+        if encodage is None:
+            return -(-len(texte) // CARACTERES_PAR_TOKEN)
+        return len(encodage.encode(texte, disallowed_special=()))
+
+    def compter_messages(self, messages: Sequence[Dict[str, str]]) -> int:
+        return sum(TOKENS_PAR_MESSAGE + self.compter(message['content']) for message in messages) + TOKENS_AMORCE_REPONSE
+
+
+def serialiser_contexte(contexte: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(contexte or {}, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def resumer(valeur: Any) -> Any:
+    """Version abrégée d'une valeur volumineuse (liste, dictionnaire, texte) ; les autres sont inchangées"""
+    if isinstance(valeur, list):
+        if valeur and all(isinstance(element, dict) for element in valeur):
+            totaux: Dict[str, float] = {}
+            for element in valeur:
+                for cle, nombre in element.items():
+                    if isinstance(nombre, (int, float)) and not isinstance(nombre, bool):
+                        totaux[cle] = totaux.get(cle, 0) + nombre
+            return {'nombre': len(valeur), 'totaux': {cle: round(total, 2) for cle, total in totaux.items()}}
+        if len(valeur) > ELEMENTS_CONSERVES:
+            return valeur[:ELEMENTS_CONSERVES] + [f'… (+{len(valeur) - ELEMENTS_CONSERVES})']
+        return valeur
+    if isinstance(valeur, dict):
+        return {cle: element for cle, element in valeur.items() if not isinstance(element, (list, dict))}
+    if isinstance(valeur, str) and len(valeur) > CARACTERES_CONSERVES:
+        return valeur[:CARACTERES_CONSERVES] + '…'
+    return valeur
+
+
+def ajuster_contexte(contexte: Optional[Dict[str, Any]], budget: int, compteur: CompteurTokens,
+                     prioritaires: Sequence[str] = ()) -> Tuple[str, int, bool]:
+    """Contexte sérialisé dans la limite de budget tokens : (JSON, tokens, contexte réduit ?)"""
+    contexte = dict(contexte or {})
+    serialise = serialiser_contexte(contexte)
+    tokens = compteur.compter(serialise)
+    if tokens <= budget:
+        return serialise, tokens, False
+
+    # Du moins pertinent au plus pertinent
+    secondaires = sorted((cle for cle in contexte if cle not in prioritaires),
+                         key=lambda cle: len(serialiser_contexte({cle: contexte[cle]})), reverse=True)
+    ordre = secondaires + [cle for cle in reversed(prioritaires) if cle in contexte]
+    for cle in ordre:
+        for reduction in (resumer, None):
+            if reduction is None:
+                del contexte[cle]
+            else:
+                abrege = reduction(contexte[cle])
+                if abrege == contexte[cle]:
+                    continue
+                contexte[cle] = abrege
+            serialise = serialiser_contexte(contexte)
+            tokens = compteur.compter(serialise)
+            if tokens <= budget:
+                logger.info(f"Contexte réduit à {tokens} tokens (budget {budget})")
+                return serialise, tokens, True
+    return serialise, tokens, True
+
+
+class MesuresPrompts:
+    """Taille des prompts et latence des derniers appels au modèle, par agent"""
+
+    def __init__(self, taille: int = MESURES_CONSERVEES):
+        self._appels: deque = deque(maxlen=taille)
+        self._verrou = threading.Lock()
+        self.contextes_reduits = 0
+
+    def enregistrer(self, agent: str, tokens_prompt: int, tokens_contexte: int, latence_ms: float,
+                    contexte_reduit: bool = False, flux: bool = False):
+        with self._verrou:
+            self._appels.append({
+                'agent': agent, 'tokens_prompt': tokens_prompt, 'tokens_contexte': tokens_contexte,
+                'latence_ms': round(latence_ms, 1), 'contexte_reduit': contexte_reduit, 'flux': flux
+            })
+            self.contextes_reduits += contexte_reduit
+
+    def vider(self):
+        with self._verrou:
+            self._appels.clear()
+            self.contextes_reduits = 0
+
+    def statistiques(self, recents: int = 20) -> Dict[str, Any]:
+        with self._verrou:
+            appels = list(self._appels)
+        par_agent: Dict[str, List[Dict]] = {}
+        for appel in appels:
+            par_agent.setdefault(appel['agent'], []).append(appel)
+        agents = {}
+        for agent, liste in par_agent.items():
+            latences = sorted(appel['latence_ms'] for appel in liste)
+            agents[agent] = {
+                'appels': len(liste),
+                'tokens_prompt_moyen': round(sum(appel['tokens_prompt'] for appel in liste) / len(liste), 1),
+                'tokens_prompt_max': max(appel['tokens_prompt'] for appel in liste),
+                'latence_moyenne_ms': round(sum(latences) / len(latences), 1),
+                'latence_p95_ms': latences[int(len(latences) * 0.95)]
+            }
+        return {
+            'agents': agents,
+            'contextes_reduits': self.contextes_reduits,
+            'recents': appels[-recents:]
+        }
+
+
+mesures_prompts = MesuresPrompts()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Registre des reports fiscaux LMNP
+Suit, année après année, les déficits reportables et les amortissements réputés
+différés (ARD) d'un contribuable, en une seule passe linéaire
+
+Règles appliquées pour chaque année, dans cet ordre :
+- les déficits de plus de 10 ans expirent ;
+- un résultat avant amortissement négatif crée un déficit reportable,
+  et tout l'amortissement de l'année est différé ;
+- sinon, les déficits antérieurs s'imputent en premier (du plus ancien au plus
+  récent, car ils expirent), puis l'amortissement de l'année dans la limite du
+  résultat restant (il ne peut créer de déficit, l'excédent devient un ARD),
+  enfin le stock d'ARD, sans limite de durée.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field, fields
+from decimal import Decimal
+import logging
+
+from src.models.user import db
+from src.models.reports import PointControleReports
+
+logger = logging.getLogger(__name__)
+
+# Durée de report des déficits BIC non professionnels (années)
+DUREE_REPORT_DEFICIT = 10
+
+
+@dataclass
+class DeficitReportable:
+    """Déficit restant à imputer, par année d'origine"""
+    annee_origine: int
+    montant: Decimal
+
+
+@dataclass
+class EtatReports:
+    """Stocks de déficits et d'ARD après la dernière année traitée"""
+    annee: Optional[int] = None
+    deficits: List[DeficitReportable] = field(default_factory=list)
+    amortissements_differes: Decimal = Decimal('0')
+
+    @property
+    def total_deficits(self) -> Decimal:
+        return sum((d.montant for d in self.deficits), Decimal('0'))
+
+    def to_dict(self) -> Dict:
+        return {
+            'annee': self.annee,
+            'deficits': [{'annee_origine': d.annee_origine, 'montant': str(d.montant)} for d in self.deficits],
+            'amortissements_differes': str(self.amortissements_differes)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'EtatReports':
+        return cls(
+            annee=data['annee'],
+            deficits=[DeficitReportable(d['annee_origine'], Decimal(d['montant'])) for d in data['deficits']],
+            amortissements_differes=Decimal(data['amortissements_differes'])
+        )
+
+
+@dataclass
+class LigneReports:
+    """Détail du traitement d'une année"""
+    annee: int
+    resultat_avant_amortissement: Decimal
+    amortissement_exercice: Decimal
+    deficits_expires: Decimal
+    deficits_imputes: Decimal
+    amortissement_deduit: Decimal
+    amortissement_differe: Decimal
+    ard_imputes: Decimal
+    deficit_cree: Decimal
+    resultat_fiscal: Decimal
+    stock_deficits: Decimal
+    stock_ard: Decimal
+
+    def to_dict(self) -> Dict:
+        donnees = {}
+        for champ in fields(self):
+            valeur = getattr(self, champ.name)
+            donnees[champ.name] = valeur if isinstance(valeur, int) else float(valeur)
+        return donnees
+
+
+def traiter_annee(
+    etat: EtatReports,
+    annee: int,
+    resultat_avant_amortissement: Decimal,
+    amortissement_exercice: Decimal
+) -> Tuple[EtatReports, LigneReports]:
+    """Applique une année au registre ; retourne le nouvel état et le détail de l'année"""
+    if etat.annee is not None and annee <= etat.annee:
+        raise ValueError(f"Année {annee} déjà traitée (dernière année: {etat.annee})")
+
+    deficits = [d for d in etat.deficits if annee - d.annee_origine <= DUREE_REPORT_DEFICIT]
+    deficits_expires = etat.total_deficits - sum((d.montant for d in deficits), Decimal('0'))
+    stock_ard = etat.amortissements_differes
+    zero = Decimal('0')
+
+    if resultat_avant_amortissement < 0:
+        deficit_cree = -resultat_avant_amortissement
+        deficits.append(DeficitReportable(annee, deficit_cree))
+        deficits_imputes = amortissement_deduit = ard_imputes = zero
+        amortissement_differe = amortissement_exercice
+        resultat_fiscal = resultat_avant_amortissement
+    else:
+        deficit_cree = zero
+        restant = resultat_avant_amortissement
+
+        # Déficits antérieurs, du plus ancien au plus récent
+        deficits_imputes = zero
+        reliquat = []
+        for deficit in deficits:
+            impute = min(deficit.montant, restant)
+            restant -= impute
+            deficits_imputes += impute
+            if deficit.montant > impute:
+                reliquat.append(DeficitReportable(deficit.annee_origine, deficit.montant - impute))
+        deficits = reliquat
+
+        # Amortissement de l'exercice, sans créer de déficit
+        amortissement_deduit = min(amortissement_exercice, restant)
+        amortissement_differe = amortissement_exercice - amortissement_deduit
+        restant -= amortissement_deduit
+
+        # ARD des exercices antérieurs
+        ard_imputes = min(stock_ard, restant)
+        stock_ard -= ard_imputes
+        restant -= ard_imputes
+        resultat_fiscal = restant
+
+    stock_ard += amortissement_differe
+    nouvel_etat = EtatReports(annee=annee, deficits=deficits, amortissements_differes=stock_ard)
+    ligne = LigneReports(
+        annee=annee,
+        resultat_avant_amortissement=resultat_avant_amortissement,
+        amortissement_exercice=amortissement_exercice,
+        deficits_expires=deficits_expires,
+        deficits_imputes=deficits_imputes,
+        amortissement_deduit=amortissement_deduit,
+        amortissement_differe=amortissement_differe,
+        ard_imputes=ard_imputes,
+        deficit_cree=deficit_cree,
+        resultat_fiscal=resultat_fiscal,
+        stock_deficits=nouvel_etat.total_deficits,
+        stock_ard=stock_ard
+    )
+    return nouvel_etat, ligne
+
+
+def calculer_reports(
+    annees: Iterable[Tuple[int, Decimal, Decimal]],
+    etat_initial: Optional[EtatReports] = None
+) -> Tuple[EtatReports, List[LigneReports]]:
+    """Traite une suite d'années (annee, résultat avant amortissement, amortissement) en une passe"""
+    etat = etat_initial or EtatReports()
+    lignes = []
+    for annee, resultat_avant_amortissement, amortissement in sorted(annees, key=lambda a: a[0]):
+        etat, ligne = traiter_annee(etat, annee, resultat_avant_amortissement, amortissement)
+        lignes.append(ligne)
+    return etat, lignes
+
+
+def mettre_a_jour_reports(user_id: int, annees: Dict[int, Tuple[Decimal, Decimal]]) -> List[Dict]:
+    """
+    Met à jour le registre persistant d'un contribuable et retourne toutes ses lignes.
+
+    Les années déjà traitées avec les mêmes données sont reprises telles quelles :
+    le calcul repart du point de contrôle qui précède la première année nouvelle
+    ou modifiée. Une nouvelle année fiscale ne traite donc que cette année.
+    """
+    points = {
+        point.annee: point
+        for point in PointControleReports.query.filter_by(user_id=user_id).order_by(PointControleReports.annee)
+    }
+
+    entrees = {annee: (Decimal(p.entrees['resultat_avant_amortissement']), Decimal(p.entrees['amortissement']))
+               for annee, p in points.items()}
+    modifiees = [annee for annee, valeurs in annees.items() if entrees.get(annee) != valeurs]
+    if not modifiees:
+        return [points[annee].ligne for annee in sorted(points)]
+
+    entrees.update(annees)
+    premiere = min(modifiees)
+    anterieures = [annee for annee in points if annee < premiere]
+    etat = EtatReports.from_dict(points[max(anterieures)].etat) if anterieures else EtatReports()
+
+    a_traiter = [(annee, *entrees[annee]) for annee in sorted(entrees) if annee >= premiere]
+    logger.info(f"Reports utilisateur {user_id}: {len(a_traiter)} année(s) recalculée(s) à partir de {premiere}")
+    for annee, resultat_avant_amortissement, amortissement in a_traiter:
+        etat, ligne = traiter_annee(etat, annee, resultat_avant_amortissement, amortissement)
+        point = points.get(annee)
+        if point is None:
+            point = points[annee] = PointControleReports(user_id=user_id, annee=annee)
+            db.session.add(point)
+        point.entrees = {
+            'resultat_avant_amortissement': str(resultat_avant_amortissement),
+            'amortissement': str(amortissement)
+        }
+        point.ligne = ligne.to_dict()
+        point.etat = etat.to_dict()
+
+    db.session.commit()
+    return [points[annee].ligne for annee in sorted(points)]
@@ -1,12 +1,18 @@
-from flask import Blueprint, request, jsonify
-import asyncio
+from flask import Blueprint, Response, request, jsonify
+import json
+from decimal import DecimalException
 from src.agents_ia_lmnp import (
     demander_agent_produit,
     demander_agent_dev,
     demander_agent_fiscal,
-    chat_intelligent,
-    orchestrateur
+    orchestrateur,
+    AgentType
 )
+from src.assistance_fiscale import calculer, expliquer_calculs, expliquer_optimisation
+from src.boucle_asynchrone import executer, iterer
+from src.cache_agents import cache_reponses_agents
+from src.cache_semantique import cache_semantique_fiscal
+from src.prompts_agents import mesures_prompts
 
 agents_bp = Blueprint('agents', __name__)
 
@@ -53,11 +59,8 @@ def consulter_agent_produit():
         }), 400
     
     try:
-        # Exécution synchrone pour Flask
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponse = loop.run_until_complete(demander_agent_produit(demande, contexte))
-        loop.close()
+        # Exécution sur la boucle asyncio partagée du processus
+        reponse = executer(demander_agent_produit(demande, contexte))
         
         return jsonify({
             'success': True,
@@ -86,10 +89,7 @@ def consulter_agent_dev():
         }), 400
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponse = loop.run_until_complete(demander_agent_dev(demande, contexte))
-        loop.close()
+        reponse = executer(demander_agent_dev(demande, contexte))
         
         return jsonify({
             'success': True,
@@ -118,10 +118,7 @@ def consulter_agent_fiscal():
         }), 400
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponse = loop.run_until_complete(demander_agent_fiscal(demande, contexte))
-        loop.close()
+        reponse = executer(demander_agent_fiscal(demande, contexte))
         
         return jsonify({
             'success': True,
@@ -150,19 +147,15 @@ def chat_intelligent_route():
         }), 400
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponses = loop.run_until_complete(chat_intelligent(message, contexte))
-        loop.close()
-        
-        # Détection des agents utilisés
-        agents_detectes = orchestrateur.detect_agent_needed(message)
+        # Agents consultés en parallèle : réponses partielles si l'un échoue ou dépasse son délai
+        reponses = executer(orchestrateur.process_request(message, contexte))
         
         return jsonify({
             'success': True,
             'message': message,
-            'agents_consultes': [agent.value for agent in agents_detectes],
-            'reponses': reponses,
+            'agents_consultes': [reponse.agent_type.value for reponse in reponses],
+            'agents_en_echec': [reponse.agent_type.value for reponse in reponses if reponse.metadata.get('error')],
+            'reponses': [reponse.content for reponse in reponses],
             'timestamp': '2024-07-25T10:00:00Z'
         })
         
@@ -172,6 +165,94 @@ def chat_intelligent_route():
             'error': f'Erreur Chat Intelligent: {str(e)}'
         }), 500
 
+@agents_bp.route('/agents/cache', methods=['GET'])
+def statistiques_cache_agents():
+    """Statistiques du cache des réponses des agents (mémoire et disque) et du cache sémantique fiscal"""
+    return jsonify({
+        'success': True,
+        'cache': cache_reponses_agents.statistiques(),
+        'cache_semantique': cache_semantique_fiscal.statistiques()
+    })
+
+@agents_bp.route('/agents/cache', methods=['DELETE'])
+def vider_cache_agents():
+    """Vide le cache des réponses des agents"""
+    cache_reponses_agents.vider()
+    cache_semantique_fiscal.vider()
+    
+    return jsonify({
+        'success': True,
+        'message': 'Cache des réponses des agents vidé'
+    })
+
+@agents_bp.route('/agents/mesures', methods=['GET'])
+def mesures_agents():
+    """Taille des prompts (tokens) et latence des derniers appels au modèle, par agent"""
+    return jsonify({
+        'success': True,
+        'mesures': mesures_prompts.statistiques()
+    })
+
+# ==========================================
+# ROUTES EN FLUX (SERVER-SENT EVENTS)
+# ==========================================
+
+AGENTS_PAR_NOM = {
+    'produit': AgentType.PRODUIT,
+    'developpeur': AgentType.DEVELOPPEUR,
+    'fiscal': AgentType.FISCAL
+}
+
+def _reponse_sse(evenements):
+    """Réponse text/event-stream : un événement SSE par événement de l'orchestrateur"""
+    def flux():
+        try:
+            for evenement in evenements:
+                donnees = {cle: valeur for cle, valeur in evenement.items() if cle != 'type'}
+                yield f"event: {evenement['type']}\ndata: {json.dumps(donnees, ensure_ascii=False)}\n\n"
+        finally:
+            # Réponse fermée avant la fin (client déconnecté) : annule les appels aux agents
+            evenements.close()
+
+    # Pas de mise en tampon par un proxy (nginx) : chaque jeton part immédiatement
+    return Response(flux(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@agents_bp.route('/agents/chat/flux', methods=['POST'])
+def chat_intelligent_flux():
+    """Chat intelligent en flux : jetons des agents consultés au fil de leur génération"""
+    data = request.get_json()
+    message = data.get('message', '')
+    contexte = data.get('contexte', {})
+    
+    if not message:
+        return jsonify({
+            'success': False,
+            'error': 'Message requis'
+        }), 400
+    
+    return _reponse_sse(iterer(orchestrateur.diffuser_request(message, contexte)))
+
+@agents_bp.route('/agents/<nom>/flux', methods=['POST'])
+def consulter_agent_flux(nom):
+    """Consultation d'un agent (produit, developpeur, fiscal) en flux"""
+    data = request.get_json()
+    demande = data.get('demande', '')
+    contexte = data.get('contexte', {})
+    
+    if nom not in AGENTS_PAR_NOM:
+        return jsonify({
+            'success': False,
+            'error': f'Agent inconnu: {nom}'
+        }), 404
+    if not demande:
+        return jsonify({
+            'success': False,
+            'error': 'Demande requise'
+        }), 400
+    
+    return _reponse_sse(iterer(orchestrateur.diffuser_request(demande, contexte, [AGENTS_PAR_NOM[nom]])))
+
 # ==========================================
 # ROUTES ASSISTANCE CONTEXTUELLE
 # ==========================================
@@ -192,10 +273,7 @@ def assistance_onboarding():
     """
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponse = loop.run_until_complete(demander_agent_produit(demande, profil_utilisateur))
-        loop.close()
+        reponse = executer(demander_agent_produit(demande, profil_utilisateur))
         
         return jsonify({
             'success': True,
@@ -212,29 +290,51 @@ def assistance_onboarding():
 
 @agents_bp.route('/agents/assistance/calculs', methods=['POST'])
 def assistance_calculs():
-    """Assistance pour comprendre les calculs fiscaux"""
+    """
+    Assistance pour comprendre les calculs fiscaux : les données structurées sont
+    calculées et expliquées localement (src/assistance_fiscale.py), l'agent fiscal
+    ne répond qu'aux questions libres et aux données non reconnues
+    """
     data = request.get_json()
     type_calcul = data.get('type', '')
     donnees = data.get('donnees', {})
+    question = data.get('question', '')
+    
+    try:
+        calcul = calculer(donnees)
+    except (ValueError, TypeError, DecimalException) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Données de calcul invalides: {_motif_invalide(e)}'
+        }), 400
+    
+    if calcul is not None and not question:
+        return jsonify({
+            'success': True,
+            'type': 'explication_calculs',
+            'explication': expliquer_calculs(type_calcul, calcul),
+            'donnees': donnees,
+            'calculs': calcul.en_json(),
+            'source': 'calcul'
+        })
     
     demande = f"""
     Explique de manière simple le calcul {type_calcul} en LMNP avec ces données :
     {donnees}
     
     Fournis une explication pédagogique avec exemples concrets.
-    """
+    """ + _question_libre(question, calcul)
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponse = loop.run_until_complete(demander_agent_fiscal(demande, donnees))
-        loop.close()
+        reponse = executer(demander_agent_fiscal(demande, _contexte_calcule(donnees, calcul)))
         
         return jsonify({
             'success': True,
             'type': 'explication_calculs',
             'explication': reponse,
-            'donnees': donnees
+            'donnees': donnees,
+            'calculs': calcul.en_json() if calcul is not None else None,
+            'source': 'agent'
         })
         
     except Exception as e:
@@ -245,9 +345,31 @@ def assistance_calculs():
 
 @agents_bp.route('/agents/assistance/optimisation', methods=['POST'])
 def assistance_optimisation():
-    """Conseils d'optimisation fiscale personnalisés"""
+    """
+    Conseils d'optimisation fiscale personnalisés : calculés localement pour une
+    situation chiffrée, par l'agent fiscal pour une question libre
+    """
     data = request.get_json()
     situation = data.get('situation', {})
+    question = data.get('question', '')
+    
+    try:
+        calcul = calculer(situation)
+    except (ValueError, TypeError, DecimalException) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Situation invalide: {_motif_invalide(e)}'
+        }), 400
+    
+    if calcul is not None and not question:
+        return jsonify({
+            'success': True,
+            'type': 'optimisation',
+            'conseils': expliquer_optimisation(calcul),
+            'situation': situation,
+            'calculs': calcul.en_json(),
+            'source': 'calcul'
+        })
     
     demande = f"""
     Analyse cette situation LMNP et propose des optimisations fiscales :
@@ -257,19 +379,18 @@ def assistance_optimisation():
     - Régime actuel: {situation.get('regime', 'non défini')}
     
     Fournis des conseils concrets et chiffrés.
-    """
+    """ + _question_libre(question, calcul)
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponse = loop.run_until_complete(demander_agent_fiscal(demande, situation))
-        loop.close()
+        reponse = executer(demander_agent_fiscal(demande, _contexte_calcule(situation, calcul)))
         
         return jsonify({
             'success': True,
             'type': 'optimisation',
             'conseils': reponse,
-            'situation': situation
+            'situation': situation,
+            'calculs': calcul.en_json() if calcul is not None else None,
+            'source': 'agent'
         })
         
     except Exception as e:
@@ -278,6 +399,28 @@ def assistance_optimisation():
             'error': f'Erreur assistance optimisation: {str(e)}'
         }), 500
 
+def _motif_invalide(erreur: Exception) -> str:
+    """Motif d'une donnée invalide (les exceptions decimal n'ont pour message que leurs signaux)"""
+    if isinstance(erreur, DecimalException):
+        return 'montant non numérique ou hors limites'
+    return str(erreur)
+
+def _question_libre(question: str, calcul) -> str:
+    """Question de l'utilisateur ajoutée à la demande faite à l'agent fiscal"""
+    if not question:
+        return ''
+    demande = f"\n    Question de l'utilisateur : {question}\n"
+    if calcul is not None:
+        demande += ("    Les montants du champ \"calculs\" du contexte sont exacts : "
+                    "appuie-toi dessus sans les recalculer.\n")
+    return demande
+
+def _contexte_calcule(donnees, calcul):
+    """Contexte de l'agent fiscal, complété des calculs locaux s'il y en a"""
+    if calcul is None or not isinstance(donnees, dict):
+        return donnees
+    return {**donnees, 'calculs': calcul.en_json()}
+
 # ==========================================
 # ROUTES GÉNÉRATION DE CONTENU
 # ==========================================
@@ -299,10 +442,7 @@ def generer_user_stories():
     """
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponse = loop.run_until_complete(demander_agent_produit(demande, contexte))
-        loop.close()
+        reponse = executer(demander_agent_produit(demande, contexte))
         
         return jsonify({
             'success': True,
@@ -331,10 +471,7 @@ def generer_code():
     """
     
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        reponse = loop.run_until_complete(demander_agent_dev(demande, {'langage': langage}))
-        loop.close()
+        reponse = executer(demander_agent_dev(demande, {'langage': langage}))
         
         return jsonify({
             'success': True,
@@ -1,12 +1,42 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from datetime import datetime, date
+from dataclasses import fields
+from decimal import Decimal
+import hmac
+import io
 import json
+import os
+import numpy as np
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+from src.calculs_vectorises import balayer_regimes
+from src.moteur_centimes import en_centimes
 from src.expertise_fiscale_lmnp import (
     calculer_amortissement_bien,
+    tableau_amortissement_bien,
     calculer_resultat_fiscal,
     optimiser_regime,
-    expert_fiscal
+    expert_fiscal,
+    cache_amortissements
 )
+from src.declaration_lmnp import (
+    RegistreDeclarations,
+    charger_declaration,
+    depenses_depuis_json,
+    recettes_depuis_json,
+    registre_declarations
+)
+from src.reports_fiscaux import mettre_a_jour_reports
+from src.statistiques_lmnp import actualiser_statistiques
+from src.instantanes_lmnp import TAILLE_LOT_PRECHAUFFAGE, prechauffer_instantanes, resultats_declaration
+from src.cache_ressources import lire_ressource, representation, reponse_conditionnelle
+from src.import_lmnp import IMPORTS_PAR_LOTS, TAILLE_LOT_DEFAUT, ResumeImport, lire_lignes
+from src.models.user import User, db
+from src.partitions import (
+    MAX_MOTEURS_DEFAUT, ErreurPartition, partition_courante, routeur_courant, valider_partition
+)
+from src.cache_lmnp import CacheLRU
+from src.models.lmnp import Bien, Declaration, DepensesBien, RecettesBien, StatistiquesUtilisateur
 
 lmnp_bp = Blueprint('lmnp', __name__)
 
@@ -14,103 +44,206 @@ lmnp_bp = Blueprint('lmnp', __name__)
 # ROUTES DÉCLARATIONS LMNP
 # ==========================================
 
+# Pagination des listes (pagination par clé : pas d'OFFSET)
+TAILLE_PAGE_DEFAUT = 50
+TAILLE_PAGE_MAX = 200
+
+def _utilisateur_courant():
+    """Identifiant de l'utilisateur : paramètre user_id ou en-tête X-User-Id"""
+    return request.args.get('user_id', type=int) or request.headers.get('X-User-Id', type=int)
+
+def _taille_page():
+    return max(1, min(request.args.get('limite', TAILLE_PAGE_DEFAUT, type=int), TAILLE_PAGE_MAX))
+
+# Calculateurs en cours par cabinet quand le partitionnement est actif (identifiants propres à chaque base)
+TAILLE_REGISTRE_PARTITION = 1000
+registres_partitions = CacheLRU(MAX_MOTEURS_DEFAUT)
+
+def _registre():
+    partition = partition_courante()
+    if partition is None:
+        return registre_declarations
+    return registres_partitions.obtenir_ou_calculer(partition, lambda: RegistreDeclarations(TAILLE_REGISTRE_PARTITION))
+
+def _declaration_complete(declaration_id, user_id=None):
+    """Charge une déclaration, ses biens et leurs lignes en un nombre constant de requêtes"""
+    declaration = db.session.get(Declaration, declaration_id, options=[
+        selectinload(Declaration.biens).options(
+            joinedload(Bien.recettes), joinedload(Bien.depenses), joinedload(Bien.emprunt)
+        )
+    ])
+    if declaration is None or (user_id is not None and declaration.user_id != user_id):
+        return None
+    return declaration
+
 @lmnp_bp.route('/declarations', methods=['GET'])
 def get_declarations():
-    """Récupère toutes les déclarations de l'utilisateur"""
-    # Simulation de données pour la demo
-    declarations = [
-        {
-            'id': 1,
-            'annee': 2024,
-            'statut': 'en_cours',
-            'progression': 65,
-            'biens': 2,
-            'recettes': 24000,
-            'resultat': 3200,
-            'dateModification': '2024-07-20',
-            'teletransmise': False
-        },
-        {
-            'id': 2,
-            'annee': 2023,
-            'statut': 'complete',
-            'progression': 100,
-            'biens': 1,
-            'recettes': 18000,
-            'resultat': 2100,
-            'dateModification': '2024-03-15',
-            'teletransmise': True
-        }
-    ]
+    """Récupère les déclarations de l'utilisateur, de la plus récente à la plus ancienne"""
+    user_id = _utilisateur_courant()
+    if user_id is None:
+        return jsonify({
+            'success': False,
+            'error': 'Utilisateur requis (paramètre user_id ou en-tête X-User-Id)'
+        }), 400
     
-    return jsonify({
-        'success': True,
-        'declarations': declarations,
-        'total': len(declarations)
-    })
+    try:
+        limite = _taille_page()
+        requete = Declaration.query.filter_by(user_id=user_id)
+        if request.args.get('annee'):
+            requete = requete.filter_by(annee=request.args.get('annee', type=int))
+        total = requete.count()
+        
+        # Curseur "annee:id" de la dernière déclaration de la page précédente
+        curseur = request.args.get('apres')
+        if curseur:
+            annee, declaration_id = (int(valeur) for valeur in curseur.split(':'))
+            requete = requete.filter(tuple_(Declaration.annee, Declaration.id) < tuple_(annee, declaration_id))
+        declarations = requete.order_by(Declaration.annee.desc(), Declaration.id.desc()).limit(limite + 1).all()
+        page = declarations[:limite]
+        
+        # Nombre de biens et recettes de la page en une requête groupée
+        agregats = {}
+        if page:
+            agregats = {
+                ligne.declaration_id: ligne
+                for ligne in db.session.query(
+                    Bien.declaration_id,
+                    func.count(Bien.id).label('nombre'),
+                    func.sum(RecettesBien.loyers_bruts + RecettesBien.autres_recettes).label('recettes')
+                ).outerjoin(RecettesBien, RecettesBien.bien_id == Bien.id)
+                .filter(Bien.declaration_id.in_([d.id for d in page]))
+                .group_by(Bien.declaration_id)
+            }
+        
+        dernier = page[-1] if len(declarations) > limite else None
+        return jsonify({
+            'success': True,
+            'declarations': [
+                declaration.to_dict(
+                    nombre_biens=agregats[declaration.id].nombre if declaration.id in agregats else 0,
+                    recettes=agregats[declaration.id].recettes if declaration.id in agregats else 0
+                )
+                for declaration in page
+            ],
+            'total': total,
+            'curseurSuivant': f'{dernier.annee}:{dernier.id}' if dernier else None
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur liste déclarations: {str(e)}'
+        }), 400
 
 @lmnp_bp.route('/declarations', methods=['POST'])
 def create_declaration():
     """Crée une nouvelle déclaration LMNP"""
-    data = request.get_json()
+    data = request.get_json() or {}
+    user_id = data.get('userId') or _utilisateur_courant()
+    if user_id is None:
+        return jsonify({
+            'success': False,
+            'error': 'Utilisateur requis (userId, paramètre user_id ou en-tête X-User-Id)'
+        }), 400
     
-    nouvelle_declaration = {
-        'id': 3,  # Simulation d'un nouvel ID
-        'annee': data.get('annee', datetime.now().year),
-        'statut': 'brouillon',
-        'progression': 0,
-        'biens': 0,
-        'recettes': 0,
-        'resultat': 0,
-        'dateCreation': datetime.now().isoformat(),
-        'dateModification': datetime.now().isoformat(),
-        'teletransmise': False
-    }
+    declaration = Declaration(
+        user_id=user_id,
+        annee=data.get('annee', datetime.now().year),
+        statut='brouillon',
+        progression=0,
+        teletransmise=False
+    )
+    db.session.add(declaration)
+    db.session.commit()
     
     return jsonify({
         'success': True,
-        'declaration': nouvelle_declaration,
+        'declaration': declaration.to_dict(nombre_biens=0, recettes=0),
         'message': 'Déclaration créée avec succès'
     }), 201
 
 @lmnp_bp.route('/declarations/<int:declaration_id>', methods=['GET'])
 def get_declaration(declaration_id):
-    """Récupère une déclaration spécifique"""
-    # Simulation de données
-    declaration = {
-        'id': declaration_id,
-        'annee': 2024,
-        'statut': 'en_cours',
-        'progression': 65,
-        'biens': [
-            {
-                'id': 1,
-                'adresse': '123 Rue de la Paix, 75001 Paris',
-                'dateEntreeLmnp': '2024-01-01',
-                'prixAcquisition': 200000,
-                'fraisNotaire': 15000,
-                'fraisAgence': 5000,
-                'recettes': {
-                    'loyersBruts': 24000,
-                    'autresRecettes': 0
-                },
-                'depenses': {
-                    'fraisGestion': 2400,
-                    'chargesCopropriete': 3600,
-                    'assurances': 800,
-                    'taxeFonciere': 1200
-                },
-                'emprunt': {
-                    'interetsAnnuels': 4800,
-                    'assuranceEmprunt': 600
-                }
-            }
-        ]
-    }
+    """Récupère une déclaration et ses biens (ETag de version, 304 si If-None-Match correspond)"""
+    def charger():
+        declaration = _declaration_complete(declaration_id)
+        if declaration is None:
+            return None
+        return representation('declaration', declaration.id, declaration.version, {
+            'success': True,
+            'declaration': declaration.to_dict_detail()
+        }, proprietaire=declaration.user_id)
+    
+    ressource = lire_ressource(('declaration', declaration_id), charger)
+    user_id = _utilisateur_courant()
+    if ressource is None or (user_id is not None and ressource.proprietaire != user_id):
+        return jsonify({
+            'success': False,
+            'error': 'Déclaration introuvable'
+        }), 404
+    
+    return reponse_conditionnelle(ressource)
+
+@lmnp_bp.route('/declarations/<int:declaration_id>/calcul', methods=['POST'])
+def calculer_declaration(declaration_id):
+    """Calcule le résultat fiscal de tous les biens d'une déclaration"""
+    data = request.get_json() or {}
+    
+    try:
+        if 'biens' not in data:
+            # Sans biens fournis, la déclaration est lue en base et les résultats
+            # persistés à jour sont resservis sans recalcul
+            declaration = _declaration_complete(declaration_id, _utilisateur_courant())
+            if declaration is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Déclaration introuvable'
+                }), 404
+            calculateur, bilan = resultats_declaration(db.session, declaration)
+            db.session.commit()
+            _registre().inscrire(calculateur)
+            return jsonify({
+                'success': True,
+                'declaration': calculateur.synthese(),
+                'resultatsBiens': calculateur.resultats_biens(),
+                'instantanes': bilan.to_dict()
+            })
+        
+        annee = data.get('annee', datetime.now().year)
+        enregistrements = data['biens']
+        for enregistrement in enregistrements:
+            bien_data = enregistrement.get('bien', {})
+            if isinstance(bien_data.get('date_entree_lmnp'), str):
+                bien_data['date_entree_lmnp'] = datetime.strptime(bien_data['date_entree_lmnp'], '%Y-%m-%d').date()
+        
+        calculateur = charger_declaration(declaration_id, annee, enregistrements, _registre())
+        
+        return jsonify({
+            'success': True,
+            'declaration': calculateur.synthese(),
+            'resultatsBiens': calculateur.resultats_biens()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur calcul déclaration: {str(e)}'
+        }), 400
+
+@lmnp_bp.route('/declarations/<int:declaration_id>/calcul', methods=['GET'])
+def get_calcul_declaration(declaration_id):
+    """Récupère les totaux calculés d'une déclaration"""
+    calculateur = _registre().obtenir(declaration_id)
+    if calculateur is None:
+        return jsonify({
+            'success': False,
+            'error': 'Aucun calcul en cours pour cette déclaration'
+        }), 404
     
     return jsonify({
         'success': True,
-        'declaration': declaration
+        'declaration': calculateur.synthese(),
+        'resultatsBiens': calculateur.resultats_biens()
     })
 
 # ==========================================
@@ -123,7 +256,7 @@ def create_bien():
     data = request.get_json()
     
     # Validation des données
-    required_fields = ['adresse', 'dateEntreeLmnp', 'prixAcquisition']
+    required_fields = ['declarationId', 'adresse', 'dateEntreeLmnp', 'prixAcquisition']
     for field in required_fields:
         if field not in data:
             return jsonify({
@@ -131,27 +264,45 @@ def create_bien():
                 'error': f'Champ requis manquant: {field}'
             }), 400
     
+    declaration = db.session.get(Declaration, data['declarationId'])
+    if declaration is None:
+        return jsonify({
+            'success': False,
+            'error': 'Déclaration introuvable'
+        }), 404
+    
     # Suggestion de répartition terrain/construction selon localisation
     code_postal = data.get('codePostal', '')
     part_terrain, part_construction = expert_fiscal.suggerer_repartition_par_localisation(code_postal)
     
-    nouveau_bien = {
-        'id': len(data.get('biens_existants', [])) + 1,
-        'adresse': data['adresse'],
-        'dateEntreeLmnp': data['dateEntreeLmnp'],
-        'prixAcquisition': data['prixAcquisition'],
-        'fraisNotaire': data.get('fraisNotaire', 0),
-        'fraisAgence': data.get('fraisAgence', 0),
-        'partTerrain': float(part_terrain),
-        'partConstruction': float(part_construction),
-        'dureeAmortissementConstruction': 25,
-        'dureeAmortissementFrais': 15,
-        'creditBancaire': data.get('creditBancaire', False)
-    }
+    try:
+        bien = Bien(
+            declaration=declaration,
+            adresse=data['adresse'],
+            code_postal=code_postal or None,
+            date_entree_lmnp=datetime.strptime(data['dateEntreeLmnp'], '%Y-%m-%d').date(),
+            prix_acquisition=Decimal(str(data['prixAcquisition'])),
+            frais_notaire=Decimal(str(data.get('fraisNotaire', 0))),
+            frais_agence=Decimal(str(data.get('fraisAgence', 0))),
+            part_terrain=Decimal(str(data.get('partTerrain', part_terrain))),
+            part_construction=Decimal(str(data.get('partConstruction', part_construction))),
+            duree_amortissement_construction=data.get('dureeAmortissementConstruction', 25),
+            duree_amortissement_frais=data.get('dureeAmortissementFrais', 15),
+            credit_bancaire=data.get('creditBancaire', False)
+        )
+        db.session.add(bien)
+        db.session.commit()
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Erreur création bien: {str(e)}'
+        }), 400
     
     return jsonify({
         'success': True,
-        'bien': nouveau_bien,
+        'bien': bien.to_dict(),
         'suggestions': {
             'partTerrain': float(part_terrain),
             'partConstruction': float(part_construction),
@@ -159,6 +310,21 @@ def create_bien():
         }
     }), 201
 
+def _persister_montants(bien_id, attribut, modele, valeurs):
+    """
+    Enregistre les recettes ou dépenses (dataclass fiscale) d'un bien en base ;
+    retourne False si le bien n'est pas persisté
+    """
+    bien = db.session.get(Bien, bien_id)
+    if bien is None:
+        return False
+    ligne = getattr(bien, attribut) or modele()
+    for champ in fields(valeurs):
+        setattr(ligne, champ.name, getattr(valeurs, champ.name))
+    setattr(bien, attribut, ligne)
+    db.session.commit()
+    return True
+
 @lmnp_bp.route('/biens/<int:bien_id>/recettes', methods=['PUT'])
 def update_recettes(bien_id):
     """Met à jour les recettes d'un bien"""
@@ -170,11 +336,21 @@ def update_recettes(bien_id):
         'total': data.get('loyersBruts', 0) + data.get('autresRecettes', 0)
     }
     
-    return jsonify({
+    valeurs = recettes_depuis_json(data)
+    reponse = {
         'success': True,
         'recettes': recettes,
+        'persiste': _persister_montants(bien_id, 'recettes', RecettesBien, valeurs),
         'message': 'Recettes mises à jour avec succès'
-    })
+    }
+    
+    # Recalcul incrémental de la déclaration qui contient ce bien
+    calculateur = _registre().pour_bien(bien_id)
+    if calculateur is not None:
+        calculateur.mettre_a_jour_recettes(bien_id, valeurs)
+        reponse['declaration'] = calculateur.synthese()
+    
+    return jsonify(reponse)
 
 @lmnp_bp.route('/biens/<int:bien_id>/depenses', methods=['PUT'])
 def update_depenses(bien_id):
@@ -202,11 +378,21 @@ def update_depenses(bien_id):
     
     depenses = {**data, 'total': total_depenses}
     
-    return jsonify({
+    valeurs = depenses_depuis_json(data)
+    reponse = {
         'success': True,
         'depenses': depenses,
+        'persiste': _persister_montants(bien_id, 'depenses', DepensesBien, valeurs),
         'message': 'Dépenses mises à jour avec succès'
-    })
+    }
+    
+    # Recalcul incrémental de la déclaration qui contient ce bien
+    calculateur = _registre().pour_bien(bien_id)
+    if calculateur is not None:
+        calculateur.mettre_a_jour_depenses(bien_id, valeurs)
+        reponse['declaration'] = calculateur.synthese()
+    
+    return jsonify(reponse)
 
 # ==========================================
 # ROUTES CALCULS FISCAUX
@@ -241,22 +427,55 @@ def calculer_amortissements():
             'error': f'Erreur calcul amortissements: {str(e)}'
         }), 400
 
+@lmnp_bp.route('/calculs/tableau-amortissement', methods=['POST'])
+def calculer_tableau_amortissement():
+    """Calcule le tableau d'amortissement complet d'un bien"""
+    data = request.get_json()
+    
+    try:
+        # Conversion de la date
+        if isinstance(data.get('date_entree_lmnp'), str):
+            data['date_entree_lmnp'] = datetime.strptime(data['date_entree_lmnp'], '%Y-%m-%d').date()
+        
+        tableau = tableau_amortissement_bien(data)
+        
+        return jsonify({
+            'success': True,
+            'tableau': tableau,
+            'details': {
+                'methode': 'linéaire',
+                'premiereAnnee': tableau[0]['annee'] if tableau else None,
+                'derniereAnnee': tableau[-1]['annee'] if tableau else None,
+                'baseAmortissable': tableau[-1]['cumul'] if tableau else 0
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur calcul tableau amortissement: {str(e)}'
+        }), 400
+
+def _calculer_resultat_enregistrement(data, moteur=None):
+    """Calcule le résultat fiscal d'un enregistrement bien/recettes/depenses/emprunt"""
+    bien_data = data.get('bien', {})
+    recettes_data = data.get('recettes', {})
+    depenses_data = data.get('depenses', {})
+    emprunt_data = data.get('emprunt')
+    
+    # Conversion de la date
+    if isinstance(bien_data.get('date_entree_lmnp'), str):
+        bien_data['date_entree_lmnp'] = datetime.strptime(bien_data['date_entree_lmnp'], '%Y-%m-%d').date()
+    
+    return calculer_resultat_fiscal(bien_data, recettes_data, depenses_data, emprunt_data, moteur=moteur)
+
 @lmnp_bp.route('/calculs/resultat', methods=['POST'])
 def calculer_resultat():
     """Calcule le résultat fiscal d'un bien"""
     data = request.get_json()
     
     try:
-        bien_data = data.get('bien', {})
-        recettes_data = data.get('recettes', {})
-        depenses_data = data.get('depenses', {})
-        emprunt_data = data.get('emprunt')
-        
-        # Conversion de la date
-        if isinstance(bien_data.get('date_entree_lmnp'), str):
-            bien_data['date_entree_lmnp'] = datetime.strptime(bien_data['date_entree_lmnp'], '%Y-%m-%d').date()
-        
-        resultat = calculer_resultat_fiscal(bien_data, recettes_data, depenses_data, emprunt_data)
+        resultat = _calculer_resultat_enregistrement(data, request.args.get('moteur'))
         
         return jsonify({
             'success': True,
@@ -269,6 +488,58 @@ def calculer_resultat():
             'error': f'Erreur calcul résultat: {str(e)}'
         }), 400
 
+# Taille maximale d'une ligne NDJSON (un enregistrement)
+TAILLE_MAX_LIGNE_NDJSON = 64 * 1024
+
+def _lire_lignes(flux, taille_max: int):
+    """Lit un flux ligne par ligne sans jamais conserver plus d'une ligne en mémoire"""
+    while True:
+        ligne = flux.readline(taille_max + 1)
+        if not ligne:
+            return
+        if len(ligne) > taille_max and not ligne.endswith(b'\n'):
+            # Ligne trop longue : on consomme le reste sans le conserver
+            while ligne and not ligne.endswith(b'\n'):
+                ligne = flux.readline(taille_max)
+            yield None
+        else:
+            yield ligne
+
+@lmnp_bp.route('/calculs/resultat/batch', methods=['POST'])
+def calculer_resultats_batch():
+    """
+    Calcule les résultats fiscaux d'un lot de biens envoyé en NDJSON
+    (un enregistrement bien/recettes/depenses/emprunt par ligne).
+    Chaque résultat est renvoyé en NDJSON dès qu'il est calculé ;
+    une ligne invalide produit une erreur sans interrompre le lot.
+    """
+    flux = request.stream
+    moteur = request.args.get('moteur')
+    
+    def generer():
+        for numero, ligne in enumerate(_lire_lignes(flux, TAILLE_MAX_LIGNE_NDJSON), start=1):
+            if ligne is not None and not ligne.strip():
+                continue
+            
+            reponse = {'ligne': numero}
+            try:
+                if ligne is None:
+                    raise ValueError(f'ligne supérieure à {TAILLE_MAX_LIGNE_NDJSON} octets')
+                data = json.loads(ligne)
+                if not isinstance(data, dict):
+                    raise ValueError('objet JSON attendu')
+                if 'id' in data:
+                    reponse['id'] = data['id']
+                reponse['resultat'] = _calculer_resultat_enregistrement(data, moteur)
+                reponse['success'] = True
+            except Exception as e:
+                reponse['success'] = False
+                reponse['error'] = f'Erreur calcul résultat: {str(e)}'
+            
+            yield json.dumps(reponse, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generer()), mimetype='application/x-ndjson')
+
 @lmnp_bp.route('/calculs/optimisation', methods=['POST'])
 def optimiser_regime_fiscal():
     """Compare micro-BIC vs régime réel"""
@@ -278,7 +549,7 @@ def optimiser_regime_fiscal():
         recettes_totales = data.get('recettesTotales', 0)
         charges_totales = data.get('chargesTotales', 0)
         
-        optimisation = optimiser_regime(recettes_totales, charges_totales)
+        optimisation = optimiser_regime(recettes_totales, charges_totales, moteur=request.args.get('moteur'))
         
         return jsonify({
             'success': True,
@@ -296,6 +567,57 @@ def optimiser_regime_fiscal():
             'error': f'Erreur optimisation: {str(e)}'
         }), 400
 
+# Nombre maximal de points d'une grille de balayage
+TAILLE_MAX_BALAYAGE = 250_000
+
+def _axe_balayage(valeur):
+    """Axe de balayage en centimes : liste de montants ou {debut, fin, pas} (bornes incluses)"""
+    if isinstance(valeur, dict):
+        debut, fin, pas = (en_centimes(valeur[cle]) for cle in ('debut', 'fin', 'pas'))
+        if pas <= 0:
+            raise ValueError("Le pas doit être strictement positif")
+        if (fin - debut) // pas >= TAILLE_MAX_BALAYAGE:
+            raise ValueError("Axe de balayage trop long")
+        return list(range(debut, fin + 1, pas))
+    if isinstance(valeur, (int, float, str)):
+        return [en_centimes(valeur)]
+    return [en_centimes(montant) for montant in valeur]
+
+@lmnp_bp.route('/calculs/optimisation/balayage', methods=['POST'])
+def balayer_optimisation():
+    """Compare micro-BIC vs régime réel sur une grille recettes × charges × amortissements"""
+    data = request.get_json()
+    
+    try:
+        recettes = _axe_balayage(data['recettes'])
+        charges = _axe_balayage(data['charges'])
+        amortissements = _axe_balayage(data.get('amortissements', [0]))
+        if len(recettes) * len(charges) * len(amortissements) > TAILLE_MAX_BALAYAGE:
+            raise ValueError(f"Grille limitée à {TAILLE_MAX_BALAYAGE} points")
+        
+        balayage = balayer_regimes(recettes, charges, amortissements)
+        equilibre = balayage.charges_equilibre
+        
+        return jsonify({
+            'success': True,
+            'recettes': (balayage.recettes / 100).tolist(),
+            'charges': (balayage.charges / 100).tolist(),
+            'amortissements': (balayage.amortissements / 100).tolist(),
+            'microBicPossible': balayage.micro_bic_possible.tolist(),
+            'baseImposableMicro': (balayage.base_imposable_micro / 100).tolist(),
+            'baseImposableReel': (balayage.base_imposable_reel / 100).tolist(),
+            'regimeRecommande': np.where(balayage.micro_bic_recommande, 'micro_bic', 'reel').tolist(),
+            'economieEstimee': (balayage.economie_estimee / 100).tolist(),
+            # Micro-BIC recommandé tant que les charges restent strictement inférieures
+            'chargesEquilibre': np.where(np.isnan(equilibre), None, equilibre).tolist()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur balayage: {str(e)}'
+        }), 400
+
 @lmnp_bp.route('/calculs/cfe', methods=['POST'])
 def estimer_cfe():
     """Estime la CFE selon les recettes"""
@@ -320,6 +642,147 @@ def estimer_cfe():
             'error': f'Erreur estimation CFE: {str(e)}'
         }), 400
 
+@lmnp_bp.route('/calculs/cache', methods=['GET'])
+def statistiques_cache_calculs():
+    """Statistiques des caches de calcul (amortissements et tableaux)"""
+    return jsonify({
+        'success': True,
+        'caches': {
+            'amortissements': cache_amortissements.statistiques(),
+            'tableaux': expert_fiscal.cache_tableaux.statistiques()
+        }
+    })
+
+@lmnp_bp.route('/calculs/cache', methods=['DELETE'])
+def vider_cache_calculs():
+    """Vide les caches de calcul"""
+    cache_amortissements.vider()
+    expert_fiscal.cache_tableaux.vider()
+    
+    return jsonify({
+        'success': True,
+        'message': 'Caches de calcul vidés'
+    })
+
+@lmnp_bp.route('/calculs/instantanes/prechauffage', methods=['POST'])
+def prechauffer_resultats():
+    """Calcule à l'avance les résultats persistés des déclarations ouvertes (?taille_lot=)"""
+    try:
+        bilan = prechauffer_instantanes(db.session, request.args.get('taille_lot', TAILLE_LOT_PRECHAUFFAGE, type=int))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Erreur préchauffage: {str(e)}'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'prechauffage': bilan
+    })
+
+# ==========================================
+# ROUTES IMPORT (CSV / XLSX)
+# ==========================================
+
+def _fichier_import():
+    """Fichier à importer (champ multipart 'fichier' ou corps brut) et son format"""
+    fichier = request.files.get('fichier')
+    if fichier is not None:
+        extension = (fichier.filename or '').rsplit('.', 1)[-1].lower()
+        return fichier.stream, request.args.get('format', extension)
+    format = request.args.get('format', 'csv')
+    # openpyxl a besoin d'un fichier positionnable
+    return (io.BytesIO(request.get_data()) if format == 'xlsx' else request.stream), format
+
+@lmnp_bp.route('/import/<string:type_import>', methods=['POST'])
+def importer_fichier(type_import):
+    """Importe des biens ou des transactions ; ?progression=1 renvoie l'avancement en NDJSON"""
+    if type_import not in IMPORTS_PAR_LOTS:
+        return jsonify({
+            'success': False,
+            'error': f"Import inconnu: {type_import} ({', '.join(IMPORTS_PAR_LOTS)})"
+        }), 404
+    
+    try:
+        fichier, format = _fichier_import()
+        etapes = IMPORTS_PAR_LOTS[type_import](
+            lire_lignes(fichier, format),
+            max(1, request.args.get('taille_lot', TAILLE_LOT_DEFAUT, type=int))
+        )
+        
+        if request.args.get('progression'):
+            def generer():
+                # Les exceptions levées pendant le flux échappent au try de la route
+                try:
+                    resume = None
+                    for resume in etapes:
+                        yield json.dumps({'evenement': 'progression', **resume.to_dict(avec_erreurs=False)}) + '\n'
+                    if resume is not None:
+                        yield json.dumps({'evenement': 'resume', **resume.to_dict()}, ensure_ascii=False) + '\n'
+                except Exception as e:
+                    db.session.rollback()
+                    yield json.dumps({'evenement': 'erreur', 'error': f'Erreur import: {str(e)}'},
+                                     ensure_ascii=False) + '\n'
+            
+            return Response(stream_with_context(generer()), mimetype='application/x-ndjson')
+        
+        resume = None
+        for resume in etapes:
+            pass
+        return jsonify({
+            'success': True,
+            'resume': resume.to_dict() if resume else ResumeImport(type_import).to_dict()
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Erreur import: {str(e)}'
+        }), 400
+
+# ==========================================
+# ROUTES REPORTS (DÉFICITS ET ARD)
+# ==========================================
+
+def _reponse_reports(lignes):
+    derniere = lignes[-1] if lignes else {}
+    return jsonify({
+        'success': True,
+        'reports': lignes,
+        'stock': {
+            'deficitsReportables': derniere.get('stock_deficits', 0),
+            'amortissementsDifferes': derniere.get('stock_ard', 0)
+        }
+    })
+
+@lmnp_bp.route('/reports/<int:user_id>', methods=['GET'])
+def get_reports(user_id):
+    """Récupère le registre des déficits et amortissements différés d'un contribuable"""
+    return _reponse_reports(mettre_a_jour_reports(user_id, {}))
+
+@lmnp_bp.route('/reports/<int:user_id>', methods=['POST'])
+def mettre_a_jour_reports_fiscaux(user_id):
+    """Ajoute ou corrige des années dans le registre des reports"""
+    data = request.get_json()
+    
+    try:
+        annees = {
+            int(annee['annee']): (
+                Decimal(str(annee['resultatAvantAmortissement'])),
+                Decimal(str(annee.get('amortissements', 0)))
+            )
+            for annee in data.get('annees', [])
+        }
+        return _reponse_reports(mettre_a_jour_reports(user_id, annees))
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur calcul reports: {str(e)}'
+        }), 400
+
 # ==========================================
 # ROUTES LIASSES FISCALES
 # ==========================================
@@ -369,21 +832,93 @@ def teletransmettre():
 
 @lmnp_bp.route('/stats/dashboard', methods=['GET'])
 def get_dashboard_stats():
-    """Récupère les statistiques pour le dashboard"""
-    stats = {
-        'totalBiens': 3,
-        'recettesAnnuelles': 24000,
-        'economiesFiscales': 8500,
-        'declarationsCompletes': 1,
-        'optimisationPossible': {
-            'regime': 'reel',
-            'economie': 1200,
-            'conseil': 'Le régime réel vous ferait économiser 1 200€ supplémentaires'
-        }
-    }
+    """Récupère les statistiques pour le dashboard (ligne matérialisée, lue par clé primaire)"""
+    user_id = _utilisateur_courant()
+    if user_id is None:
+        return jsonify({
+            'success': False,
+            'error': 'Utilisateur requis (paramètre user_id ou en-tête X-User-Id)'
+        }), 400
+    
+    statistiques = db.session.get(StatistiquesUtilisateur, user_id)
+    if statistiques is None:
+        # Première lecture : calcul initial, tenu à jour ensuite à chaque écriture
+        statistiques = actualiser_statistiques(db.session, user_id)
+        db.session.commit()
     
     return jsonify({
         'success': True,
-        'stats': stats
+        'stats': statistiques.to_dict()
     })
 
+# ==========================================
+# ROUTES ADMINISTRATION (PARTITIONS)
+# ==========================================
+
+def _agreger_partition(connexion):
+    """Volumes et recettes d'une base de cabinet"""
+    def compter(modele):
+        return connexion.scalar(select(func.count()).select_from(modele))
+    recettes = connexion.scalar(select(func.coalesce(
+        func.sum(RecettesBien.loyers_bruts + RecettesBien.autres_recettes), 0
+    )))
+    return {
+        'utilisateurs': compter(User),
+        'declarations': compter(Declaration),
+        'biens': compter(Bien),
+        'recettes': float(recettes)
+    }
+
+def _refus_administration():
+    """Réponse d'erreur si l'en-tête X-Admin-Token est absent ou si le partitionnement est inactif"""
+    jeton = os.environ.get('LMNP_ADMIN_TOKEN')
+    if not jeton or not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), jeton):
+        return jsonify({
+            'success': False,
+            'error': 'Accès administrateur requis'
+        }), 403
+    if routeur_courant() is None:
+        return jsonify({
+            'success': False,
+            'error': 'Partitionnement désactivé (LMNP_PARTITIONS)'
+        }), 404
+    return None
+
+@lmnp_bp.route('/admin/partitions', methods=['POST'])
+def creer_partition():
+    """Crée un cabinet (base ou schéma) ; seuls les cabinets créés sont servis (en-tête X-Admin-Token)"""
+    refus = _refus_administration()
+    if refus is not None:
+        return refus
+    try:
+        partition = valider_partition((request.get_json(silent=True) or {}).get('partition'))
+    except ErreurPartition as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    cree = routeur_courant().creer(partition)
+    return jsonify({
+        'success': True,
+        'partition': partition,
+        'cree': cree
+    }), 201 if cree else 200
+
+@lmnp_bp.route('/admin/partitions', methods=['GET'])
+def agreger_partitions():
+    """Agrégats de tous les cabinets (partitionnement actif, en-tête X-Admin-Token)"""
+    refus = _refus_administration()
+    if refus is not None:
+        return refus
+    routeur = routeur_courant()
+    
+    par_partition = routeur.pour_chaque_partition(_agreger_partition)
+    totaux = {cle: sum(agregats[cle] for agregats in par_partition.values())
+              for cle in ('utilisateurs', 'declarations', 'biens', 'recettes')}
+    return jsonify({
+        'success': True,
+        'partitions': par_partition,
+        'totaux': {**totaux, 'partitions': len(par_partition)},
+        'moteurs': routeur.statistiques()
+    })
@@ -1,12 +1,85 @@
-from flask import Blueprint, jsonify, request
+import json
+import sys
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from src.cache_ressources import lire_ressource, representation, reponse_conditionnelle
 from src.models.user import User, db
+from src.suivi_ecritures import marquer
 
 user_bp = Blueprint('user', __name__)
 
+# Pagination par clé primaire (?apres=<id>), sans OFFSET sur la page elle-même
+TAILLE_PAGE_DEFAUT = 100
+TAILLE_PAGE_MAX = 1000
+CHAMPS_USER = ('id', 'username', 'email')
+
+def _borne_suivante(prefixe):
+    """Plus petite chaîne supérieure à toutes celles qui commencent par prefixe (None : aucune)"""
+    for position in range(len(prefixe) - 1, -1, -1):
+        code = ord(prefixe[position]) + 1
+        if code > sys.maxunicode:
+            continue
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000
+        return prefixe[:position] + chr(code)
+    return None
+
+def _filtre_prefixe(colonne, prefixe):
+    """
+    Préfixe exact (sensible à la casse) servi par un index : sous PostgreSQL, LIKE 'prefixe%'
+    échappé (index text_pattern_ops, la collation de la base ne range pas par point de code) ;
+    sous SQLite, plage [prefixe, borne suivante[ dans l'ordre BINARY (LIKE y ignore la casse)
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return colonne.startswith(prefixe, autoescape=True)
+    suivant = _borne_suivante(prefixe)
+    if suivant is None:
+        return colonne >= prefixe
+    return (colonne >= prefixe) & (colonne < suivant)
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """
+    Liste paginée des utilisateurs par id croissant : ?limite=, ?apres=<dernier id>,
+    ?username= et ?email= (préfixes), ?fields=id,email (projection) ;
+    le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor
+    """
+    limite = max(1, min(request.args.get('limite', TAILLE_PAGE_DEFAUT, type=int), TAILLE_PAGE_MAX))
+    champs = request.args.get('fields')
+    champs = [c.strip() for c in champs.split(',') if c.strip()] if champs else list(CHAMPS_USER)
+    inconnus = [c for c in champs if c not in CHAMPS_USER]
+    if inconnus:
+        return jsonify({
+            'success': False,
+            'error': f"Champ(s) inconnu(s): {', '.join(inconnus)} (disponibles: {', '.join(CHAMPS_USER)})"
+        }), 400
+
+    conditions = []
+    apres = request.args.get('apres', type=int)
+    if apres is not None:
+        conditions.append(User.id > apres)
+    for nom in ('username', 'email'):
+        prefixe = request.args.get(nom)
+        if prefixe:
+            conditions.append(_filtre_prefixe(getattr(User, nom), prefixe))
+
+    # Curseur suivant : dernier id de la page, s'il existe une ligne au-delà (parcours d'index seul)
+    bornes = db.session.scalars(
+        select(User.id).where(*conditions).order_by(User.id).offset(limite - 1).limit(2)
+    ).all()
+    curseur = bornes[0] if len(bornes) == 2 else None
+
+    requete = select(*(getattr(User, c) for c in champs)).where(*conditions).order_by(User.id).limit(limite)
+
+    def generer():
+        yield '['
+        for i, ligne in enumerate(db.session.execute(requete).mappings()):
+            yield (',' if i else '') + json.dumps(dict(ligne), ensure_ascii=False)
+        yield ']'
+
+    entetes = {'X-Next-Cursor': str(curseur)} if curseur is not None else {}
+    return Response(stream_with_context(generer()), mimetype='application/json', headers=entetes)
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -17,10 +90,146 @@ def create_user():
     db.session.commit()
     return jsonify(user.to_dict()), 201
 
+# Opérations acceptées par requête /users/bulk
+TAILLE_MAX_BULK = 5000
+# Nombre maximal de valeurs par clause IN
+TAILLE_IN = 500
+
+def _par_paquets(valeurs):
+    valeurs = list(valeurs)
+    for debut in range(0, len(valeurs), TAILLE_IN):
+        yield valeurs[debut:debut + TAILLE_IN]
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_users():
+    """
+    Applique en une seule transaction une liste d'opérations
+    {"op": "create"|"update"|"delete", "id"?, "username"?, "email"?} :
+    suppressions, mises à jour puis insertions groupées. Les opérations invalides
+    ou en conflit (username/email déjà pris, id inconnu) sont écartées et signalées
+    individuellement ; les autres sont appliquées.
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'success': False, 'error': 'Liste "operations" requise'}), 400
+    if len(operations) > TAILLE_MAX_BULK:
+        return jsonify({
+            'success': False,
+            'error': f'Trop d\'opérations: {len(operations)} (maximum {TAILLE_MAX_BULK})'
+        }), 400
+
+    resultats = [{'index': i, 'op': op.get('op') if isinstance(op, dict) else None} for i, op in enumerate(operations)]
+
+    def rejeter(i, statut, erreur):
+        resultats[i].update(statut=statut, erreur=erreur)
+
+    # Validation de forme
+    valides = []
+    for i, op in enumerate(operations):
+        if not isinstance(op, dict) or op.get('op') not in ('create', 'update', 'delete'):
+            rejeter(i, 'invalide', 'op doit valoir create, update ou delete')
+        elif op['op'] != 'create' and not isinstance(op.get('id'), int):
+            rejeter(i, 'invalide', 'id entier requis')
+        elif op['op'] == 'create' and not (op.get('username') and op.get('email')):
+            rejeter(i, 'invalide', 'username et email requis')
+        elif op['op'] == 'update' and not (op.get('username') or op.get('email')):
+            rejeter(i, 'invalide', 'username ou email requis')
+        elif any(not isinstance(op.get(nom, ''), str) for nom in ('username', 'email')):
+            rejeter(i, 'invalide', 'username et email doivent être des chaînes')
+        else:
+            valides.append((i, op))
+
+    # Existence des ids et valeurs uniques déjà prises, en quelques requêtes
+    ids = {op['id'] for _, op in valides if op['op'] != 'create'}
+    existants = set()
+    for paquet in _par_paquets(ids):
+        existants.update(db.session.scalars(select(User.id).where(User.id.in_(paquet))))
+    supprimes = {op['id'] for _, op in valides if op['op'] == 'delete' and op['id'] in existants}
+
+    pris = {'username': {}, 'email': {}}
+    for nom, colonne in (('username', User.username), ('email', User.email)):
+        demandes = {op[nom] for _, op in valides if op['op'] != 'delete' and op.get(nom)}
+        for paquet in _par_paquets(demandes):
+            for user_id, valeur in db.session.execute(select(User.id, colonne).where(colonne.in_(paquet))):
+                if user_id not in supprimes:
+                    pris[nom][valeur] = user_id
+
+    suppressions, mises_a_jour, creations = [], [], []
+    deja_supprimes = set()
+    for i, op in valides:
+        if op['op'] != 'create' and op['id'] not in existants:
+            rejeter(i, 'introuvable', f"utilisateur {op['id']} introuvable")
+            continue
+        if op['op'] == 'delete':
+            if op['id'] in deja_supprimes:
+                rejeter(i, 'invalide', 'suppression en double')
+                continue
+            deja_supprimes.add(op['id'])
+            suppressions.append((i, op['id']))
+            continue
+        if op['op'] == 'update' and op['id'] in supprimes:
+            rejeter(i, 'conflit', 'utilisateur supprimé dans le même lot')
+            continue
+        # Valeur libre, ou déjà portée par l'utilisateur mis à jour lui-même
+        conflits = [nom for nom in ('username', 'email')
+                    if op.get(nom) and pris[nom].get(op[nom], op.get('id')) != op.get('id')]
+        if conflits:
+            rejeter(i, 'conflit', f"{', '.join(conflits)} déjà utilisé(s)")
+            continue
+        for nom in ('username', 'email'):
+            if op.get(nom):
+                pris[nom][op[nom]] = op.get('id', -1 - i)
+        valeurs = {nom: op[nom] for nom in ('username', 'email') if op.get(nom)}
+        if op['op'] == 'update':
+            mises_a_jour.append((i, {'id': op['id'], **valeurs}))
+        else:
+            creations.append((i, valeurs))
+
+    try:
+        if suppressions:
+            for paquet in _par_paquets(u for _, u in suppressions):
+                db.session.execute(delete(User).where(User.id.in_(paquet)))
+        for cles in ({'id', 'username', 'email'}, {'id', 'username'}, {'id', 'email'}):
+            lignes = [valeurs for _, valeurs in mises_a_jour if set(valeurs) == cles]
+            if lignes:
+                db.session.execute(update(User), lignes)
+        nouveaux_ids = db.session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True), [v for _, v in creations]
+        ).all() if creations else []
+        # Écritures groupées hors ORM : versions et caches des comptes touchés
+        marquer(db.session, comptes=[u for _, u in suppressions] + [v['id'] for _, v in mises_a_jour])
+        db.session.commit()
+    except IntegrityError as e:
+        # Conflit concurrent survenu après la vérification : rien n'est appliqué
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Conflit d\'unicité, lot annulé: {e.orig}'
+        }), 409
+
+    for i, user_id in suppressions:
+        resultats[i].update(statut='supprime', id=user_id)
+    for i, valeurs in mises_a_jour:
+        resultats[i].update(statut='modifie', id=valeurs['id'])
+    for (i, _), user_id in zip(creations, nouveaux_ids):
+        resultats[i].update(statut='cree', id=user_id)
+
+    appliquees = len(suppressions) + len(mises_a_jour) + len(creations)
+    return jsonify({
+        'success': True,
+        'appliquees': appliquees,
+        'rejetees': len(operations) - appliquees,
+        'resultats': resultats
+    })
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    """Utilisateur avec ETag de version ; 304 si If-None-Match correspond"""
+    def charger():
+        user = User.query.get_or_404(user_id)
+        return representation('user', user.id, user.version, user.to_dict())
+    return reponse_conditionnelle(lire_ressource(('user', user_id), charger))
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Statistiques du tableau de bord tenues à jour de façon transactionnelle
+Au commit d'une transaction qui touche des déclarations, biens, recettes, dépenses
+ou emprunts (cf. src/suivi_ecritures.py), la ligne StatistiquesUtilisateur des
+utilisateurs concernés est recalculée dans la même transaction. La lecture du
+tableau de bord se réduit ainsi à une recherche par clé primaire, quelle que soit
+la taille du portefeuille.
+"""
+
+from decimal import Decimal
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from src import suivi_ecritures
+# Importé d'abord : ses résultats persistés sont invalidés avant le recalcul des statistiques
+from src.instantanes_lmnp import resultats_declaration
+from src.models.lmnp import Bien, Declaration, StatistiquesUtilisateur
+
+logger = logging.getLogger(__name__)
+
+
+def _actualiser_au_commit(session: Session, modifications: suivi_ecritures.Modifications):
+    for user_id in sorted(modifications.utilisateurs):
+        actualiser_statistiques(session, user_id)
+
+
+suivi_ecritures.avant_validation.append(_actualiser_au_commit)
+
+
+def actualiser_statistiques(session: Session, user_id: int) -> StatistiquesUtilisateur:
+    """
+    Recalcule les statistiques d'un utilisateur à partir de sa déclaration la plus récente ;
+    la ligne est ajoutée à la session sans commit
+    """
+    statistiques = session.get(StatistiquesUtilisateur, user_id)
+    if statistiques is None:
+        statistiques = StatistiquesUtilisateur(user_id=user_id)
+        session.add(statistiques)
+
+    statistiques.declarations_completes = session.scalar(
+        select(func.count()).select_from(Declaration)
+        .where(Declaration.user_id == user_id, Declaration.statut == 'complete')
+    )
+    derniere = session.scalars(
+        select(Declaration)
+        .options(selectinload(Declaration.biens).options(
+            joinedload(Bien.recettes), joinedload(Bien.depenses), joinedload(Bien.emprunt)
+        ))
+        .where(Declaration.user_id == user_id)
+        .order_by(Declaration.annee.desc(), Declaration.id.desc())
+        .limit(1)
+    ).first()
+
+    if derniere is None:
+        statistiques.declaration_id = None
+        statistiques.total_biens = 0
+        statistiques.recettes_annuelles = Decimal('0')
+        statistiques.economies_fiscales = Decimal('0')
+        statistiques.regime_recommande = None
+        statistiques.conseil = None
+        return statistiques
+
+    calculateur, _ = resultats_declaration(session, derniere)
+    synthese = calculateur.synthese()
+    statistiques.declaration_id = derniere.id
+    statistiques.total_biens = synthese['nombreBiens']
+    statistiques.recettes_annuelles = calculateur.totaux['recettes_totales']
+    statistiques.economies_fiscales = Decimal(str(synthese['economieEstimee']))
+    statistiques.regime_recommande = synthese['regimeRecommande']
+    statistiques.conseil = synthese['conseils'][0] if synthese['conseils'] else None
+    logger.debug(f"Statistiques utilisateur {user_id} recalculées (déclaration {derniere.id})")
+    return statistiques
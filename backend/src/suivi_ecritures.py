@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Suivi des écritures de la session SQLAlchemy
+Chaque flush relève les comptes utilisateurs, déclarations et biens (recettes,
+dépenses, emprunt compris) modifiés. Au commit, les biens sont rattachés à leur
+déclaration et les déclarations à leur utilisateur, puis les abonnés sont notifiés :
+- avant_validation : dans la transaction, avant son commit (statistiques, versions) ;
+- apres_validation : une fois le commit effectué (invalidation des caches).
+
+Les écritures qui contournent l'ORM (insertions et mises à jour groupées)
+se signalent elles-mêmes avec marquer().
+"""
+
+from typing import Callable, Iterable, List, Set
+from dataclasses import dataclass, field
+import itertools
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.models.user import User
+from src.models.lmnp import Bien, Declaration, DepensesBien, EmpruntBien, RecettesBien
+
+# Clés de Session.info
+CLE_EN_COURS = 'modifications_en_cours'
+CLE_VALIDEES = 'modifications_validees'
+
+# Nombre maximal d'identifiants par clause IN
+TAILLE_IN = 500
+
+
+@dataclass
+class Modifications:
+    """Identifiants touchés par une transaction"""
+    comptes: Set[int] = field(default_factory=set)        # lignes de la table user
+    utilisateurs: Set[int] = field(default_factory=set)   # propriétaires des déclarations touchées
+    declarations: Set[int] = field(default_factory=set)
+    biens: Set[int] = field(default_factory=set)          # biens modifiés, directement ou via leurs montants
+
+    def __bool__(self) -> bool:
+        return bool(self.comptes or self.utilisateurs or self.declarations or self.biens)
+
+
+# Abonnés, appelés dans l'ordre d'inscription
+avant_validation: List[Callable[[Session, Modifications], None]] = []
+apres_validation: List[Callable[[Modifications], None]] = []
+
+
+def _en_cours(session: Session) -> Modifications:
+    return session.info.setdefault(CLE_EN_COURS, Modifications())
+
+
+def marquer(session: Session, comptes: Iterable[int] = (), declarations: Iterable[int] = (),
+            biens: Iterable[int] = ()):
+    """Signale des lignes modifiées hors ORM ; elles seront traitées au prochain commit"""
+    modifications = _en_cours(session)
+    modifications.comptes.update(comptes)
+    modifications.declarations.update(declarations)
+    modifications.biens.update(biens)
+
+
+@event.listens_for(Session, 'before_flush')
+def _relever_modifications(session, contexte_flush, instances):
+    modifications = _en_cours(session)
+    for objet in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(objet, User):
+            if objet.id is not None:
+                modifications.comptes.add(objet.id)
+        elif isinstance(objet, Declaration):
+            modifications.utilisateurs.add(objet.user_id)
+            if objet.id is not None:
+                modifications.declarations.add(objet.id)
+        elif isinstance(objet, Bien):
+            if objet.id is not None:
+                modifications.biens.add(objet.id)
+            if objet.declaration_id is not None:
+                modifications.declarations.add(objet.declaration_id)
+            elif objet.declaration is not None:
+                modifications.utilisateurs.add(objet.declaration.user_id)
+                if objet.declaration.id is not None:
+                    modifications.declarations.add(objet.declaration.id)
+        elif isinstance(objet, (RecettesBien, DepensesBien, EmpruntBien)) and objet.bien_id is not None:
+            modifications.biens.add(objet.bien_id)
+
+
+def par_paquets(identifiants: Iterable[int]) -> Iterable[List[int]]:
+    """Identifiants triés, par paquets de TAILLE_IN (clauses IN)"""
+    identifiants = sorted(identifiants)
+    for debut in range(0, len(identifiants), TAILLE_IN):
+        yield identifiants[debut:debut + TAILLE_IN]
+
+
+@event.listens_for(Session, 'before_commit')
+def _notifier_avant_validation(session):
+    session.flush()
+    modifications = session.info.pop(CLE_EN_COURS, None)
+    if not modifications:
+        return
+    for paquet in par_paquets(modifications.biens):
+        modifications.declarations.update(session.scalars(
+            select(Bien.declaration_id).where(Bien.id.in_(paquet))
+        ))
+    for paquet in par_paquets(modifications.declarations):
+        modifications.utilisateurs.update(session.scalars(
+            select(Declaration.user_id).where(Declaration.id.in_(paquet))
+        ))
+    modifications.utilisateurs.discard(None)
+    for abonne in avant_validation:
+        abonne(session, modifications)
+    session.info[CLE_VALIDEES] = modifications
+
+
+@event.listens_for(Session, 'after_commit')
+def _notifier_apres_validation(session):
+    modifications = session.info.pop(CLE_VALIDEES, None)
+    if modifications:
+        for abonne in apres_validation:
+            abonne(modifications)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_modifications(session):
+    session.info.pop(CLE_EN_COURS, None)
+    session.info.pop(CLE_VALIDEES, None)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Transport httpx adossé à une session aiohttp
+Le client OpenAI repose sur httpx. Sous forte concurrence (plusieurs dizaines d'appels
+simultanés), le pool asynchrone de httpx s'effondre : files d'attente du pool,
+connexions recréées, PoolTimeout. Ce transport délègue les requêtes à une session
+aiohttp unique, dont le connecteur garde les connexions ouvertes et borne leur nombre.
+La session est créée au premier appel, sur la boucle qui l'utilise (boucle partagée).
+"""
+
+from typing import AsyncIterator, Optional
+import asyncio
+
+import aiohttp
+import httpx
+
+
+class FluxAiohttp(httpx.AsyncByteStream):
+    """Corps de réponse lu au fil de l'eau ; la connexion retourne au pool à la fermeture"""
+
+    def __init__(self, reponse: aiohttp.ClientResponse):
+        self._reponse = reponse
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for bloc in self._reponse.content.iter_any():
+            yield bloc
+
+    async def aclose(self):
+        self._reponse.release()
+
+
+class TransportAiohttp(httpx.AsyncBaseTransport):
+    """Transport httpx : connexions persistantes, au plus `limite` simultanées"""
+
+    def __init__(self, limite: int, duree_keepalive: float = 60.0):
+        self.limite = limite
+        self.duree_keepalive = duree_keepalive
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _session_courante(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limite, keepalive_timeout=self.duree_keepalive),
+                # httpx décode lui-même le corps (Content-Encoding)
+                auto_decompress=False
+            )
+        return self._session
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delais = request.extensions.get('timeout', {})
+        try:
+            reponse = await self._session_courante().request(
+                request.method, str(request.url),
+                headers=[(cle, valeur) for cle, valeur in request.headers.multi_items()
+                         if cle.lower() not in ('host', 'content-length', 'transfer-encoding')],
+                data=await request.aread(),
+                allow_redirects=False,
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=delais.get('connect'), sock_read=delais.get('read'), total=None
+                )
+            )
+        except asyncio.TimeoutError as e:
+            raise httpx.ReadTimeout(str(e) or 'Délai dépassé', request=request) from e
+        except aiohttp.ClientError as e:
+            raise httpx.ConnectError(str(e), request=request) from e
+        return httpx.Response(
+            status_code=reponse.status,
+            headers=list(reponse.raw_headers),
+            stream=FluxAiohttp(reponse),
+            extensions={'http_version': b'HTTP/1.1'}
+        )
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
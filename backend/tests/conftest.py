@@ -0,0 +1,76 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+# Même convention que src/main.py : le dossier backend/ doit être importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from src.cache_ressources import cache_ressources  # noqa: E402
+from src.models.user import db  # noqa: E402
+from src.routes.lmnp_routes import lmnp_bp  # noqa: E402
+from src.routes.user import user_bp  # noqa: E402
+
+
+@pytest.fixture
+def app(request, tmp_path):
+    """Application Flask de test, base SQLite en mémoire (fichier si paramétrée par 'fichier')"""
+    app = Flask(__name__)
+    fichier = getattr(request, 'param', None) == 'fichier'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'app.db'}" if fichier else 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(lmnp_bp, url_prefix='/api')
+    db.init_app(app)
+    # Les identifiants repartent de 1 à chaque base de test
+    cache_ressources.vider()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@contextmanager
+def compter_requetes():
+    """Requêtes SQL émises dans le bloc"""
+    requetes = []
+    ecouteur = lambda *args: requetes.append(args[2])  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', ecouteur)
+    try:
+        yield requetes
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', ecouteur)
+
+
+def creer_declaration(client, user_id, annee):
+    """Déclaration créée via l'API, retourne son id"""
+    reponse = client.post('/api/declarations', json={'annee': annee}, headers={'X-User-Id': str(user_id)})
+    assert reponse.status_code == 201
+    return reponse.get_json()['declaration']['id']
+
+
+def creer_bien(client, declaration_id, loyers):
+    """Bien avec recettes et dépenses créé via l'API, retourne son id"""
+    reponse = client.post('/api/biens', json={
+        'declarationId': declaration_id,
+        'adresse': '12 rue des Lilas',
+        'codePostal': '69003',
+        'dateEntreeLmnp': '2020-03-01',
+        'prixAcquisition': 180000,
+        'fraisNotaire': 14000.5
+    })
+    assert reponse.status_code == 201
+    bien_id = reponse.get_json()['bien']['id']
+    assert client.put(f'/api/biens/{bien_id}/recettes', json={'loyersBruts': loyers}).get_json()['persiste']
+    client.put(f'/api/biens/{bien_id}/depenses', json={'fraisGestion': 1200, 'taxeFonciere': 900})
+    return bien_id
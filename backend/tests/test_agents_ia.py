@@ -0,0 +1,159 @@
+import json
+import os
+import time
+
+import pytest
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from flask import Flask  # noqa: E402
+
+from benchmarks.llm_factice import ServeurLLMFactice  # noqa: E402
+from src import agents_ia_lmnp  # noqa: E402
+from src.agents_ia_lmnp import AgentType, OrchestrateursAgentsIA  # noqa: E402
+from src.boucle_asynchrone import executer  # noqa: E402
+from src.cache_agents import cache_reponses_agents  # noqa: E402
+from src.prompts_agents import mesures_prompts  # noqa: E402
+from src.routes.agents_routes import agents_bp  # noqa: E402
+
+# Déclenche les trois agents
+QUESTION_COMPLETE = "Quelle interface et quelle api pour le calcul de l'amortissement ?"
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Serveur LLM local : 0,3 s par agent, 2 s pour l'agent fiscal"""
+    with ServeurLLMFactice({'Expert-Comptable': 2.0}, delai_defaut=0.3) as serveur:
+        # Même pool de connexions que le client de production
+        client = agents_ia_lmnp.client.copy(base_url=serveur.url, max_retries=0)
+        monkeypatch.setattr(agents_ia_lmnp, 'client', client)
+        cache_reponses_agents.vider()
+        yield serveur
+
+
+def test_agents_consultes_en_parallele(llm):
+    llm.delais = {}
+    orchestrateur = OrchestrateursAgentsIA(delai_agent=5)
+
+    debut = time.perf_counter()
+    reponses = executer(orchestrateur.process_request(QUESTION_COMPLETE))
+    duree = time.perf_counter() - debut
+
+    assert [r.agent_type for r in reponses] == [AgentType.PRODUIT, AgentType.DEVELOPPEUR, AgentType.FISCAL]
+    assert all(r.confidence > 0 for r in reponses)
+    # Trois appels de 0,3 s : la durée est celle du plus lent, pas leur somme
+    assert duree < 0.75
+
+
+def test_chat_renvoie_les_reponses_partielles(llm):
+    app = Flask(__name__)
+    app.register_blueprint(agents_bp, url_prefix='/api')
+    agents_ia_lmnp.orchestrateur.delai_agent, delai = 0.8, agents_ia_lmnp.orchestrateur.delai_agent
+    try:
+        debut = time.perf_counter()
+        reponse = app.test_client().post('/api/agents/chat', json={'message': QUESTION_COMPLETE})
+        duree = time.perf_counter() - debut
+    finally:
+        agents_ia_lmnp.orchestrateur.delai_agent = delai
+
+    donnees = reponse.get_json()
+    assert reponse.status_code == 200
+    assert donnees['agents_consultes'] == ['agentProduit', 'agentDev', 'agentFiscal']
+    assert donnees['agents_en_echec'] == ['agentFiscal']
+    assert donnees['reponses'][0].startswith('Réponse factice')
+    assert 'Délai dépassé' in donnees['reponses'][2]
+    assert duree < 1.5
+
+
+def test_connexions_reutilisees_entre_requetes(llm):
+    llm.delais = {}
+    app = Flask(__name__)
+    app.register_blueprint(agents_bp, url_prefix='/api')
+    client = app.test_client()
+
+    for i in range(5):
+        assert client.post('/api/agents/chat', json={'message': f'{QUESTION_COMPLETE} ({i})'}).status_code == 200
+
+    # Boucle et client partagés : au plus une connexion par agent consulté simultanément
+    assert llm.appels == 15
+    assert llm.connexions <= 3
+
+
+def test_question_repetee_servie_par_le_cache(llm):
+    llm.delais = {}
+    orchestrateur = OrchestrateursAgentsIA(delai_agent=5)
+    premieres = executer(orchestrateur.process_request(QUESTION_COMPLETE, {'recettes': 12000}))
+    hits = cache_reponses_agents.memoire.hits
+
+    debut = time.perf_counter()
+    secondes = executer(orchestrateur.process_request(QUESTION_COMPLETE, {'recettes': 12000}))
+    duree = time.perf_counter() - debut
+
+    assert [r.content for r in secondes] == [r.content for r in premieres]
+    assert llm.appels == 3
+    assert duree < 0.05
+    assert cache_reponses_agents.memoire.hits == hits + 3
+
+
+def _evenements_sse(reponse):
+    """(type, données) de chaque événement SSE, au fil de leur réception"""
+    tampon = ''
+    for bloc in reponse.response:
+        tampon += bloc.decode() if isinstance(bloc, bytes) else bloc
+        while '\n\n' in tampon:
+            evenement, tampon = tampon.split('\n\n', 1)
+            lignes = dict(ligne.split(': ', 1) for ligne in evenement.splitlines())
+            yield lignes['event'], json.loads(lignes['data'])
+
+
+def test_flux_transmet_les_jetons_au_fil_de_l_eau(llm):
+    llm.delais, llm.delai_defaut, llm.delai_jeton, llm.mots = {}, 0.05, 0.05, 10
+    app = Flask(__name__)
+    app.register_blueprint(agents_bp, url_prefix='/api')
+
+    debut = time.perf_counter()
+    reponse = app.test_client().post('/api/agents/fiscal/flux', json={'demande': 'Calcul ?'}, buffered=False)
+    evenements, premier_jeton = [], None
+    for evenement in _evenements_sse(reponse):
+        if evenement[0] == 'jeton' and premier_jeton is None:
+            premier_jeton = time.perf_counter() - debut
+        evenements.append(evenement)
+
+    assert reponse.mimetype == 'text/event-stream'
+    assert [type_evenement for type_evenement, _ in evenements[:2]] == ['debut', 'jeton']
+    assert evenements[-2] == ('fin', {'agent': 'agentFiscal', 'erreur': None})
+    assert evenements[-1] == ('termine', {'agents_consultes': ['agentFiscal'], 'agents_en_echec': []})
+    texte = ''.join(donnees['texte'] for type_evenement, donnees in evenements if type_evenement == 'jeton')
+    assert texte.startswith('Réponse factice') and texte.endswith(' mot8 mot9')
+    # Premier jeton après ~50 ms, réponse complète après ~550 ms
+    assert premier_jeton < 0.3
+
+
+def test_flux_interrompu_quand_le_client_part(llm):
+    llm.delai_defaut, llm.delai_jeton, llm.mots = 0, 0.05, 40
+    app = Flask(__name__)
+    app.register_blueprint(agents_bp, url_prefix='/api')
+
+    reponse = app.test_client().post('/api/agents/developpeur/flux', json={'demande': 'Code ?'}, buffered=False)
+    for type_evenement, _ in _evenements_sse(reponse):
+        if type_evenement == 'jeton':
+            break
+    reponse.close()
+    time.sleep(0.2)
+
+    # Connexion au modèle fermée, réponse partielle non mise en cache
+    assert llm.flux_interrompus == 1
+    assert len(cache_reponses_agents.memoire) == 0
+
+
+def test_contexte_volumineux_ramene_au_budget(llm):
+    llm.delais = {}
+    biens = [{'adresse': f'{i} rue du Port', 'loyer': 700, 'description': 'Studio meublé ' * 20} for i in range(500)]
+    mesures_prompts.vider()
+
+    executer(agents_ia_lmnp.demander_agent_fiscal('Régime le plus favorable ?', {'recettes': 12000, 'biens': biens}))
+
+    appel = mesures_prompts.statistiques()['recents'][-1]
+    assert appel['agent'] == 'agentFiscal' and appel['contexte_reduit']
+    assert appel['tokens_contexte'] <= agents_ia_lmnp.AgentFiscal.BUDGET_CONTEXTE
+    assert appel['tokens_prompt'] > appel['tokens_contexte']
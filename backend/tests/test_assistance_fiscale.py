@@ -0,0 +1,127 @@
+import os
+from decimal import Decimal
+
+import pytest
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from flask import Flask  # noqa: E402
+
+from benchmarks.llm_factice import ServeurLLMFactice  # noqa: E402
+from src import agents_ia_lmnp  # noqa: E402
+from src.assistance_fiscale import calculer, montant  # noqa: E402
+from src.cache_agents import cache_reponses_agents  # noqa: E402
+from src.routes.agents_routes import agents_bp  # noqa: E402
+
+DEMANDE_BIEN = {
+    'bien': {'adresse': '12 rue de la Paix', 'dateEntreeLmnp': '2023-07-01', 'prixAcquisition': 200000,
+             'fraisNotaire': 15000, 'fraisAgence': 5000},
+    'recettes': {'loyersBruts': 14400},
+    'depenses': {'taxeFonciere': 900, 'chargesCopropriete': 1200},
+    'emprunt': {'interetsAnnuels': 3000},
+    'annee': 2024
+}
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    with ServeurLLMFactice() as serveur:
+        monkeypatch.setattr(agents_ia_lmnp, 'client', agents_ia_lmnp.client.copy(base_url=serveur.url, max_retries=0))
+        cache_reponses_agents.vider()
+        yield serveur
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(agents_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def test_montants_et_donnees_non_structurees():
+    assert montant('12 500,50 €') == Decimal('12500.50')
+    assert montant(True) is None and montant(-5) is None and montant('beaucoup') is None
+    assert calculer({'experience': 'débutant'}) is None
+    assert calculer({'recettes': 'beaucoup', 'charges': 100}) is None
+
+
+def test_optimisation_calculee_sans_agent(llm, client):
+    reponse = client.post('/api/agents/assistance/optimisation', json={
+        'situation': {'recettes': 30000, 'charges': 9000, 'nombreBiens': 2, 'regime': 'réel'}
+    })
+
+    donnees = reponse.get_json()
+    assert reponse.status_code == 200 and donnees['source'] == 'calcul'
+    assert llm.appels == 0
+    assert donnees['calculs']['optimisation']['regime_recommande'] == 'micro_bic'
+    assert donnees['calculs']['optimisation']['economie_estimee'] == 6000.0
+    assert '15 000,00 €' in donnees['conseils']
+    assert "Votre régime actuel (régime réel) n'est pas le plus avantageux" in donnees['conseils']
+
+
+def test_resultat_du_bien_calcule_sans_agent(llm, client):
+    reponse = client.post('/api/agents/assistance/calculs', json={'type': 'résultat', 'donnees': DEMANDE_BIEN})
+
+    donnees = reponse.get_json()
+    assert reponse.status_code == 200 and donnees['source'] == 'calcul' and llm.appels == 0
+    # 14 400 - 2 100 de charges - 3 000 d'intérêts - (6 400 + 1 000 + 333,33) d'amortissements
+    assert donnees['calculs']['resultat']['resultat_apres_amortissement'] == 1566.67
+    assert donnees['calculs']['optimisation']['regime_recommande'] == 'reel'
+    assert 'Résultat après amortissement : 1 566,67 €' in donnees['explication']
+
+
+def test_question_libre_transmise_a_l_agent_avec_les_calculs(llm, client):
+    reponse = client.post('/api/agents/assistance/optimisation', json={
+        'situation': {'recettes': 30000, 'charges': 9000},
+        'question': "Dois-je passer en SCI ?"
+    })
+
+    donnees = reponse.get_json()
+    assert reponse.status_code == 200 and donnees['source'] == 'agent'
+    assert llm.appels == 1
+    assert donnees['conseils'].startswith('Réponse factice')
+    assert donnees['calculs']['optimisation']['regime_recommande'] == 'micro_bic'
+
+
+def test_bien_invalide(llm, client):
+    reponse = client.post('/api/agents/assistance/calculs', json={
+        'donnees': {'bien': {'dateEntreeLmnp': 'hier', 'prixAcquisition': 100000}}
+    })
+
+    assert reponse.status_code == 400 and not reponse.get_json()['success']
+    assert llm.appels == 0
+
+
+@pytest.mark.parametrize('champs', [
+    {'recettes': 12000, 'charges': 3000},
+    {'charges': 3000},
+    {'amortissements': 7000},
+    {'depenses': 3000},
+    {'depenses': [1]},
+    {'emprunt': 5},
+    {'recettes': '1e999999999'},
+    {'recettes': {'loyersBruts': '1e999999999'}},
+])
+def test_montants_du_bien_rejetes(llm, client, champs):
+    reponse = client.post('/api/agents/assistance/calculs', json={'donnees': {**DEMANDE_BIEN, **champs}})
+    assert reponse.status_code == 400 and not reponse.get_json()['success']
+    assert llm.appels == 0
+
+
+def test_montant_non_numerique(llm, client):
+    reponse = client.post('/api/agents/assistance/calculs', json={
+        'donnees': {**DEMANDE_BIEN, 'recettes': {'loyersBruts': 'abc'}}
+    })
+    assert reponse.status_code == 400 and not reponse.get_json()['success']
+
+    reponse = client.post('/api/agents/assistance/optimisation', json={
+        'situation': {**DEMANDE_BIEN, 'depenses': {'taxeFonciere': 'abc'}}
+    })
+    assert reponse.status_code == 400 and not reponse.get_json()['success']
+
+    reponse = client.post('/api/agents/assistance/optimisation', json={
+        'situation': {'recettes': '1e999999999', 'charges': 0}
+    })
+    assert reponse.status_code == 400
+    assert reponse.get_json()['error'] == 'Situation invalide: montant non numérique ou hors limites'
+    assert llm.appels == 0
@@ -0,0 +1,42 @@
+from flask import Flask
+from sqlalchemy import create_engine, text
+from flask_sqlalchemy import SQLAlchemy
+
+from src.base_donnees import ajouter_colonnes_manquantes, configurer_base_donnees, options_moteur, url_base_donnees
+from src.models.user import User
+
+
+def test_pragmas_appliques_a_chaque_connexion(tmp_path, monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.setenv('LMNP_SQLITE_BUSY_TIMEOUT', '1234')
+    app, db = Flask(__name__), SQLAlchemy()
+    configurer_base_donnees(app, db, str(tmp_path / 'app.db'))
+
+    with app.app_context():
+        with db.engine.connect() as connexion:
+            assert connexion.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connexion.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+            assert connexion.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+            assert connexion.execute(text('PRAGMA cache_size')).scalar() == -65536
+
+
+def test_url_postgresql_avec_pool(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://lmnp:secret@db:5432/lmnp')
+    monkeypatch.setenv('LMNP_DB_POOL_SIZE', '4')
+    url = url_base_donnees('/tmp/app.db')
+    assert url == 'postgresql://lmnp:secret@db:5432/lmnp'
+    options = options_moteur(url)
+    assert options['pool_size'] == 4 and options['max_overflow'] == 20 and options['pool_pre_ping']
+    assert options_moteur('sqlite:///app.db') == {}
+
+
+def test_colonnes_ajoutees_aux_tables_existantes(tmp_path):
+    moteur = create_engine(f"sqlite:///{tmp_path / 'ancienne.db'}")
+    with moteur.begin() as connexion:
+        connexion.execute(text('CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80), email VARCHAR(120))'))
+        connexion.execute(text("INSERT INTO user (username, email) VALUES ('alice', 'alice@exemple.fr')"))
+
+    assert ajouter_colonnes_manquantes(moteur, User.metadata)['user'] == ['version']
+    with moteur.connect() as connexion:
+        assert connexion.execute(text('SELECT version FROM user')).scalar() == 1
+    assert 'user' not in ajouter_colonnes_manquantes(moteur, User.metadata)
@@ -0,0 +1,44 @@
+import time
+
+from src.boucle_asynchrone import executer
+from src.cache_agents import CacheReponsesAgents, cle_reponse
+
+PARAMETRES = {'model': 'gpt-4', 'temperature': 0.1, 'max_tokens': 2500, 'messages': []}
+
+
+def test_cle_canonique():
+    cle = cle_reponse('agentFiscal', '2024.1', 'Calcul ?', {'recettes': 12000, 'charges': 3000}, PARAMETRES)
+
+    # Ordre des champs du contexte, espaces autour de la question et messages sans effet
+    assert cle == cle_reponse('agentFiscal', '2024.1', ' Calcul ? ', {'charges': 3000, 'recettes': 12000},
+                              {**PARAMETRES, 'messages': [{'role': 'user', 'content': 'x'}]})
+    assert cle != cle_reponse('agentFiscal', '2024.2', 'Calcul ?', {'recettes': 12000, 'charges': 3000}, PARAMETRES)
+    assert cle != cle_reponse('agentFiscal', '2024.1', 'Calcul ?', {'recettes': 12000, 'charges': 3000},
+                              {**PARAMETRES, 'temperature': 0.3})
+
+
+def test_niveau_disque_persiste_entre_instances(tmp_path):
+    fichier = str(tmp_path / 'cache_agents.db')
+    cache = CacheReponsesAgents()
+    cache.ouvrir_disque(fichier)
+    executer(cache.ecrire('cle', 'Réponse', tokens=420))
+
+    # Nouveau processus : mémoire vide, réponse relue sur disque puis remontée en mémoire
+    relu = CacheReponsesAgents()
+    relu.ouvrir_disque(fichier)
+    assert executer(relu.lire('cle')) == 'Réponse'
+    assert executer(relu.lire('cle')) == 'Réponse'
+    statistiques = relu.statistiques()
+    assert statistiques['disque']['hits'] == 1
+    assert statistiques['memoire']['hits'] == 1
+    assert statistiques['tokens_economises'] == 840
+
+
+def test_entrees_expirees(tmp_path):
+    cache = CacheReponsesAgents(ttl=0.05)
+    cache.ouvrir_disque(str(tmp_path / 'cache_agents.db'))
+    executer(cache.ecrire('cle', 'Réponse'))
+    time.sleep(0.1)
+
+    assert executer(cache.lire('cle')) is None
+
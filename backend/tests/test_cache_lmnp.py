@@ -0,0 +1,107 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.cache_lmnp import CacheLRU
+from src.expertise_fiscale_lmnp import (
+    BienImmobilier,
+    _amortissement_en_json,
+    _convertir_bien,
+    cache_amortissements,
+    calculer_amortissement_bien,
+    expert_fiscal,
+    invalider_cache_bien,
+)
+
+
+class Horloge:
+    def __init__(self):
+        self.maintenant = 0.0
+
+    def __call__(self):
+        return self.maintenant
+
+
+def test_lru_eviction_et_compteurs():
+    cache = CacheLRU(taille_max=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    stats = cache.statistiques()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['taille']) == (1, 1, 1, 2)
+
+
+def test_ttl():
+    horloge = Horloge()
+    cache = CacheLRU(taille_max=10, ttl=60, horloge=horloge)
+    cache.set('a', 1)
+    horloge.maintenant = 59
+    assert cache.get('a') == 1
+    horloge.maintenant = 61
+    assert cache.get('a') is None
+    assert cache.statistiques()['expirations'] == 1
+
+
+def test_obtenir_ou_calculer():
+    cache = CacheLRU()
+    appels = []
+    for _ in range(3):
+        assert cache.obtenir_ou_calculer('cle', lambda: appels.append(1) or 42) == 42
+    assert len(appels) == 1
+
+
+def test_taille_invalide():
+    with pytest.raises(ValueError):
+        CacheLRU(taille_max=0)
+
+
+def _bien_data(**modifications):
+    donnees = {
+        'id': 987,
+        'adresse': '1 place Bellecour, 69002 Lyon',
+        'date_entree_lmnp': date(2023, 5, 17),
+        'prix_acquisition': 254300.5,
+        'frais_notaire': 18200.0,
+        'frais_agence': 7000.0
+    }
+    donnees.update(modifications)
+    return donnees
+
+
+def test_amortissement_en_cache_identique():
+    cache_amortissements.vider()
+    premier = calculer_amortissement_bien(_bien_data(), 2023)
+    hits = cache_amortissements.hits
+    second = calculer_amortissement_bien(_bien_data(), 2023)
+
+    assert cache_amortissements.hits == hits + 1
+    sans_cache = _amortissement_en_json(expert_fiscal.calculer_amortissement(_convertir_bien(_bien_data()), 2023))
+    assert json.dumps(premier) == json.dumps(second) == json.dumps(sans_cache)
+
+    # Le résultat retourné est une copie : le modifier n'altère pas le cache
+    second['total_annuel'] = 0
+    assert calculer_amortissement_bien(_bien_data(), 2023) == premier
+
+
+def test_modification_du_bien_change_la_cle():
+    cache_amortissements.vider()
+    avant = calculer_amortissement_bien(_bien_data(), 2024)
+    apres = calculer_amortissement_bien(_bien_data(frais_agence=9000.0), 2024)
+    assert apres['frais_agence_annuel'] != avant['frais_agence_annuel']
+
+    assert invalider_cache_bien(987) == 2
+    assert len(cache_amortissements) == 0
+
+
+def test_bien_fige_hashable():
+    bien = BienImmobilier(1, 'Nice', date(2022, 1, 1), Decimal('1'), Decimal('2'), Decimal('3'))
+    fige = bien.figer()
+    assert hash(fige) == hash(bien.figer())
+    with pytest.raises(AttributeError):
+        fige.prix_acquisition = Decimal('0')
@@ -0,0 +1,43 @@
+from src.cache_ressources import cache_ressources
+
+from tests.conftest import compter_requetes, creer_bien, creer_declaration
+
+
+def test_etag_utilisateur_et_304(client):
+    user_id = client.post('/api/users', json={'username': 'alice', 'email': 'alice@exemple.fr'}).get_json()['id']
+    reponse = client.get(f'/api/users/{user_id}')
+    etag = reponse.headers['ETag']
+    assert reponse.get_json()['username'] == 'alice'
+
+    with compter_requetes() as requetes:
+        reponse = client.get(f'/api/users/{user_id}', headers={'If-None-Match': etag})
+    assert reponse.status_code == 304 and reponse.data == b'' and requetes == []
+
+    client.put(f'/api/users/{user_id}', json={'email': 'alice@cabinet.fr'})
+    reponse = client.get(f'/api/users/{user_id}', headers={'If-None-Match': etag})
+    assert reponse.status_code == 200 and reponse.headers['ETag'] != etag
+    assert reponse.get_json()['email'] == 'alice@cabinet.fr'
+
+    etag = reponse.headers['ETag']
+    client.post('/api/users/bulk', json={'operations': [{'op': 'update', 'id': user_id, 'username': 'alice2'}]})
+    assert client.get(f'/api/users/{user_id}', headers={'If-None-Match': etag}).get_json()['username'] == 'alice2'
+
+    client.delete(f'/api/users/{user_id}')
+    assert client.get(f'/api/users/{user_id}').status_code == 404
+
+
+def test_version_de_declaration_suit_biens_et_montants(client):
+    declaration_id = creer_declaration(client, 4, 2024)
+    bien_id = creer_bien(client, declaration_id, 12000)
+    url = f'/api/declarations/{declaration_id}?user_id=4'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert (None, ('declaration', declaration_id)) in cache_ressources
+
+    client.put(f'/api/biens/{bien_id}/depenses', json={'fraisGestion': 300})
+    reponse = client.get(url, headers={'If-None-Match': etag})
+    assert reponse.status_code == 200
+    assert reponse.get_json()['declaration']['biens'][0]['depenses']['fraisGestion'] == 300.0
+
+    # Le propriétaire est vérifié aussi sur une représentation en cache
+    assert client.get(f'/api/declarations/{declaration_id}?user_id=5').status_code == 404
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from benchmarks.llm_factice import ServeurLLMFactice  # noqa: E402
+from src import agents_ia_lmnp  # noqa: E402
+from src.boucle_asynchrone import executer  # noqa: E402
+from src.cache_agents import cache_reponses_agents  # noqa: E402
+from src.cache_semantique import CacheSemantique, configurer_cache_semantique, vectoriser  # noqa: E402
+
+QUESTION = "Quel est le plafond du régime micro-BIC pour une location meublée ?"
+REPONSE = "77 700 € de recettes annuelles."
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CacheSemantique()
+    cache.ouvrir(str(tmp_path / 'cache_semantique'))
+    yield cache
+    cache.fermer()
+
+
+def test_question_reformulee(cache):
+    cache.ajouter(QUESTION, 'portee', REPONSE, tokens=300)
+
+    reponse, similarite = cache.chercher("Plafond du micro-BIC pour les locations meublées ?", 'portee')
+    assert reponse == REPONSE and similarite >= cache.seuil
+    # Autre question, autre contexte, autres montants : pas de réponse rejouée
+    assert cache.chercher("Comment remplir le formulaire 2033-C ?", 'portee') is None
+    assert cache.chercher(QUESTION, 'autre portee') is None
+    cache.ajouter("Micro-BIC avec 30 000 € de recettes ?", 'portee', 'Abattement de 15 000 €')
+    assert cache.chercher("Micro-BIC avec 45 000 € de recettes ?", 'portee') is None
+    assert cache.statistiques()['tokens_economises'] == 300
+
+
+def test_paraphrase_et_negation(cache):
+    cache.ajouter("comment calculer l'amortissement", 'portee', 'Par composant, en linéaire')
+    assert cache.chercher("calcul amortissement LMNP", 'portee')[0] == 'Par composant, en linéaire'
+
+    cache.ajouter("Le terrain est-il amortissable ?", 'portee', 'Non')
+    assert cache.chercher("Le terrain n'est-il pas amortissable ?", 'portee') is None
+    assert cache.chercher("Le terrain est-il amortissable ?", 'portee')[0] == 'Non'
+
+
+def test_desactive_par_defaut(monkeypatch):
+    monkeypatch.delenv('LMNP_CACHE_SEMANTIQUE_DOSSIER', raising=False)
+    assert not configurer_cache_semantique().actif
+
+
+def test_instantane_projete_et_rouvert(tmp_path, cache):
+    cache.ajouter(QUESTION, 'portee', REPONSE)
+    cache.reconstruire()
+    cache.ajouter("Durée d'amortissement de la construction ?", 'portee', '25 ans')
+    assert cache.statistiques()['instantane'] == 1 and cache.statistiques()['memoire'] == 1
+    cache.fermer()
+
+    # Redémarrage : l'instantané est relu depuis le disque, l'entrée postérieure depuis SQLite
+    relu = CacheSemantique()
+    relu.ouvrir(str(tmp_path / 'cache_semantique'))
+    assert relu.chercher(QUESTION, 'portee')[0] == REPONSE
+    assert relu.chercher("Quelle durée d'amortissement pour la construction ?", 'portee')[0] == '25 ans'
+    relu.fermer()
+
+
+def test_portees_melangees(cache):
+    """La même question posée dans d'autres contextes, et des entrées évincées encore dans l'instantané"""
+    for i in range(30):
+        cache.ajouter(QUESTION, f'contexte {i}', f'réponse {i}')
+    cache.ajouter(QUESTION, 'portee', REPONSE)
+    for i in range(30):
+        cache.ajouter(QUESTION, 'evincee', 'évincée')
+    cache.reconstruire()
+    cache._supprimer('SELECT id FROM entrees_semantiques WHERE portee = ?', ('evincee',))
+    cache.ajouter(QUESTION, 'contexte 99', 'réponse 99')
+
+    assert cache.chercher("Plafond du micro-BIC pour les locations meublées ?", 'portee')[0] == REPONSE
+    assert cache.chercher("Plafond du micro-BIC pour les locations meublées ?", 'contexte 7')[0] == 'réponse 7'
+    assert cache.chercher(QUESTION, 'evincee') is None
+    assert cache.chercher(QUESTION, 'contexte inconnu') is None
+
+
+def test_eviction_des_moins_utilisees(cache):
+    cache.taille_max = 10
+    questions = ["Frais de notaire", "Cotisation foncière", "Taxe d'habitation", "Dépôt de garantie",
+                 "Déficit reportable", "Liasse fiscale", "Centre de gestion agréé", "Prorata temporis",
+                 "Valeur du terrain", "Mobilier amortissable"]
+    for question in questions:
+        cache.ajouter(question, 'portee', question)
+    cache.reconstruire()
+    cache.chercher(questions[0], 'portee')
+    cache.ajouter("Une onzième question", 'portee', 'onze')
+
+    # 10 % évincés en plus du dépassement : les deux entrées les moins récemment utilisées
+    assert cache.statistiques()['taille'] == 9
+    assert cache.chercher(questions[0], 'portee') is not None
+    assert cache.chercher(questions[1], 'portee') is None
+    assert cache.chercher(questions[2], 'portee') is None
+
+
+def test_vecteurs_normes():
+    vecteur = vectoriser(QUESTION)
+    assert vecteur.dtype == np.float32 and abs(np.linalg.norm(vecteur) - 1) < 1e-5
+    assert not vectoriser('le la les').any()
+
+
+def test_agent_fiscal_rejoue_la_question_reformulee(cache, monkeypatch):
+    with ServeurLLMFactice() as llm:
+        monkeypatch.setattr(agents_ia_lmnp, 'client', agents_ia_lmnp.client.copy(base_url=llm.url, max_retries=0))
+        monkeypatch.setattr(agents_ia_lmnp.AgentFiscal, 'CACHE_SEMANTIQUE', cache)
+        cache_reponses_agents.vider()
+        agent = agents_ia_lmnp.AgentFiscal()
+        contexte = {'recettes': 12000}
+
+        premiere = executer(agent.process_request(QUESTION, contexte))
+        seconde = executer(agent.process_request("Plafond du micro-BIC pour les locations meublées ?", contexte))
+
+        assert seconde.content == premiere.content
+        assert llm.appels == 1
@@ -0,0 +1,140 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.calculs_vectorises import (
+    AmortissementsLot,
+    BiensLot,
+    DepensesLot,
+    EmpruntsLot,
+    RecettesLot,
+    balayer_regimes,
+    calculer_amortissements_lot,
+    calculer_amortissements_portefeuille,
+    calculer_resultats_lot,
+)
+from src.expertise_fiscale_lmnp import BienImmobilier, Depenses, Emprunt, Recettes, expert_fiscal
+
+
+def _bien_aleatoire(rng, identifiant):
+    part = Decimal(rng.randint(5000, 9500)) / 10000
+    return BienImmobilier(
+        id=identifiant,
+        adresse=f'{identifiant} rue du Test',
+        date_entree_lmnp=date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650)),
+        prix_acquisition=Decimal(rng.randint(5_000_000, 90_000_000)) / 100,
+        frais_notaire=Decimal(rng.randint(0, 3_000_000)) / 100,
+        frais_agence=Decimal(rng.randint(0, 1_500_000)) / 100,
+        part_terrain=1 - part,
+        part_construction=part,
+        duree_amortissement_construction=rng.choice([20, 25, 30]),
+        duree_amortissement_frais=rng.choice([5, 10, 15])
+    )
+
+
+def test_lot_identique_au_calcul_unitaire():
+    rng = random.Random(2024)
+    biens = [_bien_aleatoire(rng, i) for i in range(300)]
+    annees = list(range(2015, 2027))
+
+    lot = calculer_amortissements_portefeuille(biens, annees)
+
+    for i, bien in enumerate(biens):
+        for j, annee in enumerate(annees):
+            assert lot.amortissement(i, j) == expert_fiscal.calculer_amortissement(bien, annee)
+
+
+def test_egalite_demi_centime_prorata():
+    # Annuité de 5 480,475 € sur 3 jours : 45,045 € exactement, égalité tranchée par le moteur Decimal
+    bien = BienImmobilier(
+        id=1,
+        adresse='',
+        date_entree_lmnp=date(2023, 12, 29),
+        prix_acquisition=Decimal('182682.50'),
+        frais_notaire=Decimal('0'),
+        frais_agence=Decimal('0'),
+        part_terrain=Decimal('0.25'),
+        part_construction=Decimal('0.75')
+    )
+    lot = calculer_amortissements_portefeuille([bien], [2023, 2024])
+    for j, annee in enumerate([2023, 2024]):
+        assert lot.amortissement(0, j) == expert_fiscal.calculer_amortissement(bien, annee)
+
+
+def test_colonnes_en_centimes():
+    lot = calculer_amortissements_lot(
+        prix_acquisition=[20_000_000],
+        part_construction=[8000],
+        frais_notaire=[1_500_000],
+        frais_agence=[500_000],
+        date_entree_lmnp=np.array(['2024-07-01'], dtype='datetime64[D]'),
+        annees=[2024, 2025]
+    )
+    assert isinstance(lot, AmortissementsLot)
+    assert lot.total_annuel.shape == (1, 2)
+    assert lot.construction_annuel[0, 1] == 640_000
+    assert lot.construction_prorata[0, 1] == 640_000
+    # 184 jours restants sur 365
+    assert lot.construction_prorata[0, 0] == 322_630
+
+
+def test_montant_negatif_refuse():
+    with pytest.raises(ValueError):
+        calculer_amortissements_lot([-1], [8000], [0], [0], ['2024-01-01'], [2024])
+
+
+def test_balayage_identique_a_optimiser_regime():
+    recettes = [0, 1_234_567, 3_000_001, 7_770_000, 7_770_001]
+    charges = [0, 500_000, 1_500_050, 2_999_999]
+    amortissements = [0, 333, 1_000_000]
+    balayage = balayer_regimes(recettes, charges, amortissements)
+
+    for i, r in enumerate(recettes):
+        for j, c in enumerate(charges):
+            for k, a in enumerate(amortissements):
+                attendu = expert_fiscal.optimiser_regime_fiscal(Decimal(r) / 100, Decimal(c + a) / 100)
+                micro = attendu['regime_recommande'] == 'micro_bic'
+                assert balayage.micro_bic_recommande[i, j, k] == micro
+                assert Decimal(int(balayage.economie_estimee[i, j, k])) / 100 == attendu['economie_estimee']
+                assert Decimal(int(balayage.base_imposable_reel[i, j, k])) / 100 == attendu['base_imposable_reel']
+
+
+def test_balayage_point_equilibre_exact():
+    # 30 000,01 € de recettes : équilibre à 15 000,005 € - 1 000 € d'amortissement
+    balayage = balayer_regimes([3_000_001, 8_000_000], [1_400_000, 1_400_001], [100_000])
+    assert balayage.charges_equilibre[0, 0] == 14000.005
+    assert np.isnan(balayage.charges_equilibre[1, 0])
+    assert balayage.micro_bic_recommande[0].tolist() == [[True], [False]]
+    assert expert_fiscal.calculer_charges_equilibre(Decimal('30000.01'), Decimal('1000')) == Decimal('14000.005')
+
+
+def test_lots_colonnes_identiques_au_calcul_unitaire():
+    rng = random.Random(9)
+    biens = [_bien_aleatoire(rng, i) for i in range(200)]
+    recettes = [Recettes(Decimal(rng.randint(0, 5_000_000)) / 100, Decimal(rng.randint(0, 50_000)) / 100)
+                for _ in biens]
+    depenses = [Depenses(**{champ: Decimal(rng.randint(0, 300_000)) / 100 for champ in DepensesLot.champs()})
+                for _ in biens]
+    emprunts = [Emprunt(Decimal(rng.randint(0, 900_000)) / 100) if i % 3 else None for i in range(len(biens))]
+
+    lot_biens = BiensLot.depuis_objets(biens)
+    resultats = calculer_resultats_lot(
+        lot_biens, RecettesLot.depuis_objets(recettes), DepensesLot.depuis_objets(depenses), 2022,
+        EmpruntsLot.depuis_objets(emprunts)
+    )
+
+    for i, bien in enumerate(biens):
+        attendu = expert_fiscal.calculer_resultat_bien(bien, recettes[i], depenses[i], emprunts[i], 2022)
+        assert {champ: Decimal(int(valeurs[i])) / 100 for champ, valeurs in resultats.items()} == attendu
+    assert lot_biens[7] == biens[7]
+    assert DepensesLot.depuis_objets(depenses)[3] == depenses[3]
+
+
+def test_dataclasses_fiscales_sans_dict():
+    bien = _bien_aleatoire(random.Random(1), 1)
+    assert not hasattr(bien, '__dict__')
+    with pytest.raises(AttributeError):
+        bien.champ_inconnu = 1
@@ -0,0 +1,72 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+from src.declaration_lmnp import (
+    CHAMPS_RESULTAT,
+    CalculateurDeclaration,
+    depenses_depuis_json,
+)
+from src.expertise_fiscale_lmnp import BienImmobilier, Depenses, ExpertiseFiscaleLMNP, Recettes
+
+
+class ExpertCompteur(ExpertiseFiscaleLMNP):
+    def __init__(self):
+        super().__init__()
+        self.appels = 0
+
+    def calculer_resultat_bien(self, *args, **kwargs):
+        self.appels += 1
+        return super().calculer_resultat_bien(*args, **kwargs)
+
+
+def _portefeuille(calculateur, nombre, rng):
+    for i in range(nombre):
+        bien = BienImmobilier(
+            id=i,
+            adresse=f'{i} rue de Lille',
+            date_entree_lmnp=date(2019, rng.randint(1, 12), 1),
+            prix_acquisition=Decimal(rng.randint(80_000, 400_000)),
+            frais_notaire=Decimal(rng.randint(5_000, 25_000)),
+            frais_agence=Decimal(rng.randint(0, 10_000))
+        )
+        calculateur.ajouter_bien(
+            bien,
+            Recettes(loyers_bruts=Decimal(rng.randint(6_000, 30_000))),
+            Depenses(frais_gestion=Decimal(rng.randint(0, 3_000)), assurances=Decimal('312.40'))
+        )
+
+
+def _totaux_complets(calculateur):
+    totaux = {champ: Decimal('0') for champ in CHAMPS_RESULTAT}
+    for contribution in calculateur.contributions.values():
+        resultat = ExpertiseFiscaleLMNP().calculer_resultat_bien(
+            contribution.bien, contribution.recettes, contribution.depenses, contribution.emprunt,
+            calculateur.annee)
+        for champ in CHAMPS_RESULTAT:
+            totaux[champ] += resultat[champ]
+    return totaux
+
+
+def test_mise_a_jour_incrementale():
+    expert = ExpertCompteur()
+    calculateur = CalculateurDeclaration(1, 2024, expert)
+    _portefeuille(calculateur, 25, random.Random(5))
+
+    expert.appels = 0
+    calculateur.mettre_a_jour_depenses(7, Depenses(frais_gestion=Decimal('1234.56'), cfe=Decimal('227')))
+    calculateur.mettre_a_jour_recettes(12, Recettes(loyers_bruts=Decimal('18000'), autres_recettes=Decimal('150')))
+
+    assert expert.appels == 2
+    assert calculateur.totaux == _totaux_complets(calculateur)
+
+    calculateur.retirer_bien(3)
+    assert calculateur.totaux == _totaux_complets(calculateur)
+    assert calculateur.synthese()['nombreBiens'] == 24
+
+
+def test_depenses_depuis_json():
+    depenses = depenses_depuis_json({'fraisGestion': 2400, 'taxeFonciere': 1200.5, 'inconnu': 3})
+    assert depenses.frais_gestion == Decimal('2400')
+    assert depenses.taxes_fonciere == Decimal('1200.5')
+    assert depenses.cfe == Decimal('0')
@@ -0,0 +1,61 @@
+from src.models.user import db
+from tests.conftest import compter_requetes, creer_bien, creer_declaration
+
+
+def test_liste_paginee_par_cle(client):
+    for annee in (2021, 2022, 2023, 2024):
+        creer_declaration(client, 1, annee)
+    creer_declaration(client, 2, 2024)
+
+    annees, curseur = [], None
+    while True:
+        parametres = {'user_id': 1, 'limite': 3, **({'apres': curseur} if curseur else {})}
+        data = client.get('/api/declarations', query_string=parametres).get_json()
+        annees += [d['annee'] for d in data['declarations']]
+        curseur = data['curseurSuivant']
+        if curseur is None:
+            break
+    assert annees == [2024, 2023, 2022, 2021]
+    assert data['total'] == 4
+    assert client.get('/api/declarations').status_code == 400
+
+
+def test_detail_en_nombre_constant_de_requetes(client):
+    declaration_id = creer_declaration(client, 1, 2024)
+    creer_bien(client, declaration_id, 12000)
+
+    with compter_requetes() as requetes:
+        client.get(f'/api/declarations/{declaration_id}?user_id=1')
+    nombre_un_bien = len(requetes)
+
+    for loyers in (9000, 15000, 20000):
+        creer_bien(client, declaration_id, loyers)
+    db.session.expunge_all()
+    with compter_requetes() as requetes:
+        data = client.get(f'/api/declarations/{declaration_id}?user_id=1').get_json()
+    assert len(requetes) == nombre_un_bien
+
+    declaration = data['declaration']
+    assert declaration['recettes'] == 56000.0
+    assert [b['recettes']['loyersBruts'] for b in declaration['biens']] == [12000.0, 9000.0, 15000.0, 20000.0]
+    assert declaration['biens'][0]['depenses']['taxeFonciere'] == 900.0
+    assert client.get(f'/api/declarations/{declaration_id}?user_id=2').status_code == 404
+
+    liste = client.get('/api/declarations?user_id=1').get_json()['declarations']
+    assert liste[0]['biens'] == 4 and liste[0]['recettes'] == 56000.0
+
+
+def test_calcul_et_dashboard_depuis_la_base(client):
+    declaration_id = creer_declaration(client, 7, 2024)
+    creer_bien(client, declaration_id, 12000)
+    creer_bien(client, declaration_id, 8000)
+
+    synthese = client.post(f'/api/declarations/{declaration_id}/calcul', json={}).get_json()['declaration']
+    assert synthese['nombreBiens'] == 2
+    assert synthese['totaux']['recettes_totales'] == 20000.0
+    assert synthese['totaux']['depenses_totales'] == 4200.0
+
+    stats = client.get('/api/stats/dashboard', headers={'X-User-Id': '7'}).get_json()['stats']
+    assert stats['totalBiens'] == 2
+    assert stats['recettesAnnuelles'] == 20000.0
+    assert stats['optimisationPossible']['regime'] == synthese['regimeRecommande']
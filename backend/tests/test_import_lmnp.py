@@ -0,0 +1,93 @@
+import io
+import json
+from datetime import date
+
+from openpyxl import Workbook
+
+
+def _declaration(client, annee=2024):
+    reponse = client.post('/api/declarations', json={'annee': annee}, headers={'X-User-Id': '3'})
+    return reponse.get_json()['declaration']['id']
+
+
+def _xlsx(lignes):
+    classeur = Workbook()
+    for ligne in lignes:
+        classeur.active.append(ligne)
+    contenu = io.BytesIO()
+    classeur.save(contenu)
+    contenu.seek(0)
+    return contenu
+
+
+def test_import_biens_csv(client):
+    declaration_id = _declaration(client)
+    csv = (
+        'declarationId;adresse;codePostal;dateEntreeLmnp;prixAcquisition;fraisNotaire;loyersBruts;taxeFonciere\n'
+        f'{declaration_id};1 rue A;75011;2021-06-01;"210 000,50";15000;14400;850\n'
+        f'{declaration_id};2 rue B;;15/09/2022;99000;;;\n'
+        f'{declaration_id};3 rue C;;2022-13-01;99000;;;\n'
+        f'999;4 rue D;;2022-01-01;99000;;;\n'
+    )
+    reponse = client.post('/api/import/biens', data={'fichier': (io.BytesIO(csv.encode()), 'biens.csv')})
+    resume = reponse.get_json()['resume']
+    assert (resume['lignesLues'], resume['lignesImportees'], resume['lignesRejetees']) == (4, 2, 2)
+    assert [e['ligne'] for e in resume['erreurs']] == [4, 5]
+    assert 'dateEntreeLmnp' in resume['erreurs'][0]['message']
+
+    biens = client.get(f'/api/declarations/{declaration_id}?user_id=3').get_json()['declaration']['biens']
+    assert biens[0]['prixAcquisition'] == 210000.5
+    assert biens[0]['partTerrain'] == 0.15  # suggestion Paris
+    assert biens[0]['recettes']['loyersBruts'] == 14400.0
+    assert biens[0]['depenses']['taxeFonciere'] == 850.0
+    assert biens[1]['dateEntreeLmnp'] == '2022-09-15' and biens[1]['recettes'] is None
+
+
+def test_import_transactions_xlsx_totalise_les_rubriques(client):
+    declaration_id = _declaration(client, 2024)
+    client.post('/api/import/biens', data={'fichier': (io.BytesIO(
+        f'declarationId,adresse,dateEntreeLmnp,prixAcquisition,taxeFonciere\n{declaration_id},1 rue A,2021-06-01,150000,700\n'
+        .encode()), 'biens.csv')})
+    bien_id = client.get(f'/api/declarations/{declaration_id}').get_json()['declaration']['biens'][0]['id']
+
+    fichier = _xlsx([
+        ('bienId', 'date', 'categorie', 'montant', 'libelle'),
+        *[(bien_id, date(2024, mois, 1), 'loyersBruts', 650, 'Loyer') for mois in range(1, 13)],
+        (bien_id, date(2023, 12, 1), 'loyersBruts', 650, 'Hors exercice'),
+        (bien_id, date(2024, 3, 10), 'fraisGestion', 78.25, None),
+        (bien_id, date(2024, 3, 10), 'inconnue', 1, None),
+        (bien_id + 1, date(2024, 3, 10), 'cfe', 1, None),
+    ])
+    reponse = client.post('/api/import/transactions?taille_lot=5&progression=1',
+                          data={'fichier': (fichier, 'transactions.xlsx')})
+    evenements = [json.loads(ligne) for ligne in reponse.get_data(as_text=True).splitlines()]
+    assert [e['evenement'] for e in evenements] == ['progression'] * 5 + ['resume']
+    resume = evenements[-1]
+    assert (resume['lignesImportees'], resume['lignesRejetees'], resume['biensMisAJour']) == (14, 2, 1)
+
+    bien = client.get(f'/api/declarations/{declaration_id}').get_json()['declaration']['biens'][0]
+    assert bien['recettes']['loyersBruts'] == 7800.0
+    assert bien['depenses']['fraisGestion'] == 78.25
+    assert bien['depenses']['taxeFonciere'] == 700.0
+
+
+def test_erreur_pendant_le_flux_de_progression(client, monkeypatch):
+    from src.import_lmnp import IMPORTS_PAR_LOTS, importer_biens_par_lots
+
+    def interrompu(lignes, taille_lot):
+        for numero, resume in enumerate(importer_biens_par_lots(lignes, taille_lot)):
+            if numero == 1:
+                raise RuntimeError('connexion perdue')
+            yield resume
+
+    monkeypatch.setitem(IMPORTS_PAR_LOTS, 'biens', interrompu)
+    declaration_id = _declaration(client)
+    csv = 'declarationId,adresse,dateEntreeLmnp,prixAcquisition\n' + ''.join(
+        f'{declaration_id},{i} rue A,2021-06-01,150000\n' for i in range(4))
+    reponse = client.post('/api/import/biens?taille_lot=2&progression=1',
+                          data={'fichier': (io.BytesIO(csv.encode()), 'biens.csv')})
+    evenements = [json.loads(ligne) for ligne in reponse.get_data(as_text=True).splitlines()]
+    assert [e['evenement'] for e in evenements] == ['progression', 'erreur']
+    assert 'connexion perdue' in evenements[-1]['error']
+    # les lots déjà validés restent, la session reste utilisable après l'échec du flux
+    assert len(client.get(f'/api/declarations/{declaration_id}').get_json()['declaration']['biens']) == 4
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from src import instantanes_lmnp
+from src.declaration_lmnp import CalculateurDeclaration
+from src.expertise_fiscale_lmnp import ExpertiseFiscaleLMNP
+from src.instantanes_lmnp import resultats_declaration
+from src.models.user import db
+from src.models.lmnp import Bien, Declaration, ResultatInstantane
+
+from tests.conftest import creer_bien, creer_declaration
+
+
+def _calcul(client, declaration_id):
+    return client.post(f'/api/declarations/{declaration_id}/calcul', json={}).get_json()
+
+
+def test_resultats_resservis_et_invalides_par_bien(client):
+    declaration_id = creer_declaration(client, 3, 2024)
+    bien_id = creer_bien(client, declaration_id, 12000)
+    creer_bien(client, declaration_id, 8000)
+    # Déclaration plus récente : le tableau de bord ne recalcule plus celle de 2024
+    creer_declaration(client, 3, 2025)
+
+    premier = _calcul(client, declaration_id)
+    assert premier['instantanes']['reutilises'] + premier['instantanes']['calcules'] == 2
+    assert _calcul(client, declaration_id)['instantanes'] == {'reutilises': 2, 'calcules': 0}
+
+    client.put(f'/api/biens/{bien_id}/depenses', json={'fraisGestion': 500})
+    assert db.session.get(ResultatInstantane, (declaration_id, bien_id, 2024)) is None
+    data = _calcul(client, declaration_id)
+    assert data['instantanes'] == {'reutilises': 1, 'calcules': 1}
+    assert data['declaration']['totaux']['depenses_totales'] == 500.0 + 2100.0
+    assert data['resultatsBiens'] == premier['resultatsBiens'] | {
+        str(bien_id): data['resultatsBiens'][str(bien_id)]
+    }
+    assert data['resultatsBiens'][str(bien_id)]['depenses_totales'] == 500.0
+
+
+def test_prechauffage_apres_changement_de_regles(client, monkeypatch):
+    ouverte = creer_declaration(client, 3, 2024)
+    for loyers in (10000, 11000, 12000):
+        creer_bien(client, ouverte, loyers)
+    transmise = creer_declaration(client, 4, 2023)
+    creer_bien(client, transmise, 9000)
+    db.session.get(Declaration, transmise).teletransmise = True
+    db.session.commit()
+
+    monkeypatch.setattr(ExpertiseFiscaleLMNP, 'VERSION_REGLES', '2099.1')
+    bilan = client.post('/api/calculs/instantanes/prechauffage?taille_lot=1').get_json()['prechauffage']
+    assert (bilan['declarations'], bilan['calcules'], bilan['reutilises']) == (1, 3, 0)
+    assert bilan['versionRegles'] == '2099.1'
+    assert _calcul(client, ouverte)['instantanes'] == {'reutilises': 3, 'calcules': 0}
+
+
+def test_suppression_du_bien_avec_cles_etrangeres(client):
+    declaration_id = creer_declaration(client, 3, 2024)
+    bien_id = creer_bien(client, declaration_id, 12000)
+    autre_id = creer_bien(client, declaration_id, 8000)
+    _calcul(client, declaration_id)
+    db.session.commit()
+    # Contraintes appliquées comme sous PostgreSQL (hors transaction pour SQLite)
+    db.session.execute(text('PRAGMA foreign_keys=ON'))
+
+    db.session.delete(db.session.get(Bien, bien_id))
+    db.session.commit()
+    assert db.session.get(ResultatInstantane, (declaration_id, bien_id, 2024)) is None
+    assert db.session.get(ResultatInstantane, (declaration_id, autre_id, 2024)) is not None
+
+    db.session.delete(db.session.get(Declaration, declaration_id))
+    db.session.commit()
+    assert db.session.scalar(select(func.count()).select_from(ResultatInstantane)) == 0
+
+
+@pytest.mark.parametrize('app', ['fichier'], indirect=True)
+def test_calculs_concurrents_de_la_meme_declaration(client, monkeypatch):
+    declaration_id = creer_declaration(client, 3, 2024)
+    # Déclaration plus récente d'abord : le tableau de bord ne calcule pas celle de 2024
+    creer_declaration(client, 3, 2025)
+    creer_bien(client, declaration_id, 12000)
+    concurrente = Session(db.engine)
+
+    class CalculateurDevance(CalculateurDeclaration):
+        """Un autre processus écrit les mêmes résultats entre la lecture et l'écriture"""
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if concurrente.info.setdefault('passages', 0) == 0:
+                concurrente.info['passages'] = 1
+                resultats_declaration(concurrente, concurrente.get(Declaration, declaration_id))
+                concurrente.commit()
+
+    monkeypatch.setattr(instantanes_lmnp, 'CalculateurDeclaration', CalculateurDevance)
+    data = _calcul(client, declaration_id)
+    concurrente.close()
+    assert data['success'], data['error']
+    assert data['instantanes'] == {'reutilises': 0, 'calcules': 1}
+    assert db.session.scalar(select(func.count()).select_from(ResultatInstantane)) == 1
@@ -0,0 +1,88 @@
+import json
+
+
+def _enregistrement(identifiant, loyers=24000):
+    return {
+        'id': identifiant,
+        'bien': {
+            'id': identifiant,
+            'adresse': '123 Rue de la Paix, 75001 Paris',
+            'date_entree_lmnp': '2020-01-01',
+            'prix_acquisition': 200000,
+            'frais_notaire': 15000,
+            'frais_agence': 5000
+        },
+        'recettes': {'loyers_bruts': loyers},
+        'depenses': {'frais_gestion': 2400, 'charges_copropriete': 3600},
+        'emprunt': {'interets_annuels': 4800}
+    }
+
+
+def test_resultat_batch_ndjson(client):
+    lignes = [
+        json.dumps(_enregistrement(1)),
+        '',
+        '{pas du json',
+        json.dumps({**_enregistrement(3), 'recettes': {}}),
+        json.dumps(_enregistrement(4, loyers=30000)),
+    ]
+    reponse = client.post(
+        '/api/calculs/resultat/batch',
+        data='\n'.join(lignes) + '\n',
+        content_type='application/x-ndjson'
+    )
+    assert reponse.status_code == 200
+    assert reponse.mimetype == 'application/x-ndjson'
+
+    resultats = [json.loads(l) for l in reponse.get_data(as_text=True).splitlines()]
+    assert [r['ligne'] for r in resultats] == [1, 3, 4, 5]
+    assert [r['success'] for r in resultats] == [True, False, False, True]
+    assert resultats[2]['id'] == 3
+
+    unitaire = client.post('/api/calculs/resultat', json=_enregistrement(1)).get_json()
+    assert resultats[0]['resultat'] == unitaire['resultat']
+    assert resultats[3]['resultat']['recettes_totales'] == 30000.0
+
+
+def test_resultat_batch_ligne_trop_longue(client, monkeypatch):
+    monkeypatch.setattr('src.routes.lmnp_routes.TAILLE_MAX_LIGNE_NDJSON', 64)
+    corps = json.dumps(_enregistrement(1)) + '\n' + '{}' + '\n'
+    reponse = client.post('/api/calculs/resultat/batch', data=corps)
+    resultats = [json.loads(l) for l in reponse.get_data(as_text=True).splitlines()]
+    assert [r['success'] for r in resultats] == [False, False]
+    assert 'octets' in resultats[0]['error']
+
+
+def test_declaration_recalculee_a_la_mise_a_jour_des_depenses(client):
+    reponse = client.post('/api/declarations/42/calcul', json={
+        'annee': 2024,
+        'biens': [_enregistrement(101), _enregistrement(102, loyers=12000)]
+    })
+    synthese = reponse.get_json()['declaration']
+    assert synthese['nombreBiens'] == 2
+    assert synthese['totaux']['recettes_totales'] == 36000.0
+
+    reponse = client.put('/api/biens/102/depenses', json={'fraisGestion': 1000})
+    synthese = reponse.get_json()['declaration']
+    assert synthese['totaux']['depenses_totales'] == 6000.0 + 1000.0
+
+    assert client.get('/api/declarations/42/calcul').get_json()['declaration'] == synthese
+    assert client.get('/api/declarations/43/calcul').status_code == 404
+
+
+def test_balayage_optimisation(client):
+    reponse = client.post('/api/calculs/optimisation/balayage', json={
+        'recettes': [20000, 90000],
+        'charges': {'debut': 0, 'fin': 15000, 'pas': 5000},
+        'amortissements': 2000
+    })
+    data = reponse.get_json()
+    assert reponse.status_code == 200
+    assert data['charges'] == [0.0, 5000.0, 10000.0, 15000.0]
+    assert data['chargesEquilibre'] == [[8000.0], [None]]
+    assert [ligne[0] for ligne in data['regimeRecommande'][0]] == ['micro_bic', 'micro_bic', 'reel', 'reel']
+
+    reponse = client.post('/api/calculs/optimisation/balayage', json={
+        'recettes': {'debut': 0, 'fin': 10_000_000, 'pas': 0.01}, 'charges': [0]
+    })
+    assert reponse.status_code == 400
@@ -0,0 +1,93 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from src import expertise_fiscale_lmnp
+from src.expertise_fiscale_lmnp import calculer_resultat_fiscal, definir_moteur_calcul, optimiser_regime
+from src.moteur_centimes import CHAMPS_DEPENSES, en_centimes
+
+
+def _montant(rng, maximum):
+    return rng.randint(0, maximum * 100) / 100
+
+
+def _montant_fin(rng, maximum):
+    """Montant au-delà du centime (float, texte ou millièmes), une fois sur deux"""
+    if rng.random() < 0.5:
+        return _montant(rng, maximum)
+    return rng.choice([
+        lambda: rng.randint(0, maximum * 1000) / 1000,
+        lambda: f'{rng.randint(0, maximum * 100_000) / 100_000:.5f}',
+        lambda: round(rng.randint(0, maximum * 100) / 100 + 0.005, 3),
+    ])()
+
+
+def _donnees_aleatoires(rng, montant=_montant):
+    bien = {
+        'id': 1,
+        'adresse': 'Bordeaux',
+        'date_entree_lmnp': date(2018, 1, 1) + timedelta(days=rng.randint(0, 3000)),
+        'prix_acquisition': montant(rng, 900_000),
+        'frais_notaire': montant(rng, 40_000),
+        'frais_agence': montant(rng, 20_000),
+    }
+    if rng.random() < 0.5:
+        part = rng.randint(6000, 9000) / 10000
+        bien.update(part_construction=part, part_terrain=round(1 - part, 4))
+    recettes = {'loyers_bruts': montant(rng, 60_000), 'autres_recettes': montant(rng, 2_000)}
+    depenses = {champ: montant(rng, 3_000) for champ in rng.sample(CHAMPS_DEPENSES, 6)}
+    emprunt = {'interets_annuels': montant(rng, 8_000), 'frais_dossier': montant(rng, 1_500)} \
+        if rng.random() < 0.7 else None
+    return bien, recettes, depenses, emprunt
+
+
+def test_differentiel_resultat_fiscal():
+    rng = random.Random(31)
+    for _ in range(2000):
+        donnees = _donnees_aleatoires(rng)
+        assert calculer_resultat_fiscal(*donnees, moteur='centimes') == \
+            calculer_resultat_fiscal(*donnees, moteur='decimal')
+
+
+def test_differentiel_montants_au_dela_du_centime():
+    # Trois charges de 100,004 € : 300,01 € une fois sommées (et non 3 × 100,00 €)
+    donnees = _donnees_aleatoires(random.Random(3))[:2] + (
+        {'frais_gestion': 100.004, 'assurances': 100.004, 'cfe': 100.004}, None)
+    assert calculer_resultat_fiscal(*donnees, moteur='centimes')['depenses_totales'] == 300.01
+    assert calculer_resultat_fiscal(*donnees, moteur='centimes') == calculer_resultat_fiscal(*donnees, moteur='decimal')
+
+    rng = random.Random(17)
+    for _ in range(2000):
+        donnees = _donnees_aleatoires(rng, _montant_fin)
+        assert calculer_resultat_fiscal(*donnees, moteur='centimes') == \
+            calculer_resultat_fiscal(*donnees, moteur='decimal')
+    for _ in range(2000):
+        recettes, charges = _montant_fin(rng, 90_000), _montant_fin(rng, 60_000)
+        assert optimiser_regime(recettes, charges, moteur='centimes') == \
+            optimiser_regime(recettes, charges, moteur='decimal')
+
+
+def test_differentiel_optimisation():
+    rng = random.Random(7)
+    cas = [(77700, 0), (77700.01, 10), (0.01, 0), (1000.01, 500.01), (100, 300)]
+    cas += [(_montant(rng, 120_000), _montant(rng, 90_000)) for _ in range(2000)]
+    for recettes, charges in cas:
+        assert optimiser_regime(recettes, charges, moteur='centimes') == \
+            optimiser_regime(recettes, charges, moteur='decimal')
+
+
+def test_selection_globale(monkeypatch):
+    monkeypatch.setattr(expertise_fiscale_lmnp, 'moteur_calcul_par_defaut', 'decimal')
+    definir_moteur_calcul('centimes')
+    assert expertise_fiscale_lmnp.moteur_calcul_par_defaut == 'centimes'
+    with pytest.raises(ValueError):
+        definir_moteur_calcul('float')
+
+
+def test_conversion_centimes():
+    assert en_centimes(0.29) == 29
+    assert en_centimes(0.285) == 29
+    assert en_centimes(1999999.99) == 199999999
+    assert en_centimes(-0.005) == -1
+    assert en_centimes(12) == 1200
@@ -0,0 +1,101 @@
+import pytest
+from flask import Flask
+
+from src.cache_ressources import cache_ressources
+from src.models.user import db
+from src.partitions import CLE_EXTENSION, configurer_partitions, options_pool
+from src.routes.lmnp_routes import lmnp_bp
+
+
+@pytest.fixture
+def client_partitionne(tmp_path, monkeypatch):
+    monkeypatch.setenv('LMNP_PARTITIONS', 'sqlite')
+    monkeypatch.setenv('LMNP_PARTITIONS_MAX_MOTEURS', '2')
+    monkeypatch.setenv('LMNP_ADMIN_TOKEN', 'secret')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.register_blueprint(lmnp_bp, url_prefix='/api')
+    db.init_app(app)
+    routeur = configurer_partitions(app, db, str(tmp_path / 'cabinets'))
+    cache_ressources.vider()
+    with app.app_context():
+        db.create_all()
+        yield app.test_client()
+        db.session.remove()
+        routeur.fermer()
+
+
+def _provisionner(client, *cabinets):
+    for cabinet in cabinets:
+        reponse = client.post('/api/admin/partitions', json={'partition': cabinet}, headers={'X-Admin-Token': 'secret'})
+        assert reponse.status_code == 201
+
+
+def _creer(client, cabinet, annee):
+    return client.post('/api/declarations', json={'annee': annee},
+                       headers={'X-User-Id': '1', 'X-Tenant-Id': cabinet}).get_json()['declaration']
+
+
+def test_une_base_par_cabinet(client_partitionne, tmp_path):
+    client = client_partitionne
+    _provisionner(client, 'cabinet-a', 'cabinet-b')
+    assert _creer(client, 'cabinet-a', 2023)['id'] == 1
+    assert _creer(client, 'cabinet-b', 2024)['id'] == 1
+    _creer(client, 'cabinet-a', 2024)
+    assert sorted(p.name for p in (tmp_path / 'cabinets').glob('*.db')) == ['cabinet-a.db', 'cabinet-b.db']
+
+    def annees(cabinet):
+        entetes = {'X-User-Id': '1', **({'X-Tenant-Id': cabinet} if cabinet else {})}
+        return [d['annee'] for d in client.get('/api/declarations', headers=entetes).get_json()['declarations']]
+    assert annees('cabinet-a') == [2024, 2023]
+    assert annees('cabinet-b') == [2024]
+    assert annees(None) == []
+
+    # Même identifiant, cabinets distincts : ni le cache ni les ETag ne se mélangent
+    detail_a = client.get('/api/declarations/1', headers={'X-Tenant-Id': 'cabinet-a'})
+    detail_b = client.get('/api/declarations/1', headers={'X-Tenant-Id': 'cabinet-b'})
+    assert detail_a.get_json()['declaration']['annee'] == 2023
+    assert detail_b.get_json()['declaration']['annee'] == 2024
+    assert detail_a.headers['ETag'] != detail_b.headers['ETag']
+
+    assert client.get('/api/declarations?user_id=1', headers={'X-Tenant-Id': '../app'}).status_code == 400
+
+
+def test_cabinet_inconnu_non_cree(client_partitionne, tmp_path):
+    client = client_partitionne
+    reponse = client.post('/api/declarations', json={'annee': 2024},
+                          headers={'X-User-Id': '1', 'X-Tenant-Id': 'pirate'})
+    assert reponse.status_code == 404 and not reponse.get_json()['success']
+    assert list((tmp_path / 'cabinets').glob('*.db')) == []
+
+    assert client.post('/api/admin/partitions', json={'partition': 'pirate'}).status_code == 403
+    assert client.post('/api/admin/partitions', json={'partition': '../app'},
+                       headers={'X-Admin-Token': 'secret'}).status_code == 400
+    _provisionner(client, 'cabinet')
+    assert client.post('/api/admin/partitions', json={'partition': 'cabinet'},
+                       headers={'X-Admin-Token': 'secret'}).get_json()['cree'] is False
+    assert _creer(client, 'cabinet', 2024)['id'] == 1
+
+
+def test_agregation_admin_et_lru_des_moteurs(client_partitionne):
+    client = client_partitionne
+    _provisionner(client, 'a', 'b', 'c')
+    for cabinet in ('a', 'b', 'c'):
+        _creer(client, cabinet, 2024)
+    assert client.get('/api/admin/partitions').status_code == 403
+    evictions = client.application.extensions[CLE_EXTENSION].statistiques()['evictions']
+
+    data = client.get('/api/admin/partitions', headers={'X-Admin-Token': 'secret'}).get_json()
+    assert sorted(data['partitions']) == ['a', 'b', 'c']
+    assert data['totaux']['declarations'] == 3 and data['totaux']['partitions'] == 3
+    assert data['moteurs']['taille'] <= 2 and data['moteurs']['evictions'] >= 1
+    # Le parcours passe par des moteurs éphémères : les moteurs des cabinets actifs restent ouverts
+    assert data['moteurs']['evictions'] == evictions
+
+
+def test_connexions_postgresql_bornees():
+    assert options_pool(64, 64)['pool_size'] + options_pool(64, 64)['max_overflow'] == 1
+    options = options_pool(4, 40)
+    assert (options['pool_size'], options['max_overflow']) == (2, 8)
+    with pytest.raises(ValueError):
+        options_pool(64, 32)
@@ -0,0 +1,58 @@
+import json
+
+from src.prompts_agents import CompteurTokens, MesuresPrompts, ajuster_contexte, serialiser_contexte
+
+# Estimation à 4 caractères par token : indépendant du téléchargement de l'encodage tiktoken
+compteur = CompteurTokens('gpt-4', estimer=True)
+
+
+def test_serialisation_compacte():
+    assert serialiser_contexte({'régime': 'réel', 'biens': [1, 2]}) == '{"régime":"réel","biens":[1,2]}'
+    assert serialiser_contexte(None) == '{}'
+
+
+def test_contexte_dans_le_budget_inchange():
+    contexte = {'recettes': 12000, 'charges': 3000}
+
+    serialise, tokens, reduit = ajuster_contexte(contexte, 100, compteur, ('recettes',))
+
+    assert json.loads(serialise) == contexte
+    assert tokens == compteur.compter(serialise)
+    assert not reduit
+
+
+def test_champs_secondaires_reduits_avant_les_prioritaires():
+    biens = [{'adresse': f'{i} rue du Port', 'loyer': 700 + i, 'charges': 100} for i in range(200)]
+    contexte = {'recettes': 12000, 'biens': biens, 'notes': 'x' * 5000, 'historique': list(range(500))}
+
+    serialise, tokens, reduit = ajuster_contexte(contexte, 150, compteur, ('recettes', 'biens'))
+    resultat = json.loads(serialise)
+
+    assert reduit and tokens <= 150
+    # Secondaires retirés, portefeuille résumé par ses totaux, montants prioritaires intacts
+    assert 'notes' not in resultat and 'historique' not in resultat
+    assert resultat['biens'] == {'nombre': 200, 'totaux': {'loyer': sum(700 + i for i in range(200)), 'charges': 20000}}
+    assert resultat['recettes'] == 12000
+
+
+def test_mesures_par_agent():
+    mesures = MesuresPrompts()
+    mesures.enregistrer('agentFiscal', tokens_prompt=800, tokens_contexte=300, latence_ms=1200)
+    mesures.enregistrer('agentFiscal', tokens_prompt=1600, tokens_contexte=1100, latence_ms=2000, contexte_reduit=True)
+
+    statistiques = mesures.statistiques()
+
+    assert statistiques['agents']['agentFiscal'] == {
+        'appels': 2, 'tokens_prompt_moyen': 1200.0, 'tokens_prompt_max': 1600,
+        'latence_moyenne_ms': 1600.0, 'latence_p95_ms': 2000
+    }
+    assert statistiques['contextes_reduits'] == 1
+    assert statistiques['recents'][-1]['tokens_prompt'] == 1600
+
+
+def test_estimation_pendant_le_chargement_de_l_encodage():
+    en_chargement = CompteurTokens('gpt-4')
+    # Chargement en cours dans un autre fil : pas d'attente, tokens estimés
+    with en_chargement._verrou:
+        assert en_chargement.compter('x' * 40) == 10
+        assert not en_chargement.exact
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from src.models.reports import PointControleReports
+from src.reports_fiscaux import EtatReports, calculer_reports, mettre_a_jour_reports, traiter_annee
+
+D = Decimal
+
+
+def test_deficit_puis_imputation():
+    etat, lignes = calculer_reports([
+        (2020, D('-3000'), D('5000')),
+        (2021, D('4000'), D('5000')),
+        (2022, D('9000'), D('5000')),
+    ])
+    # 2020 : déficit de 3 000, amortissement entièrement différé
+    assert (lignes[0].deficit_cree, lignes[0].amortissement_differe) == (D('3000'), D('5000'))
+    # 2021 : déficit imputé, amortissement limité au résultat restant
+    assert (lignes[1].deficits_imputes, lignes[1].amortissement_deduit) == (D('3000'), D('1000'))
+    assert lignes[1].resultat_fiscal == 0
+    assert lignes[1].stock_ard == D('9000')
+    # 2022 : amortissement de l'année puis ARD
+    assert (lignes[2].amortissement_deduit, lignes[2].ard_imputes) == (D('5000'), D('4000'))
+    assert etat.amortissements_differes == D('5000')
+    assert etat.deficits == []
+
+
+def test_expiration_des_deficits():
+    etat, lignes = calculer_reports([(2010, D('-1000'), D('0')), (2021, D('500'), D('0'))])
+    assert lignes[1].deficits_expires == D('1000')
+    assert lignes[1].resultat_fiscal == D('500')
+
+
+def test_etat_serialisable():
+    etat, _ = traiter_annee(EtatReports(), 2023, D('-12.34'), D('100'))
+    assert EtatReports.from_dict(etat.to_dict()) == etat
+
+
+def test_point_de_controle(app, monkeypatch):
+    historique = {2015 + i: (D(1000 * (i - 3)), D('2500')) for i in range(9)}
+    lignes = mettre_a_jour_reports(1, historique)
+    assert [l['annee'] for l in lignes] == list(range(2015, 2024))
+
+    traitees = []
+    import src.reports_fiscaux as module
+    original = module.traiter_annee
+    monkeypatch.setattr(module, 'traiter_annee', lambda etat, annee, *a: traitees.append(annee) or original(etat, annee, *a))
+
+    # Nouvelle année : seule 2024 est calculée
+    lignes = mettre_a_jour_reports(1, {2024: (D('8000'), D('2500'))})
+    assert traitees == [2024]
+    assert len(lignes) == 10
+    assert PointControleReports.query.filter_by(user_id=1).count() == 10
+
+    # Correction de 2022 : 2022 et les années suivantes sont rejouées
+    traitees.clear()
+    mettre_a_jour_reports(1, {2022: (D('0'), D('2500'))})
+    assert traitees == [2022, 2023, 2024]
+
+    _, reference = calculer_reports([(a, *v) for a, v in {**historique, 2024: (D('8000'), D('2500')),
+                                                         2022: (D('0'), D('2500'))}.items()])
+    assert mettre_a_jour_reports(1, {}) == [l.to_dict() for l in reference]
+
+
+def test_routes_reports(client):
+    reponse = client.post('/api/reports/7', json={'annees': [
+        {'annee': 2023, 'resultatAvantAmortissement': -500, 'amortissements': 3000},
+        {'annee': 2024, 'resultatAvantAmortissement': 2000, 'amortissements': 3000},
+    ]})
+    stock = reponse.get_json()['stock']
+    assert stock == {'deficitsReportables': 0.0, 'amortissementsDifferes': 4500.0}
+    assert len(client.get('/api/reports/7').get_json()['reports']) == 2
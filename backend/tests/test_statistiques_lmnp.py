@@ -0,0 +1,51 @@
+import io
+
+from src.models.user import db
+from src.models.lmnp import StatistiquesUtilisateur
+
+from tests.conftest import compter_requetes, creer_bien, creer_declaration
+
+
+def _stats(client, user_id):
+    return client.get('/api/stats/dashboard', headers={'X-User-Id': str(user_id)}).get_json()['stats']
+
+
+def test_statistiques_tenues_a_jour_a_chaque_ecriture(client):
+    declaration_id = creer_declaration(client, 5, 2024)
+    ligne = db.session.get(StatistiquesUtilisateur, 5)
+    assert ligne is not None and ligne.total_biens == 0
+
+    bien_id = creer_bien(client, declaration_id, 12000)
+    creer_bien(client, declaration_id, 9000)
+    stats = _stats(client, 5)
+    assert stats['totalBiens'] == 2
+    assert stats['recettesAnnuelles'] == 21000.0
+    assert stats['optimisationPossible']['regime'] in ('micro_bic', 'reel')
+
+    client.put(f'/api/biens/{bien_id}/recettes', json={'loyersBruts': 15000})
+    assert _stats(client, 5)['recettesAnnuelles'] == 24000.0
+
+    # Les opérations importées (insertions hors ORM) sont répercutées au commit
+    client.post('/api/import/transactions', data={'fichier': (io.BytesIO(
+        f'bienId,date,categorie,montant\n{bien_id},2024-05-01,autresRecettes,500\n'.encode()), 't.csv')})
+    assert _stats(client, 5)['recettesAnnuelles'] == 24500.0
+
+    # Une déclaration plus récente devient la base du tableau de bord
+    creer_declaration(client, 5, 2025)
+    assert _stats(client, 5)['totalBiens'] == 0
+
+
+def test_lecture_par_cle_primaire(client):
+    declaration_id = creer_declaration(client, 8, 2024)
+    for loyers in (10000, 11000, 12000):
+        creer_bien(client, declaration_id, loyers)
+    db.session.expunge_all()
+
+    with compter_requetes() as requetes:
+        stats = _stats(client, 8)
+    assert len(requetes) == 1
+    assert stats['totalBiens'] == 3
+
+    # Utilisateur sans données : ligne initialisée à la première lecture
+    assert _stats(client, 99) == {'totalBiens': 0, 'recettesAnnuelles': 0.0, 'economiesFiscales': 0.0,
+                                  'declarationsCompletes': 0, 'optimisationPossible': None}
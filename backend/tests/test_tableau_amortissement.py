@@ -0,0 +1,72 @@
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+
+from src.expertise_fiscale_lmnp import (
+    BienImmobilier,
+    ExpertiseFiscaleLMNP,
+    tableau_amortissement_bien,
+)
+
+
+def _bien(date_entree=date(2024, 7, 1)):
+    return BienImmobilier(
+        id=1,
+        adresse='123 Rue de la Paix, 75001 Paris',
+        date_entree_lmnp=date_entree,
+        prix_acquisition=Decimal('200000'),
+        frais_notaire=Decimal('15000'),
+        frais_agence=Decimal('5000')
+    )
+
+
+def test_tableau_complet_avec_prorata():
+    expert = ExpertiseFiscaleLMNP()
+    bien = _bien()
+    tableau = list(expert.tableau_amortissement(bien))
+
+    # 25 ans de construction + une année de reliquat du prorata
+    assert [l.annee for l in tableau] == list(range(2024, 2050))
+    assert tableau[-1].cumul == Decimal('180000.00')
+    assert tableau[-1].valeur_residuelle == Decimal('0.00')
+    assert sum(l.construction for l in tableau) == Decimal('160000.00')
+    assert sum(l.frais_notaire for l in tableau) == Decimal('15000')
+    assert tableau[16].frais_notaire == 0
+
+    # Première année et années pleines identiques au calcul annuel
+    premiere = expert.calculer_amortissement(bien, 2024)
+    assert tableau[0].total == premiere.total_prorata
+    assert tableau[5].total == expert.calculer_amortissement(bien, 2029).total_annuel
+    assert tableau[-1].construction == Decimal('6400.00') - premiere.construction_prorata
+
+
+def test_entree_au_premier_janvier_sans_annee_supplementaire():
+    expert = ExpertiseFiscaleLMNP()
+    tableau = list(expert.tableau_amortissement(_bien(date(2023, 1, 1))))
+    assert tableau[-1].annee == 2047
+    assert tableau[-1].valeur_residuelle == 0
+
+
+def test_generateur_paresseux_et_partage():
+    expert = ExpertiseFiscaleLMNP()
+    bien = _bien()
+    debut = list(islice(expert.tableau_amortissement(bien), 3))
+    etat = expert._etat_tableau(bien)
+    assert len(etat.lignes) == 3
+
+    complet = list(expert.tableau_amortissement(bien))
+    assert complet[:3] == debut
+    assert complet[0] is debut[0]
+
+
+def test_fonction_utilitaire():
+    tableau = tableau_amortissement_bien({
+        'id': 1,
+        'adresse': 'Lyon',
+        'date_entree_lmnp': date(2024, 3, 15),
+        'prix_acquisition': 150000.0,
+        'frais_notaire': 11000.0,
+        'frais_agence': 0
+    })
+    assert tableau[0]['annee'] == 2024
+    assert tableau[-1]['cumul'] == 131000.0
@@ -0,0 +1,63 @@
+def _creer_utilisateurs(client):
+    for nom in ('alice', 'albert', 'bruno', 'alain', 'chloe'):
+        assert client.post('/api/users', json={'username': nom, 'email': f'{nom}@exemple.fr'}).status_code == 201
+
+
+def test_pagination_par_cle(client):
+    _creer_utilisateurs(client)
+
+    noms, curseur = [], None
+    while True:
+        reponse = client.get('/api/users', query_string={'limite': 2, **({'apres': curseur} if curseur else {})})
+        assert reponse.mimetype == 'application/json'
+        noms += [u['username'] for u in reponse.get_json()]
+        curseur = reponse.headers.get('X-Next-Cursor')
+        if curseur is None:
+            break
+    assert noms == ['alice', 'albert', 'bruno', 'alain', 'chloe']
+
+
+def test_filtre_prefixe_et_projection(client):
+    _creer_utilisateurs(client)
+
+    reponse = client.get('/api/users?username=al&fields=email')
+    assert reponse.get_json() == [{'email': 'alice@exemple.fr'}, {'email': 'albert@exemple.fr'},
+                                  {'email': 'alain@exemple.fr'}]
+    assert 'X-Next-Cursor' not in reponse.headers
+
+    assert [u['id'] for u in client.get('/api/users?email=b&fields=id').get_json()] == [3]
+    assert client.get('/api/users?username=zz').get_json() == []
+    # Préfixe sensible à la casse, jokers LIKE pris littéralement, dernier point de code Unicode
+    assert client.get('/api/users?username=Al').get_json() == []
+    assert client.get('/api/users', query_string={'username': 'a%'}).get_json() == []
+    assert client.get('/api/users', query_string={'username': '\U0010ffff'}).get_json() == []
+    assert client.get('/api/users', query_string={'username': 'al\U0010ffff'}).get_json() == []
+    assert client.get('/api/users?fields=password').status_code == 400
+
+
+def test_bulk_une_transaction_et_resultats_par_operation(client):
+    _creer_utilisateurs(client)
+    reponse = client.post('/api/users/bulk', json={'operations': [
+        {'op': 'create', 'username': 'david', 'email': 'david@exemple.fr'},
+        {'op': 'create', 'username': 'alice', 'email': 'autre@exemple.fr'},
+        {'op': 'create', 'username': 'emma', 'email': 'david@exemple.fr'},
+        {'op': 'update', 'id': 2, 'email': 'albert@cabinet.fr'},
+        {'op': 'update', 'id': 3, 'username': 'alain'},
+        {'op': 'delete', 'id': 5},
+        {'op': 'create', 'username': 'chloe', 'email': 'chloe@cabinet.fr'},
+        {'op': 'delete', 'id': 42},
+        {'op': 'rename', 'id': 1},
+    ]})
+    data = reponse.get_json()
+    assert [r['statut'] for r in data['resultats']] == [
+        'cree', 'conflit', 'conflit', 'modifie', 'conflit', 'supprime', 'cree', 'introuvable', 'invalide'
+    ]
+    assert (data['appliquees'], data['rejetees']) == (4, 5)
+    assert 'username' in data['resultats'][1]['erreur'] and 'email' in data['resultats'][2]['erreur']
+
+    utilisateurs = {u['username']: u for u in client.get('/api/users').get_json()}
+    assert set(utilisateurs) == {'alice', 'albert', 'bruno', 'alain', 'david', 'chloe'}
+    assert utilisateurs['albert']['email'] == 'albert@cabinet.fr'
+    assert utilisateurs['chloe']['id'] == data['resultats'][6]['id'] != 5
+
+    assert client.post('/api/users/bulk', json={'operations': []}).status_code == 400